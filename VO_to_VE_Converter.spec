@@ -10,6 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
+    # NumPy stays in the bundle for the array paths; it is only imported on
+    # first use (engine.load_numpy()), so it does not slow down startup
     excludes=[],
     noarchive=False,
     optimize=0,
@@ -29,6 +31,8 @@ exe = EXE(
     upx=True,
     upx_exclude=[],
     runtime_tmpdir=None,
+    # Windowed: batch arguments still work, but their output has nowhere to go.
+    # vo_ve_converter.spec builds the console exe for batch use.
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -0,0 +1,48 @@
+# -*- mode: python ; coding: utf-8 -*-
+
+
+a = Analysis(
+    ['vo_ve_converter.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('logo.ico', '.'), ('logo_small.png', '.')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    # NumPy is bundled and imported on first use, see VO_to_VE_Converter.spec
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+# Onedir build: nothing is unpacked at launch. UPX stays off, compressed
+# DLLs would have to be decompressed on every start instead.
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='VO_to_VE_Converter',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['logo.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='VO_to_VE_Converter',
+)
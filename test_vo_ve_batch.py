@@ -0,0 +1,75 @@
+"""Tests for the parallel batch runner."""
+
+import time
+import unittest
+
+import vo_ve_batch
+import vo_ve_engine as engine
+
+X_AXIS = [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6000, 7000]
+Y_AXIS = [20, 30, 40, 50, 60, 70, 85, 100]
+
+# Worker counts to run every test with: in this process and through the pool
+WORKERS = (1, 3)
+
+
+def square_late(value, delay):
+    """Square of value after delay seconds; module level so workers can unpickle it."""
+    time.sleep(delay)
+    return value * value
+
+
+def fail_some(value):
+    if value % 3 == 1:
+        raise engine.ConversionError(f"bad map {value}")
+    if value % 3 == 2:
+        raise KeyError(value)
+    return value
+
+
+class RunBatchTest(unittest.TestCase):
+    def test_input_order(self):
+        # Early jobs take longest, so a pool finishes them last
+        jobs = [(i, 0.02 * (8 - i)) for i in range(8)]
+        for workers in WORKERS:
+            items = list(vo_ve_batch.run_batch(square_late, jobs, workers=workers, chunksize=1))
+            self.assertEqual([item.index for item in items], list(range(8)), workers)
+            self.assertEqual([item.job for item in items], jobs, workers)
+            self.assertEqual([item.result for item in items], [i * i for i in range(8)], workers)
+            self.assertTrue(all(item.ok for item in items))
+
+    def test_failures_stay_with_their_job(self):
+        jobs = [(i,) for i in range(9)]
+        for workers in WORKERS:
+            items = list(vo_ve_batch.run_batch(fail_some, jobs, workers=workers, chunksize=2))
+            self.assertEqual(len(items), 9, workers)
+            for item in items:
+                value = item.job[0]
+                if value % 3 == 0:
+                    self.assertTrue(item.ok)
+                    self.assertEqual(item.result, value)
+                elif value % 3 == 1:
+                    self.assertEqual(item.error, f"bad map {value}")
+                    self.assertIsNone(item.result)
+                else:
+                    self.assertTrue(item.error.startswith(f"KeyError: {value}\n"), item.error)
+                    self.assertIn("Traceback", item.error)
+
+    def test_empty_batch(self):
+        for workers in WORKERS:
+            self.assertEqual(list(vo_ve_batch.run_batch(fail_some, [], workers=workers)), [])
+
+    def test_convert_many(self):
+        grid = [[40 + 10 * r + c for c in range(12)] for r in range(8)]
+        maps = [(X_AXIS, Y_AXIS, grid, 2.8, 25), (X_AXIS, Y_AXIS, grid[:-1], 2.8, 25),
+                (X_AXIS, Y_AXIS, grid, 2.0, 40)]
+        for workers in WORKERS:
+            items = list(vo_ve_batch.convert_many(maps, workers=workers))
+            self.assertEqual([item.ok for item in items], [True, False, True], workers)
+            self.assertIn("8x12", items[1].error)
+            expected = engine.convert_map(X_AXIS, Y_AXIS, grid, 2.0, 40)
+            self.assertEqual(items[2].result.ve_grid, expected.ve_grid)
+
+
+if __name__ == '__main__':
+    unittest.main()
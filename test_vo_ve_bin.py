@@ -0,0 +1,191 @@
+"""Tests for vo_ve_bin on synthetic images."""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import vo_ve_bin
+import vo_ve_engine as engine
+
+X_AXIS = [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6000, 7000]
+Y_AXIS = [20, 30, 40, 50, 60, 70, 85, 100]
+
+
+def vo_grid():
+    return [[40 + 10 * r + c for c in range(12)] for r in range(8)]
+
+
+class BinTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def image(self, data, name='tune.bin'):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class DecodeEncodeTest(BinTestCase):
+    def test_round_trip(self):
+        buf = bytearray(64)
+        values = [0.5, 1.25, 100.0, 655.35]
+        vo_ve_bin.encode_values(buf, 8, values, 'u16', scale=0.01)
+        self.assertEqual(vo_ve_bin.decode_values(bytes(buf), 8, 4, 'u16', scale=0.01), values)
+
+    def test_offset_and_signed(self):
+        buf = bytearray(8)
+        vo_ve_bin.encode_values(buf, 0, [-40.0, 0.0, 87.5], 'i16', scale=0.5, offset=-10)
+        self.assertEqual(vo_ve_bin.decode_values(bytes(buf), 0, 3, 'i16', scale=0.5, offset=-10),
+                         [-40.0, 0.0, 87.5])
+
+    def test_endianness(self):
+        little = bytearray(2)
+        big = bytearray(2)
+        vo_ve_bin.encode_values(little, 0, [0x1234], 'u16', endian='<')
+        vo_ve_bin.encode_values(big, 0, [0x1234], 'u16', endian='>')
+        self.assertEqual(bytes(little), b'\x34\x12')
+        self.assertEqual(bytes(big), b'\x12\x34')
+        self.assertEqual(vo_ve_bin.decode_values(bytes(big), 0, 1, 'u16', endian='>'), [0x1234])
+        self.assertEqual(vo_ve_bin.decode_values(bytes(big), 0, 1, 'u16', endian='<'), [0x3412])
+
+    def test_struct_path_matches(self):
+        buf = bytes(range(32))
+        fast = vo_ve_bin.decode_values(buf, 4, 6, 'i16', endian='>', scale=0.5, offset=1)
+        with mock.patch.object(engine, 'load_numpy', return_value=None):
+            slow = vo_ve_bin.decode_values(buf, 4, 6, 'i16', endian='>', scale=0.5, offset=1)
+        self.assertEqual(fast, slow)
+
+    def test_float_elements(self):
+        buf = bytearray(8)
+        vo_ve_bin.encode_values(buf, 0, [1.5, -2.25], 'f32')
+        self.assertEqual(vo_ve_bin.decode_values(bytes(buf), 0, 2, 'f32'), [1.5, -2.25])
+
+    def test_out_of_bounds(self):
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.decode_values(bytes(10), 8, 2, 'u16')
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.encode_values(bytearray(10), 9, [1.0], 'u16')
+
+    def test_out_of_range_value(self):
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.encode_values(bytearray(2), 0, [300.0], 'u8')
+
+    def test_bad_values(self):
+        for value in (None, float('nan'), float('inf')):
+            with self.assertRaises(engine.ConversionError):
+                vo_ve_bin.encode_values(bytearray(2), 0, [value], 'u16')
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.encode_values(bytearray(2), 0, [1.0], 'u16', scale=0)
+
+
+class BinImageTest(BinTestCase):
+    def vo_table(self, row_major=True):
+        return vo_ve_bin.TableDef(
+            'vo', 0x40, 8, 12, element='u16', scale=0.1,
+            x_axis=vo_ve_bin.AxisDef(0x00, 12, element='u16'),
+            y_axis=vo_ve_bin.AxisDef(0x18, 8, element='u8'),
+            row_major=row_major,
+        )
+
+    def synthetic_image(self, row_major=True):
+        data = bytearray(0x200)
+        struct.pack_into('<12H', data, 0x00, *X_AXIS)
+        struct.pack_into('<8B', data, 0x18, *Y_AXIS)
+        grid = vo_grid()
+        if row_major:
+            flat = [v for row in grid for v in row]
+        else:
+            flat = [grid[r][c] for c in range(12) for r in range(8)]
+        struct.pack_into('<96H', data, 0x40, *(v * 10 for v in flat))
+        return self.image(bytes(data))
+
+    def test_read_table(self):
+        path = self.synthetic_image()
+        with vo_ve_bin.BinImage(path) as image:
+            x_values, y_values, grid = image.read_table(self.vo_table())
+        self.assertEqual(x_values, X_AXIS)
+        self.assertEqual(y_values, Y_AXIS)
+        self.assertEqual(grid, vo_grid())
+
+    def test_column_major(self):
+        path = self.synthetic_image(row_major=False)
+        with vo_ve_bin.BinImage(path) as image:
+            _, _, grid = image.read_table(self.vo_table(row_major=False))
+        self.assertEqual(grid, vo_grid())
+
+    def test_write_table_round_trip(self):
+        path = self.synthetic_image(row_major=False)
+        table = self.vo_table(row_major=False)
+        new_grid = [[v + 0.5 for v in row] for row in vo_grid()]
+        with vo_ve_bin.BinImage(path, writable=True) as image:
+            image.write_table(table, new_grid)
+        with vo_ve_bin.BinImage(path) as image:
+            self.assertEqual(image.read_table(table)[2], new_grid)
+
+    def test_read_only_image(self):
+        path = self.synthetic_image()
+        with vo_ve_bin.BinImage(path) as image:
+            with self.assertRaises(engine.ConversionError):
+                image.write_table(self.vo_table(), vo_grid())
+
+    def test_table_outside_image(self):
+        path = self.image(bytes(0x50))
+        with vo_ve_bin.BinImage(path) as image:
+            with self.assertRaises(engine.ConversionError):
+                image.read_table(self.vo_table())
+
+    def test_empty_image(self):
+        path = self.image(b'')
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.BinImage(path)
+
+    def test_convert_bin(self):
+        path = self.synthetic_image()
+        out_path = os.path.join(self.tmp, 'out.bin')
+        ve_table = vo_ve_bin.TableDef(
+            've', 0x100, 16, 16, element='u16', scale=0.001,
+            x_axis=vo_ve_bin.AxisDef(0x300, 16, element='u16'),
+            y_axis=vo_ve_bin.AxisDef(0x320, 16, element='u16'),
+        )
+        data = bytearray(open(path, 'rb').read())
+        data.extend(bytes(0x200))
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        result = vo_ve_bin.convert_bin(path, self.vo_table(), ve_table, 2.8, 25, out_path=out_path)
+        with vo_ve_bin.BinImage(out_path) as image:
+            new_x, new_y, grid = image.read_table(ve_table)
+        self.assertEqual(new_x, [round(v) for v in result.new_x])
+        for row, expected in zip(grid, result.ve_grid):
+            for value, ve in zip(row, expected):
+                self.assertAlmostEqual(value, ve, delta=0.0005 + 1e-9)
+
+
+class DefinitionsTest(unittest.TestCase):
+    def test_dict_round_trip(self):
+        table = vo_ve_bin.table_from_dict('vo', {
+            'address': '0x1234', 'rows': 8, 'cols': 12, 'element': 'u16', 'scale': 0.01,
+            'endian': '>', 'x_axis': {'address': '0x1200'}, 'y_axis': {'values': Y_AXIS},
+        })
+        again = vo_ve_bin.table_from_dict('vo', vo_ve_bin.table_to_dict(table))
+        self.assertEqual(vo_ve_bin.table_to_dict(again), vo_ve_bin.table_to_dict(table))
+        self.assertEqual(again.x_axis.endian, '>')
+        self.assertEqual(again.y_axis.values, [float(v) for v in Y_AXIS])
+
+    def test_invalid_definition(self):
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.table_from_dict('vo', {'address': '0x10', 'rows': 8})
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_bin.table_from_dict('vo', {'address': '0x10', 'rows': 8, 'cols': 12,
+                                             'element': 'u24'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Tests for the persistent result cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import vo_ve_cache
+import vo_ve_engine as engine
+
+X_AXIS = [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6000, 7000]
+Y_AXIS = [20, 30, 40, 50, 60, 70, 85, 100]
+
+
+def vo_grid(offset=0):
+    return [[40 + 10 * r + c + offset for c in range(12)] for r in range(8)]
+
+
+class ResultKeyTest(unittest.TestCase):
+    def key(self, **kwargs):
+        args = dict(x_values=X_AXIS, y_values=Y_AXIS, grid=vo_grid(), displacement=2.8, iat=25)
+        args.update(kwargs)
+        return vo_ve_cache.result_key(**args)
+
+    def test_equivalent_inputs(self):
+        key = self.key()
+        self.assertEqual(key, self.key())
+        self.assertEqual(key, self.key(x_values=[float(v) for v in X_AXIS],
+                                       grid=[[float(v) for v in row] for row in vo_grid()]))
+        self.assertEqual(key, self.key(y_values=[str(v) for v in Y_AXIS], displacement='2.8'))
+        self.assertEqual(key, self.key(iat=engine.ConstantIat(25.0)))
+        self.assertEqual(key, self.key(layout=engine.DEFAULT_LAYOUT, kernel='bilinear'))
+        self.assertEqual(key, self.key(kernel=engine.get_resampler(None)))
+
+    def test_every_setting_changes_the_key(self):
+        grid = vo_grid()
+        grid[3][4] += 0.001
+        x_values = list(X_AXIS)
+        x_values[5] += 1
+        variants = [
+            {'grid': grid},
+            {'x_values': x_values},
+            {'y_values': Y_AXIS[:-1] + [105]},
+            {'displacement': 2.9},
+            {'iat': 26},
+            {'iat': engine.ChargeTemperature(25, 90)},
+            {'layout': engine.TargetLayout(x_method='uniform')},
+            {'layout': engine.TargetLayout(12, 16)},
+            {'kernel': 'pchip'},
+            {'kernel': engine.SplineResampler(0.5)},
+            {'relaxation': engine.Relaxation()},
+            {'relaxation': engine.Relaxation(method='sor')},
+            {'relaxation': engine.Relaxation(tolerance=1e-3)},
+        ]
+        keys = {self.key()}
+        for variant in variants:
+            keys.add(self.key(**variant))
+        self.assertEqual(len(keys), len(variants) + 1)
+        with mock.patch.object(engine, 'ENGINE_VERSION', engine.ENGINE_VERSION + 1):
+            self.assertNotIn(self.key(), keys)
+
+    def test_misshapen_input(self):
+        with self.assertRaises(engine.ConversionError):
+            self.key(grid=vo_grid()[:-1])
+        with self.assertRaises(engine.ConversionError):
+            self.key(displacement=0)
+
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def cache(self, max_bytes=vo_ve_cache.DEFAULT_MAX_BYTES):
+        return vo_ve_cache.ResultCache(os.path.join(self.tmp, 'results'), max_bytes)
+
+
+class ResultCacheTest(CacheTestCase):
+    def test_round_trip(self):
+        cache = self.cache()
+        first = cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25, relaxation=engine.Relaxation())
+        second = cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25, relaxation=engine.Relaxation())
+        self.assertFalse(first.cached)
+        self.assertTrue(second.cached)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(second.vo_grid, first.vo_grid)
+        self.assertEqual(second.ve_grid, first.ve_grid)
+        self.assertEqual((second.new_x, second.new_y), (first.new_x, first.new_y))
+        self.assertEqual(second.mode, first.mode)
+        self.assertEqual(second.relaxation.iterations, first.relaxation.iterations)
+        self.assertEqual(second.relaxation.converged, first.relaxation.converged)
+
+    def test_eviction_keeps_the_bound(self):
+        result = engine.convert_map(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+        entry_size = len(vo_ve_cache.encode_result(result))
+        cache = self.cache(max_bytes=entry_size * 4)
+        for i in range(10):
+            cache.put(f"{i:064x}", result)
+            # Distinct mtimes, oldest first, whatever the file system resolution
+            os.utime(cache._path(f"{i:064x}"), (1000 + i, 1000 + i))
+            self.assertLessEqual(cache.size(), cache.max_bytes)
+
+        survivors = sorted(os.listdir(cache.directory))
+        self.assertTrue(survivors)
+        self.assertIn(f"{9:064x}{vo_ve_cache.ENTRY_SUFFIX}", survivors)
+        self.assertNotIn(f"{0:064x}{vo_ve_cache.ENTRY_SUFFIX}", survivors)
+
+    def test_hit_refreshes_entry(self):
+        result = engine.convert_map(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+        entry_size = len(vo_ve_cache.encode_result(result))
+        cache = self.cache(max_bytes=entry_size * 3)
+        for i, key in enumerate(('a' * 64, 'b' * 64, 'c' * 64)):
+            cache.put(key, result)
+            os.utime(cache._path(key), (1000 + i, 1000 + i))
+        self.assertIsNotNone(cache.get('a' * 64))
+        cache.put('d' * 64, result)
+        self.assertIsNotNone(cache.get('a' * 64))
+        self.assertIsNone(cache.get('b' * 64))
+
+    def test_damaged_entries_are_misses(self):
+        cache = self.cache()
+        result = cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+        key = vo_ve_cache.result_key(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+        path = cache._path(key)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        for damaged in (b'', data[:10], data[:-8], b'XXXX' + data[4:], data + b'\0'):
+            with open(path, 'wb') as f:
+                f.write(damaged)
+            self.assertIsNone(cache.get(key))
+            again = cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+            self.assertFalse(again.cached)
+            self.assertEqual(again.ve_grid, result.ve_grid)
+            self.assertTrue(cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25).cached)
+        self.assertIsNone(cache.get('f' * 64))
+
+    def test_unwritable_cache_is_skipped(self):
+        blocker = os.path.join(self.tmp, 'results')
+        with open(blocker, 'w') as f:
+            f.write('not a directory')
+        cache = self.cache()
+        result = cache.convert(X_AXIS, Y_AXIS, vo_grid(), 2.8, 25)
+        self.assertFalse(result.cached)
+        self.assertEqual(cache.misses, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
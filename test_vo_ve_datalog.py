@@ -0,0 +1,83 @@
+"""Tests for the datalog VE correction on vo_ve_cli output."""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import vo_ve_cli
+import vo_ve_datalog
+import vo_ve_engine as engine
+import vo_ve_tsv
+
+# The MS4x extension pads the 16-point RPM axis with two more 7000 breakpoints
+X_AXIS = [500, 1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500, 5000, 6000, 7000]
+Y_AXIS = [20, 30, 40, 50, 60, 70, 85, 100]
+
+
+def quiet(main, argv):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return main(argv)
+
+
+class CliOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        grid = [[40 + 10 * r + c for c in range(12)] for r in range(8)]
+        vo_ve_tsv.write_table(os.path.join(self.tmp, 'car.tsv'), grid, X_AXIS, Y_AXIS)
+        self.assertEqual(quiet(vo_ve_cli.main, [
+            os.path.join(self.tmp, 'car.tsv'), '-o', self.tmp, '--displacement', '2.8',
+            '--iat', '25', '--no-cache',
+        ]), 0)
+        self.ve_path = os.path.join(self.tmp, 'car_ve16.tsv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_padded_axis_is_read(self):
+        new_x, new_y, grid = vo_ve_datalog.read_base_table(self.ve_path)
+        self.assertEqual(new_x[-4:], [6500.0, 7000.0, 7000.0, 7000.0])
+        self.assertEqual((len(new_y), len(new_x)), (16, 16))
+        self.assertTrue(all(v is not None for row in grid for v in row))
+
+    def test_datalog_on_cli_output(self):
+        log_path = os.path.join(self.tmp, 'log.csv')
+        with open(log_path, 'w', encoding='utf-8') as f:
+            f.write("RPM,MAP,Lambda\n")
+            for _ in range(20):
+                f.write("7000,60,1.1\n")
+        out_path = os.path.join(self.tmp, 'corrected.tsv')
+        self.assertEqual(quiet(vo_ve_datalog.main, [self.ve_path, log_path, '-o', out_path]), 0)
+
+        new_x, new_y, base = vo_ve_datalog.read_base_table(self.ve_path)
+        _, _, corrected = vo_ve_datalog.read_base_table(out_path)
+        # Samples at the last breakpoint land in the last (padding) column
+        r, c = new_y.index(60.0), len(new_x) - 1
+        self.assertAlmostEqual(corrected[r][c], base[r][c] * 1.1, places=3)
+
+    def test_cli_output_as_iat_map(self):
+        with open(self.ve_path, encoding='utf-8') as f:
+            text = f.read()
+        table = vo_ve_tsv.parse_block(text)
+        iat_path = os.path.join(self.tmp, 'iat.tsv')
+        vo_ve_tsv.write_table(iat_path, [[30.0] * table.cols for _ in range(table.rows)],
+                              table.x_values, table.y_values)
+        iat_map = vo_ve_cli.read_iat_map(iat_path)
+        self.assertEqual(len(iat_map.x_values), 14)
+        surface = iat_map.surface(table.x_values, table.y_values)
+        self.assertTrue(all(t == 30.0 for row in surface for t in row))
+
+
+class PaddedIatMapTest(unittest.TestCase):
+    def test_padding_is_dropped(self):
+        iat_map = engine.IatMap([1000, 7000, 7000], [50, 100], [[20, 40, 99], [30, 50, 99]])
+        self.assertEqual(iat_map.x_values, (1000.0, 7000.0))
+        self.assertEqual(iat_map.grid, ((20.0, 40.0), (30.0, 50.0)))
+        with self.assertRaises(engine.ConversionError):
+            engine.IatMap([1000, 7000, 7000], [50, 100], [[20, 40], [30, 50]])
+
+
+if __name__ == '__main__':
+    unittest.main()
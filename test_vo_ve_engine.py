@@ -0,0 +1,286 @@
+"""Baseline equivalence tests for the conversion engine."""
+
+import random
+import unittest
+
+import vo_ve_bench
+import vo_ve_engine as engine
+
+# Largest difference allowed between two paths computing the same map
+TOLERANCE = 1e-9
+
+
+def max_diff(a, b):
+    return max(abs(x - y) for row_a, row_b in zip(a, b) for x, y in zip(row_a, row_b))
+
+
+def cases():
+    """(x_values, y_values, grid) for every RPM/MAP axis preset of the benchmarks."""
+    rng = random.Random(7)
+    for x_values in vo_ve_bench.X_AXES.values():
+        for y_values in vo_ve_bench.Y_AXES.values():
+            yield x_values, y_values, vo_ve_bench.synthetic_map(x_values, y_values, rng)
+
+
+class InterpolationTest(unittest.TestCase):
+    def test_plan_matches_direct(self):
+        for x_values, y_values, grid in cases():
+            new_x = engine.extend_x_axis(x_values)
+            new_y = engine.extend_y_axis(y_values)
+            direct = engine.interpolate_grid_direct(x_values, y_values, grid, new_x, new_y)
+            planned = engine.interpolate_grid(x_values, y_values, grid, new_x, new_y,
+                                              use_numpy=False)
+            self.assertLess(max_diff(planned, direct), TOLERANCE)
+
+    def test_original_points_pinned(self):
+        for x_values, y_values, grid in cases():
+            new_x = engine.extend_x_axis(x_values)
+            new_y = engine.extend_y_axis(y_values)
+            vo_grid = engine.interpolate_grid(x_values, y_values, grid, new_x, new_y)
+            _, points = engine.build_fixed_mask(x_values, y_values, new_x, new_y)
+            self.assertTrue(points)
+            for r_new, c_new, r_old, c_old in points:
+                self.assertAlmostEqual(vo_grid[r_new][c_new], grid[r_old][c_old], delta=TOLERANCE)
+
+
+@unittest.skipIf(engine.load_numpy() is None, "NumPy is not installed")
+class NumpyPathTest(unittest.TestCase):
+    def test_numpy_matches_python(self):
+        for kernel in engine.RESAMPLERS:
+            for x_values, y_values, grid in cases():
+                new_x = engine.extend_x_axis(x_values)
+                new_y = engine.extend_y_axis(y_values)
+                fast = engine.interpolate_grid(x_values, y_values, grid, new_x, new_y,
+                                               use_numpy=True, kernel=kernel)
+                slow = engine.interpolate_grid(x_values, y_values, grid, new_x, new_y,
+                                               use_numpy=False, kernel=kernel)
+                self.assertLess(max_diff(fast, slow), TOLERANCE, kernel)
+
+    def test_large_layout(self):
+        x_values = engine.uniform_axis(500, 7000, 48)
+        y_values = engine.uniform_axis(20, 100, 48)
+        grid = vo_ve_bench.synthetic_map(x_values, y_values, random.Random(3))
+        new_x = engine.uniform_axis(400, 7200, 64)
+        new_y = engine.uniform_axis(10, 110, 64)
+        fast = engine.get_plan(x_values, y_values, new_x, new_y, use_numpy=True)
+        slow = engine.get_plan(x_values, y_values, new_x, new_y, use_numpy=False)
+        self.assertEqual(fast.terms(), slow.terms())
+        self.assertLess(max_diff(fast.apply(grid), slow.apply(grid)), TOLERANCE)
+
+
+class ConversionTest(unittest.TestCase):
+    def test_ve_round_trip(self):
+        for x_values, y_values, grid in cases():
+            result = engine.convert_map(x_values, y_values, grid, 2.8, 25)
+            report = engine.verify_roundtrip(result.vo_grid, result.new_x, result.new_y, 2.8, 25)
+            self.assertTrue(report.passed(TOLERANCE))
+
+    def test_round_trip_worst_cells(self):
+        x_values, y_values, grid = next(cases())
+        result = engine.convert_map(x_values, y_values, grid, 2.8, 25)
+        report = engine.verify_roundtrip(result.vo_grid, result.new_x, result.new_y, 2.8, 25,
+                                         decimals=3)
+        r, c = report.worst_rel_cell
+        vo = result.vo_grid[r][c]
+        ve = round(result.ve_grid[r][c], 3)
+        back = engine.convert_ve_to_vo([[ve]], [result.new_x[c]], [result.new_y[r]], 2.8, 25)[0][0]
+        self.assertAlmostEqual(abs(back - vo) / vo, report.max_rel)
+
+    def test_invalid_grid(self):
+        x_values, y_values, grid = next(cases())
+        with self.assertRaises(engine.ConversionError):
+            engine.convert_map(x_values, y_values, grid[:-1], 2.8, 25)
+        with self.assertRaises(engine.ConversionError):
+            engine.convert_map(x_values, y_values, grid, 0, 25)
+
+
+
+class RelaxationTest(unittest.TestCase):
+    def interpolated(self):
+        """(interpolated grid, fixed mask) of every benchmark case, without smoothing passes."""
+        for x_values, y_values, grid in cases():
+            new_x = engine.extend_x_axis(x_values)
+            new_y = engine.extend_y_axis(y_values)
+            plan = engine.get_plan(x_values, y_values, new_x, new_y, iterations=0)
+            yield plan.apply(grid), plan.fixed_mask
+
+    def test_pinned_cells_keep_their_values(self):
+        for grid, fixed_mask in self.interpolated():
+            for method in engine.RELAX_METHODS:
+                relaxed = engine.Relaxation(method=method).solve(grid, fixed_mask)
+                for r, row in enumerate(fixed_mask):
+                    for c, fixed in enumerate(row):
+                        if fixed:
+                            self.assertEqual(relaxed.grid[r][c], grid[r][c])
+                self.assertNotEqual(relaxed.grid, grid)
+
+    def test_sor_matches_gauss_seidel(self):
+        tolerance = 1e-10
+        for grid, fixed_mask in self.interpolated():
+            gauss_seidel = engine.Relaxation(tolerance=tolerance).solve(grid, fixed_mask)
+            sor = engine.Relaxation(method='sor', tolerance=tolerance).solve(grid, fixed_mask)
+            self.assertTrue(gauss_seidel.converged and sor.converged)
+            self.assertLess(max_diff(sor.grid, gauss_seidel.grid), 1e-7)
+
+    def test_solution_satisfies_equation(self):
+        grid, fixed_mask = next(self.interpolated())
+        relaxation = engine.Relaxation(tolerance=1e-12)
+        v = relaxation.solve(grid, fixed_mask).grid
+        rows, cols = len(v), len(v[0])
+        for r in range(rows):
+            for c in range(cols):
+                if fixed_mask[r][c]:
+                    continue
+                total = v[r][c] - grid[r][c]
+                for rr, cc, strength in ((r - 1, c, relaxation.strength_y),
+                                         (r + 1, c, relaxation.strength_y),
+                                         (r, c - 1, relaxation.strength_x),
+                                         (r, c + 1, relaxation.strength_x)):
+                    if 0 <= rr < rows and 0 <= cc < cols:
+                        total += strength * (v[r][c] - v[rr][cc])
+                self.assertAlmostEqual(total, 0.0, delta=1e-9)
+
+    def test_reported_state(self):
+        grid, fixed_mask = next(self.interpolated())
+        relaxation = engine.Relaxation(tolerance=1e-6)
+        result = relaxation.solve(grid, fixed_mask)
+        self.assertTrue(result.converged)
+        self.assertLessEqual(result.residual, relaxation.tolerance)
+        self.assertGreater(result.iterations, 1)
+        self.assertLess(result.iterations, relaxation.max_iterations)
+
+        limited = engine.Relaxation(tolerance=1e-12, max_iterations=3).solve(grid, fixed_mask)
+        self.assertFalse(limited.converged)
+        self.assertEqual(limited.iterations, 3)
+        self.assertGreater(limited.residual, 1e-12)
+
+    def test_input_not_modified(self):
+        grid, fixed_mask = next(self.interpolated())
+        copy = [row[:] for row in grid]
+        engine.Relaxation().solve(grid, fixed_mask)
+        self.assertEqual(grid, copy)
+
+    def test_invalid_settings(self):
+        for kwargs in ({'method': 'jacobi'}, {'strength_x': -1}, {'method': 'sor', 'omega': 2},
+                       {'tolerance': 0}, {'max_iterations': 0}):
+            with self.assertRaises(engine.ConversionError):
+                engine.Relaxation(**kwargs)
+
+
+class CountingIat(engine.ConstantIat):
+    """ConstantIat that counts its evaluations."""
+
+    calls = 0
+
+    def evaluate(self, new_x, new_y):
+        CountingIat.calls += 1
+        return super().evaluate(new_x, new_y)
+
+
+class IatModelTest(unittest.TestCase):
+    def setUp(self):
+        engine.clear_surface_cache()
+        CountingIat.calls = 0
+
+    def test_constant_map_matches_scalar(self):
+        for x_values, y_values, grid in cases():
+            iat_map = engine.IatMap([500, 3000, 8000], [10, 100, 250], [[25.0] * 3] * 3)
+            scalar = engine.convert_map(x_values, y_values, grid, 2.8, 25)
+            mapped = engine.convert_map(x_values, y_values, grid, 2.8, iat_map)
+            self.assertEqual(mapped.vo_grid, scalar.vo_grid)
+            self.assertLess(max_diff(mapped.ve_grid, scalar.ve_grid), TOLERANCE)
+
+    def test_map_interpolates(self):
+        iat_map = engine.IatMap([1000, 5000], [20, 100], [[20, 40], [30, 50]])
+        surface = iat_map.surface([1000, 3000, 5000, 9000], [20, 60, 100])
+        self.assertEqual(surface[0], (20.0, 30.0, 40.0, 40.0))
+        self.assertEqual(surface[1], (25.0, 35.0, 45.0, 45.0))
+        self.assertEqual(surface[2], (30.0, 40.0, 50.0, 50.0))
+
+    def test_charge_temperature_bias(self):
+        model = engine.ChargeTemperature(20, 90, bias_max=0.5, bias_min=0.1)
+        surface = model.surface([0, 3500, 7000], [0, 50, 100])
+        # No airflow: half of the way to coolant; full airflow: a tenth of it
+        self.assertAlmostEqual(surface[0][0], 20 + 0.5 * 70)
+        self.assertAlmostEqual(surface[2][2], 20 + 0.1 * 70)
+        self.assertAlmostEqual(surface[1][1], 20 + (0.5 - 0.4 * 0.25) * 70)
+        values = [t for row in surface for t in row]
+        self.assertEqual(max(values), surface[0][0])
+        self.assertEqual(min(values), surface[2][2])
+        for row in surface:
+            self.assertEqual(list(row), sorted(row, reverse=True))
+
+        capped = engine.ChargeTemperature(20, 90, flow_reference=1000.0).surface([7000], [100])
+        self.assertAlmostEqual(capped[0][0], 20 + engine.CHARGE_BIAS_MIN * 70)
+
+    def test_surfaces_cached_per_model_and_axes(self):
+        new_x, new_y = (1000.0, 2000.0), (50.0, 100.0)
+        first = CountingIat(25).surface(new_x, new_y)
+        self.assertIs(CountingIat(25).surface(list(new_x), list(new_y)), first)
+        self.assertEqual(CountingIat.calls, 1)
+        CountingIat(25).surface(new_x, (50.0, 110.0))
+        self.assertEqual(CountingIat.calls, 2)
+        CountingIat(30).surface(new_x, new_y)
+        self.assertEqual(CountingIat.calls, 3)
+        engine.clear_surface_cache()
+        CountingIat(25).surface(new_x, new_y)
+        self.assertEqual(CountingIat.calls, 4)
+
+    def test_invalid_temperatures(self):
+        with self.assertRaises(engine.ConversionError):
+            engine.IatMap([1000], [50], [[-300]])
+        with self.assertRaises(engine.ConversionError):
+            engine.ChargeTemperature(20, 90, bias_max=1.5)
+        with self.assertRaises(engine.ConversionError):
+            engine.convert_map(*next(cases()), 2.8, -273.15)
+
+
+@unittest.skipIf(engine.load_numpy() is None, "NumPy is not installed")
+class VeBatchTest(unittest.TestCase):
+    DISPLACEMENTS = (1.6, 2.8, 4.4)
+    IATS = (-20.0, 25.0, 60.0)
+
+    def grids(self):
+        for x_values, y_values, grid in cases():
+            result = engine.convert_map(x_values, y_values, grid, 2.8, 25)
+            yield result.new_x, result.new_y, result.vo_grid
+
+    def test_calculate_ve_batch(self):
+        for new_x, new_y, vo_grid in self.grids():
+            batch = engine.calculate_ve_batch([vo_grid, vo_grid], new_y, self.DISPLACEMENTS,
+                                              self.IATS)
+            self.assertEqual(batch.shape, (2, 3, 3, len(new_y), len(new_x)))
+            for d, displacement in enumerate(self.DISPLACEMENTS):
+                for i, iat in enumerate(self.IATS):
+                    ve_grid = engine.calculate_ve(vo_grid, new_x, new_y, displacement, iat)
+                    self.assertLess(max_diff(batch[1, d, i].tolist(), ve_grid), TOLERANCE)
+
+    def test_convert_ve_to_vo_batch(self):
+        for new_x, new_y, vo_grid in self.grids():
+            ve_grid = engine.calculate_ve(vo_grid, new_x, new_y, 2.8, 25)
+            batch = engine.convert_ve_to_vo_batch(ve_grid, new_y, self.DISPLACEMENTS, self.IATS)
+            for d, displacement in enumerate(self.DISPLACEMENTS):
+                for i, iat in enumerate(self.IATS):
+                    expected = engine.convert_ve_to_vo(ve_grid, new_x, new_y, displacement, iat)
+                    self.assertLess(max_diff(batch[0, d, i].tolist(), expected), TOLERANCE)
+            round_trip = engine.convert_ve_to_vo_batch(
+                engine.calculate_ve_batch(vo_grid, new_y, 2.8, 25)[0, 0], new_y, 2.8, 25)
+            self.assertLess(max_diff(round_trip[0, 0, 0].tolist(), vo_grid), TOLERANCE)
+
+    def test_zero_map_row_is_nan(self):
+        batch = engine.calculate_ve_batch([[1.0, 2.0], [3.0, 4.0]], [0, 50], 2.8, 25)
+        self.assertTrue(all(v != v for v in batch[0, 0, 0, 0]))
+        self.assertEqual(engine.calculate_ve([[1.0, 2.0]], [1000, 2000], [0], 2.8, 25),
+                         [[None, None]])
+
+    def test_invalid_parameters(self):
+        grid = [[1.0, 2.0]]
+        for displacements, iats in ((0, 25), ([2.8, -1.0], 25), (2.8, -273.15), (2.8, [25, -300]),
+                                    (float('nan'), 25), ('x', 25)):
+            for batch in (engine.calculate_ve_batch, engine.convert_ve_to_vo_batch):
+                with self.assertRaises(engine.ConversionError):
+                    batch(grid, [50], displacements, iats)
+
+
+if __name__ == '__main__':
+    unittest.main()
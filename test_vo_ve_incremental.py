@@ -0,0 +1,46 @@
+"""IncrementalConverter must match a full convert_map() after every update."""
+
+import random
+import unittest
+
+import vo_ve_engine as engine
+from test_vo_ve_engine import TOLERANCE, cases, max_diff
+from vo_ve_incremental import IncrementalConverter
+
+
+class IncrementalTest(unittest.TestCase):
+    def assert_matches(self, live, x_values, y_values, grid, displacement, iat, **kwargs):
+        result = engine.convert_map(x_values, y_values, grid, displacement, iat, **kwargs)
+        self.assertEqual(live.new_x, result.new_x)
+        self.assertEqual(live.new_y, result.new_y)
+        self.assertLess(max_diff(live.vo_grid, result.vo_grid), TOLERANCE)
+        self.assertLess(max_diff(live.ve_grid, result.ve_grid), TOLERANCE)
+
+    def test_matches_convert_map(self):
+        rng = random.Random(11)
+        for kernel in ('bilinear', 'pchip'):
+            for x_values, y_values, grid in cases():
+                grid = [row[:] for row in grid]
+                live = IncrementalConverter(x_values, y_values, grid, 2.8, 25, kernel=kernel)
+                self.assert_matches(live, x_values, y_values, grid, 2.8, 25, kernel=kernel)
+
+                for _ in range(5):
+                    r, c = rng.randrange(len(grid)), rng.randrange(len(grid[0]))
+                    grid[r][c] += rng.uniform(-20, 20)
+                    live.set_cell(r, c, grid[r][c])
+                self.assert_matches(live, x_values, y_values, grid, 2.8, 25, kernel=kernel)
+
+                live.set_parameters(3.0, 40)
+                self.assert_matches(live, x_values, y_values, grid, 3.0, 40, kernel=kernel)
+
+    def test_axis_edit(self):
+        x_values, y_values, grid = next(cases())
+        live = IncrementalConverter(x_values, y_values, grid, 2.8, 25)
+        x_values = list(x_values)
+        x_values[3] += 100
+        live.set_axis_value('x', 3, x_values[3])
+        self.assert_matches(live, x_values, y_values, grid, 2.8, 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
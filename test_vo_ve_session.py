@@ -0,0 +1,83 @@
+"""Tests for session and workspace files."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import vo_ve_engine as engine
+import vo_ve_session
+from vo_ve_model import TableModel
+
+X_AXIS = [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6000, 7000]
+Y_AXIS = [20, 30, 40, 50, 60, 70, 85, 100]
+
+
+def model(x_values, y_values, grid):
+    table = TableModel(len(y_values), len(x_values))
+    table.set_axis('x', x_values)
+    table.set_axis('y', y_values)
+    table.set_grid(grid)
+    return table
+
+
+def session(name, iat=25.0, **kwargs):
+    grid = [[40 + 10.123 * r + c for c in range(12)] for r in range(8)]
+    result = engine.convert_map(X_AXIS, Y_AXIS, grid, 2.8, iat)
+    return vo_ve_session.Session(
+        name, model(X_AXIS, Y_AXIS, grid), model(result.new_x, result.new_y, result.vo_grid),
+        model(result.new_x, result.new_y, result.ve_grid), 2.8, iat, **kwargs
+    )
+
+
+class SessionFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'car.vove')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        saved = session('base', kernel=engine.SplineResampler(0.05),
+                        relaxation=engine.Relaxation(method='sor'))
+        saved.source.set(0, 0, None)
+        vo_ve_session.save_session(self.path, saved)
+        loaded = vo_ve_session.load_session(self.path)
+        for name, table in saved.tables():
+            other = getattr(loaded, name)
+            self.assertEqual(other.grid(), table.grid())
+            self.assertEqual(other.axis('x'), table.axis('x'))
+            self.assertEqual(other.axis('y'), table.axis('y'))
+        self.assertIsNone(loaded.source.get(0, 0))
+        self.assertEqual(loaded.kernel, saved.kernel)
+        self.assertEqual(loaded.relaxation.key(), saved.relaxation.key())
+        self.assertEqual((loaded.displacement, loaded.iat), (2.8, 25.0))
+
+    def test_workspace_append_and_lazy_load(self):
+        vo_ve_session.append_session(self.path, session('first'))
+        vo_ve_session.append_session(self.path, session('second', iat=40.0))
+        with vo_ve_session.Workspace(self.path) as workspace:
+            self.assertEqual(workspace.names(), ['first', 'second'])
+            self.assertEqual(workspace.entries[1]['iat'], 40.0)
+            self.assertEqual(workspace.load('second').ve.grid(), session('x', iat=40.0).ve.grid())
+            self.assertEqual(workspace.load(0).iat, 25.0)
+
+    def test_not_a_session_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'hello')
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_session.Workspace(self.path)
+
+    def test_invalid_entry(self):
+        entry = {'name': 'a', 'tables': [{'name': 'source', 'rows': 'x', 'cols': 2}], 'layout': {}}
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_session.Session.from_entry(entry, b'')
+        entry = session('a').encode_block()[0]
+        entry['layout']['x_method'] = 'spiral'
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_session.Session.from_entry(entry, session('a').encode_block()[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
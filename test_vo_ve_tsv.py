@@ -0,0 +1,127 @@
+"""Tests for vo_ve_tsv table parsing and formatting."""
+
+import unittest
+
+import vo_ve_engine as engine
+import vo_ve_tsv
+
+
+class DelimiterTest(unittest.TestCase):
+    def test_detect_delimiter(self):
+        for lines, expected in ((['1\t2', '3\t4'], '\t'), (['1;2', '3;4'], ';'),
+                                (['1,2,3', '4,5,6'], ','), (['1 2', '3  4'], vo_ve_tsv.WHITESPACE),
+                                (['1,5 2,5', '3,5 4,5'], vo_ve_tsv.WHITESPACE),
+                                (['85,5', '90,5'], vo_ve_tsv.WHITESPACE)):
+            self.assertEqual(vo_ve_tsv.detect_delimiter(lines), expected, lines)
+
+    def test_delimiters_parse_alike(self):
+        for text in ('1\t2\n3\t4', '1;2\n3;4', '1.0,2\n3,4', '1 2\n3   4', ' 1 ;  2 \n3; 4'):
+            self.assertEqual(vo_ve_tsv.parse_block(text).grid(), [[1, 2], [3, 4]], text)
+
+    def test_windows_line_endings(self):
+        self.assertEqual(vo_ve_tsv.parse_block('1\t2\r\n3\t4\r\n').grid(), [[1, 2], [3, 4]])
+
+
+class DecimalTest(unittest.TestCase):
+    def test_decimal_comma(self):
+        table = vo_ve_tsv.parse_block('1,5\t2,25\n3\t4,75')
+        self.assertEqual(table.decimal, ',')
+        self.assertEqual(table.grid(), [[1.5, 2.25], [3, 4.75]])
+
+    def test_dot_thousands_with_decimal_comma(self):
+        table = vo_ve_tsv.parse_block('1.234,5;2\n3;4')
+        self.assertEqual(table.grid(), [[1234.5, 2], [3, 4]])
+
+    def test_comma_thousands(self):
+        table = vo_ve_tsv.parse_block('1,234.5\t2\n3\t4')
+        self.assertEqual(table.decimal, '.')
+        self.assertEqual(table.grid(), [[1234.5, 2], [3, 4]])
+
+
+class AxisDetectionTest(unittest.TestCase):
+    def test_blank_corner(self):
+        table = vo_ve_tsv.parse_block('\t1000\t2000\n20\t1\t2\n40\t3\t4')
+        self.assertEqual((table.x_values, table.y_values), ([1000, 2000], [20, 40]))
+        self.assertEqual(table.grid(), [[1, 2], [3, 4]])
+
+    def test_text_corner_and_short_header(self):
+        for text in ('MAP/RPM\t1000\t2000\n20\t1\t2\n40\t3\t4',
+                     '1000\t2000\n20\t1\t2\n40\t3\t4'):
+            table = vo_ve_tsv.parse_block(text)
+            self.assertEqual(table.x_values, [1000, 2000], text)
+            self.assertEqual((table.rows, table.cols), (2, 2))
+
+    def test_padded_axis(self):
+        table = vo_ve_tsv.parse_block('\t6500\t7000\t7000\n20\t1\t2\t2\n40\t3\t4\t4')
+        self.assertEqual(table.x_values, [6500, 7000, 7000])
+
+    def test_not_monotonic_is_data(self):
+        table = vo_ve_tsv.parse_block('\t2000\t1000\t1500\n20\t1\t2\t3\n40\t3\t4\t5')
+        self.assertFalse(table.has_axes)
+        self.assertEqual(table.get(0, 0), None)
+
+    def test_shape_forces_data(self):
+        table = vo_ve_tsv.parse_block('1000\t2000\n20\t1\n40\t3', shape=(3, 2))
+        self.assertFalse(table.has_axes)
+
+    def test_title_lines(self):
+        table = vo_ve_tsv.parse_block('VE table\nkPa vs rpm\n\t1000\t2000\n20\t1\t2\n40\t3\t4')
+        self.assertEqual(table.y_values, [20, 40])
+
+
+class BlankLinesTest(unittest.TestCase):
+    def test_interior_blank_rows_are_kept(self):
+        for text in ('1\t2\n\t\n3\t4', '1\t2\n\n3\t4', '1;2\n;\n3;4'):
+            self.assertEqual(vo_ve_tsv.parse_block(text).grid(), [[1, 2], [None, None], [3, 4]],
+                             repr(text))
+
+    def test_outer_blank_lines_are_trimmed(self):
+        table = vo_ve_tsv.parse_block('\n\t\n1\t2\n3\t4\n\t\n\n')
+        self.assertEqual(table.grid(), [[1, 2], [3, 4]])
+
+    def test_blank_row_not_allowed(self):
+        with self.assertRaisesRegex(engine.ConversionError, "line 2, column 1"):
+            vo_ve_tsv.parse_block('1\t2\n\t\n3\t4', allow_blank=False)
+
+
+class BadCellTest(unittest.TestCase):
+    def test_invalid_number_position(self):
+        with self.assertRaisesRegex(engine.ConversionError, "'x2' at line 3, column 2"):
+            vo_ve_tsv.parse_block('1\t2\n3\t4\n5\tx2')
+
+    def test_position_counts_axis_column(self):
+        with self.assertRaisesRegex(engine.ConversionError, "line 3, column 3"):
+            vo_ve_tsv.parse_block('\t1000\t2000\n20\t1\t2\n40\t3\t?')
+
+    def test_missing_number(self):
+        with self.assertRaisesRegex(engine.ConversionError, "Missing number at line 2, column 1"):
+            vo_ve_tsv.parse_block('1\t2\n\t4', allow_blank=False)
+        self.assertEqual(vo_ve_tsv.parse_block('1\t2\n\t4').grid(), [[1, 2], [None, 4]])
+
+    def test_ragged_row(self):
+        with self.assertRaisesRegex(engine.ConversionError, "Line 2 has 2 cells, expected 3"):
+            vo_ve_tsv.parse_block('1\t2\t3\n4\t5\n6\t7\t8')
+
+    def test_parse_table_shape(self):
+        with self.assertRaises(engine.ConversionError):
+            vo_ve_tsv.parse_table('1\t2\n3\t4', 3, 2)
+
+
+class FormatTableTest(unittest.TestCase):
+    def test_axes_keep_full_precision(self):
+        layout = engine.TargetLayout(8, 8, x_method='log', y_method='uniform')
+        new_x, new_y = layout.build([500, 1000, 7000], [21.77, 50, 104.3])
+        grid = [[r * 8 + c for c in range(8)] for r in range(8)]
+        table = vo_ve_tsv.parse_block(vo_ve_tsv.format_table(grid, new_x, new_y))
+        for parsed, values in ((table.x_values, new_x), (table.y_values, new_y)):
+            self.assertEqual(len(parsed), len(values))
+            for a, b in zip(parsed, values):
+                self.assertAlmostEqual(a, b, delta=abs(b) * 1e-9)
+
+    def test_whole_numbers_stay_short(self):
+        text = vo_ve_tsv.format_table([[1.5, None]], [320, 7000.0], [20])
+        self.assertEqual(text, "\t320\t7000\n20\t1.500\t")
+
+
+if __name__ == '__main__':
+    unittest.main()
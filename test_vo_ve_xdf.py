@@ -0,0 +1,110 @@
+"""Tests for the XDF importer and its cache."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import vo_ve_engine as engine
+import vo_ve_xdf
+
+XDF = """<XDFFORMAT version="1.60">
+  <XDFHEADER>
+    <DEFAULTS datasizeinbits="16" lsbfirst="1" />
+    <CATEGORY index="0x0" name="Fuel" />
+  </XDFHEADER>
+  <XDFTABLE>
+    <title>VO map</title>
+    <CATEGORYMEM index="0" category="1" />
+    <XDFAXIS id="x">
+      <EMBEDDEDDATA mmedaddress="0x100" mmedelementsizebits="16" mmedcolcount="12" />
+      <indexcount>12</indexcount>
+      <MATH equation="X" />
+    </XDFAXIS>
+    <XDFAXIS id="y">
+      <indexcount>8</indexcount>
+      {labels}
+    </XDFAXIS>
+    <XDFAXIS id="z">
+      <EMBEDDEDDATA mmedaddress="0x200" mmedelementsizebits="16" mmedrowcount="8" mmedcolcount="12" />
+      <MATH equation="X*0.01" />
+    </XDFAXIS>
+  </XDFTABLE>
+</XDFFORMAT>
+"""
+
+
+def xdf(label_count):
+    labels = "".join(f'<LABEL index="{i}" value="{20 + 10 * i}" />' for i in range(label_count))
+    return XDF.format(labels=labels).encode('utf-8')
+
+
+class LabelAxisTest(unittest.TestCase):
+    def test_label_axis(self):
+        entry, = vo_ve_xdf.parse_xdf(xdf(8))
+        self.assertEqual(entry.table.y_axis.values, [20.0 + 10 * i for i in range(8)])
+        self.assertEqual(entry.table.x_axis.address, 0x100)
+        self.assertAlmostEqual(entry.table.scale, 0.01)
+
+    def test_short_label_axis_rejected(self):
+        entry, = vo_ve_xdf.parse_xdf(xdf(5))
+        self.assertEqual(entry.title, 'VO map')
+        self.assertIsNone(entry.table)
+
+
+class AttributeTest(unittest.TestCase):
+    def test_integers(self):
+        for text, expected in (('0x100', 256), ('0X1f', 31), ('100', 100), ('0100', 100),
+                               (' 012 ', 12), ('0', 0), ('00', 0), (None, 7), ('', 7)):
+            self.assertEqual(vo_ve_xdf._int(text, 7), expected, text)
+        for text in ('1e3', '0x', 'abc'):
+            with self.assertRaises(engine.ConversionError):
+                vo_ve_xdf._int(text)
+
+    def test_leading_zeros(self):
+        data = xdf(8).replace(b'mmedcolcount="12" />\n      <MATH equation="X*0.01"',
+                              b'mmedcolcount="012" />\n      <MATH equation="X*0.01"')
+        entry, = vo_ve_xdf.parse_xdf(data)
+        self.assertEqual((entry.rows, entry.cols), (8, 12))
+
+    def test_bad_integer_skips_table(self):
+        data = xdf(8).replace(b'mmedrowcount="8"', b'mmedrowcount="eight"')
+        data = data.replace(b'category="1"', b'category="one"')
+        entry, = vo_ve_xdf.parse_xdf(data)
+        self.assertEqual(entry.title, 'VO map')
+        self.assertIsNone(entry.table)
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'fw.xdf')
+        with open(self.path, 'wb') as f:
+            f.write(xdf(8))
+        self.cache_dir = os.path.join(self.tmp, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache_round_trip(self):
+        first = vo_ve_xdf.load_xdf(self.path, cache_dir=self.cache_dir)
+        cached = vo_ve_xdf.load_xdf(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertEqual(cached.entries[0].table.y_axis.values,
+                         first.entries[0].table.y_axis.values)
+
+    def test_malformed_cache_is_a_miss(self):
+        vo_ve_xdf.load_xdf(self.path, cache_dir=self.cache_dir)
+        cache_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        for content in ('[1, 2]', '{"version": %d, "entries": [null]}' % vo_ve_xdf.CACHE_VERSION,
+                        '{"version": %d, "entries": [{"title": 1, "categories": 2, '
+                        '"address": 3, "rows": 4, "cols": 5, "equation": 6, "table": 7}]}'
+                        % vo_ve_xdf.CACHE_VERSION):
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            index = vo_ve_xdf.load_xdf(self.path, cache_dir=self.cache_dir)
+            self.assertEqual(index.entries[0].title, 'VO map')
+
+
+if __name__ == '__main__':
+    unittest.main()
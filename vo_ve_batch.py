@@ -0,0 +1,87 @@
+"""
+Parallel batch runner.
+
+Spreads conversions over a ProcessPoolExecutor. Results come back in input
+order and a map that fails only reports its own error; the rest of the
+batch carries on.
+"""
+
+import concurrent.futures
+import functools
+import os
+import traceback
+
+import vo_ve_engine as engine
+
+# Jobs handed to a worker process per round trip
+DEFAULT_CHUNKSIZE = 8
+
+
+class BatchItem:
+    """Outcome of one job: either result or error is set."""
+
+    def __init__(self, index, job, result=None, error=None):
+        self.index = index
+        self.job = job
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def default_workers():
+    """One worker per available core."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _guarded(func, job):
+    """Run func(*job) in a worker, turning exceptions into an error string."""
+    try:
+        return func(*job), None
+    except (engine.ConversionError, OSError) as e:
+        return None, str(e)
+    except Exception as e:
+        # Unexpected failures keep their traceback for the report
+        return None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+
+
+def run_batch(func, jobs, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Call func(*job) for every job and yield BatchItem objects in input order.
+
+    func must be a module-level function so it can be sent to worker
+    processes. workers=None uses every core, workers=1 runs in this process
+    without a pool.
+    """
+    jobs = list(jobs)
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(jobs) or 1))
+    call = functools.partial(_guarded, func)
+
+    if workers == 1:
+        for index, job in enumerate(jobs):
+            result, error = call(job)
+            yield BatchItem(index, job, result, error)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        outcomes = pool.map(call, jobs, chunksize=max(1, chunksize))
+        for index, (job, (result, error)) in enumerate(zip(jobs, outcomes)):
+            yield BatchItem(index, job, result, error)
+
+
+def convert_many(maps, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Convert many maps in parallel.
+
+    maps is an iterable of (x_values, y_values, grid, displacement, iat)
+    tuples, optionally followed by a TargetLayout and a kernel; each
+    BatchItem.result is a ConversionResult.
+    """
+    return run_batch(engine.convert_map, maps, workers=workers, chunksize=chunksize)
@@ -0,0 +1,344 @@
+"""
+Benchmarks for the conversion pipeline.
+
+Times every stage on synthetic 8x12 VO maps: axis extension, plan
+compilation, interpolation, smoothing, the VE formula and its inverse,
+clipboard (TSV) serialization, the whole convert_map() pipeline, large
+custom layouts (up to 48x48 -> 64x64) and batches of increasing size. The synthetic maps cover the NA and boost
+MAP presets of extend_y_axis() and all three RPM branches of
+extend_x_axis().
+
+    python vo_ve_bench.py -o bench.json
+    python vo_ve_bench.py -o bench.json --baseline baseline.json
+
+Results are written as JSON. Every benchmark is compared against a stored
+run and the exit status is 1 when one got slower than --threshold allows,
+so a release can be gated on it. The tracked baseline is
+bench_baseline.json next to this file; --baseline picks another run,
+--no-baseline skips the comparison. Timings only compare on the same
+machine, so re-record the baseline (-o bench_baseline.json) when the
+reference machine changes.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+
+import vo_ve_batch
+import vo_ve_engine as engine
+import vo_ve_tsv
+
+RESULTS_VERSION = 1
+
+# Tracked baseline the comparison uses unless --baseline/--no-baseline say otherwise
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# RPM axes hitting each branch of extend_x_axis(): 7000 limit, <= 7500, high-rev
+X_AXES = {
+    'rpm7000': [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6000, 7000],
+    'rpm7500': [320, 640, 960, 1280, 1600, 2000, 2500, 3000, 4000, 5000, 6500, 7500],
+    'rpm8000': [320, 640, 960, 1280, 1600, 2000, 2500, 3500, 4500, 5500, 7000, 8000],
+}
+
+# MAP axes for the NA and boost presets of extend_y_axis()
+Y_AXES = {
+    'na': [20, 30, 40, 50, 60, 70, 85, 100],
+    'boost': [20, 40, 60, 100, 140, 180, 220, 260],
+}
+
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000)
+
+# (source, target) shapes of the large-table benchmarks, so plan
+# compilation and conversion of big custom layouts cannot regress unnoticed
+LARGE_SHAPES = (((32, 32), (48, 48)), ((48, 48), (64, 64)))
+
+# Slowdown (current / baseline - 1) reported as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def synthetic_map(x_values, y_values, rng):
+    """
+    VO grid shaped like a real map: rising with load, a torque peak in
+    the mid range and a little noise.
+    """
+    grid = []
+    top = max(y_values)
+    for y in y_values:
+        load = y / top
+        row = []
+        for x in x_values:
+            peak = math.exp(-((x - 4500) / 2500) ** 2)
+            row.append(40 + 260 * load * (0.7 + 0.3 * peak) + rng.uniform(-2, 2))
+        grid.append(row)
+    return grid
+
+
+def synthetic_maps(count, seed=0):
+    """count (x_values, y_values, grid) tuples cycling through every axis case."""
+    rng = random.Random(seed)
+    cases = [(X_AXES[x], Y_AXES[y]) for x in X_AXES for y in Y_AXES]
+    maps = []
+    for i in range(count):
+        x_values, y_values = cases[i % len(cases)]
+        maps.append((x_values, y_values, synthetic_map(x_values, y_values, rng)))
+    return maps
+
+
+# ===== TIMING =====
+
+def measure(func, repeat=5, min_time=0.05):
+    """
+    Best time per call in seconds.
+
+    The number of calls per round grows until a round takes min_time, the
+    best of repeat rounds is kept.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best, number
+
+
+# ===== BENCHMARKS =====
+
+def _stage_benchmarks():
+    """(name, callable) pairs for every single-map stage and axis case."""
+    benchmarks = []
+    rng = random.Random(1)
+    displacement, iat = 1.6, 20.0
+
+    for x_name, x_values in X_AXES.items():
+        for y_name, y_values in Y_AXES.items():
+            case = f"{x_name}-{y_name}"
+            grid = synthetic_map(x_values, y_values, rng)
+            new_x = engine.extend_x_axis(x_values)
+            new_y = engine.extend_y_axis(y_values)
+            vo_grid = engine.interpolate_grid(x_values, y_values, grid, new_x, new_y)
+            ve_grid = engine.calculate_ve(vo_grid, new_x, new_y, displacement, iat)
+            fixed_mask, _ = engine.build_fixed_mask(x_values, y_values, new_x, new_y)
+            text = vo_ve_tsv.format_table(grid, x_values, y_values)
+            eu_text = text.replace('.', ',').replace('\t', ';')
+
+            def compile_plan(use_numpy, x_values=x_values, y_values=y_values,
+                             new_x=new_x, new_y=new_y):
+                engine.clear_plan_cache()
+                engine.get_plan(x_values, y_values, new_x, new_y, use_numpy=use_numpy)
+
+            benchmarks += [
+                (f"extend_axes/{case}",
+                 lambda x=x_values, y=y_values: (engine.extend_x_axis(x), engine.extend_y_axis(y))),
+                (f"plan_compile/python/{case}", lambda f=compile_plan: f(False)),
+                (f"interpolate/python/{case}",
+                 lambda x=x_values, y=y_values, g=grid, nx=new_x, ny=new_y:
+                 engine.interpolate_grid(x, y, g, nx, ny, use_numpy=False)),
+                (f"interpolate/direct/{case}",
+                 lambda x=x_values, y=y_values, g=grid, nx=new_x, ny=new_y:
+                 engine.interpolate_grid_direct(x, y, g, nx, ny)),
+                (f"smooth/jacobi/{case}",
+                 lambda g=vo_grid, m=fixed_mask: engine.vertical_smooth(g, m)),
+                (f"smooth/relax/{case}",
+                 lambda g=vo_grid, m=fixed_mask: engine.Relaxation(method='sor').solve(g, m)),
+                (f"ve_formula/{case}",
+                 lambda g=vo_grid, nx=new_x, ny=new_y:
+                 engine.calculate_ve(g, nx, ny, displacement, iat)),
+                (f"ve_to_vo/{case}",
+                 lambda g=ve_grid, nx=new_x, ny=new_y:
+                 engine.convert_ve_to_vo(g, nx, ny, displacement, iat)),
+                (f"tsv_format/{case}",
+                 lambda g=vo_grid, nx=new_x, ny=new_y: vo_ve_tsv.format_table(g, nx, ny)),
+                (f"tsv_parse/{case}",
+                 lambda t=text: vo_ve_tsv.parse_table(t, engine.SRC_ROWS, engine.SRC_COLS)),
+                (f"tsv_parse_eu/{case}",
+                 lambda t=eu_text: vo_ve_tsv.parse_table(t, engine.SRC_ROWS, engine.SRC_COLS)),
+                (f"convert_map/{case}",
+                 lambda x=x_values, y=y_values, g=grid:
+                 engine.convert_map(x, y, g, displacement, iat)),
+            ]
+            if engine.load_numpy() is not None:
+                benchmarks += [
+                    (f"plan_compile/numpy/{case}", lambda f=compile_plan: f(True)),
+                    (f"interpolate/numpy/{case}",
+                     lambda x=x_values, y=y_values, g=grid, nx=new_x, ny=new_y:
+                     engine.interpolate_grid(x, y, g, nx, ny, use_numpy=True)),
+                ]
+    return benchmarks
+
+
+def _large_benchmarks():
+    """Plan compile and convert_map() for LARGE_SHAPES on uniform target axes."""
+    benchmarks = []
+    rng = random.Random(2)
+    for (rows, cols), (new_rows, new_cols) in LARGE_SHAPES:
+        case = f"{rows}x{cols}-{new_rows}x{new_cols}"
+        x_values = engine.uniform_axis(500, 7000, cols)
+        y_values = engine.uniform_axis(20, 100, rows)
+        grid = synthetic_map(x_values, y_values, rng)
+        layout = engine.TargetLayout(new_rows, new_cols, 'uniform', 'uniform')
+        new_x, new_y = layout.build(x_values, y_values)
+
+        def compile_plan(use_numpy, x_values=x_values, y_values=y_values,
+                         new_x=new_x, new_y=new_y):
+            engine.clear_plan_cache()
+            engine.get_plan(x_values, y_values, new_x, new_y, use_numpy=use_numpy)
+
+        benchmarks += [
+            (f"large/plan_compile/python/{case}", lambda f=compile_plan: f(False)),
+            (f"large/convert_map/{case}",
+             lambda x=x_values, y=y_values, g=grid, layout=layout:
+             engine.convert_map(x, y, g, 1.6, 20.0, layout)),
+        ]
+        if engine.load_numpy() is not None:
+            benchmarks.append((f"large/plan_compile/numpy/{case}", lambda f=compile_plan: f(True)))
+    return benchmarks
+
+
+def _batch_benchmarks(batch_sizes):
+    benchmarks = []
+    for size in batch_sizes:
+        jobs = [(x, y, g, 1.6, 20.0) for x, y, g in synthetic_maps(size)]
+        benchmarks.append((
+            f"batch/convert_many/{size}",
+            lambda jobs=jobs: list(vo_ve_batch.convert_many(jobs, workers=1)),
+        ))
+        if engine.load_numpy() is not None:
+            x_values, y_values = X_AXES['rpm7000'], Y_AXES['na']
+            new_x = engine.extend_x_axis(x_values)
+            new_y = engine.extend_y_axis(y_values)
+            rng = random.Random(size)
+            stack = [synthetic_map(x_values, y_values, rng) for _ in range(size)]
+            benchmarks.append((
+                f"batch/interpolate_array/{size}",
+                lambda s=stack, nx=new_x, ny=new_y:
+                engine.interpolate_grid_array(x_values, y_values, s, nx, ny),
+            ))
+    return benchmarks
+
+
+def run_benchmarks(batch_sizes=DEFAULT_BATCH_SIZES, repeat=5, min_time=0.05, pattern=None,
+                   progress=None):
+    """Run all benchmarks whose name contains pattern. Returns the results dict."""
+    results = {}
+    for name, func in _stage_benchmarks() + _large_benchmarks() + _batch_benchmarks(batch_sizes):
+        if pattern and pattern not in name:
+            continue
+        seconds, calls = measure(func, repeat=repeat, min_time=min_time)
+        results[name] = {'seconds': seconds, 'calls': calls}
+        if progress is not None:
+            progress(name, seconds)
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': getattr(engine.load_numpy(), '__version__', None),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two result dicts.
+
+    Returns a list of (name, baseline seconds, current seconds, ratio,
+    regressed) for the benchmarks present in both.
+    """
+    rows = []
+    for name, entry in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if old is None or old['seconds'] <= 0:
+            continue
+        ratio = entry['seconds'] / old['seconds']
+        rows.append((name, old['seconds'], entry['seconds'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+# ===== COMMAND LINE =====
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the VO -> VE conversion pipeline.")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="JSON results of an earlier run to compare against "
+                             "(default: the tracked bench_baseline.json)")
+    parser.add_argument('--no-baseline', action='store_true', help="only time, do not compare")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown before a benchmark counts as regressed "
+                             f"(default {DEFAULT_THRESHOLD:g} = {DEFAULT_THRESHOLD:.0%})")
+    parser.add_argument('--batch-sizes', default=','.join(str(n) for n in DEFAULT_BATCH_SIZES),
+                        help="comma-separated batch sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="timing rounds per benchmark (default 5)")
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help="minimum seconds per timing round (default 0.05)")
+    parser.add_argument('-k', '--filter', help="only run benchmarks whose name contains this")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        batch_sizes = [int(v) for v in args.batch_sizes.split(',') if v.strip()]
+    except ValueError:
+        print(f"Error: invalid batch sizes {args.batch_sizes!r}", file=sys.stderr)
+        return 2
+
+    baseline = None
+    # A checkout without the tracked baseline just times
+    missing_default = args.baseline == DEFAULT_BASELINE and not os.path.exists(DEFAULT_BASELINE)
+    if args.baseline and not args.no_baseline and not missing_default:
+        try:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error: cannot read baseline: {e}", file=sys.stderr)
+            return 2
+
+    current = run_benchmarks(
+        batch_sizes, repeat=args.repeat, min_time=args.min_time, pattern=args.filter,
+        progress=lambda name, seconds: print(f"{name:48} {format_seconds(seconds):>10}", flush=True),
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    if baseline is None:
+        return 0
+
+    regressed = 0
+    print()
+    print(f"{'benchmark':48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, old, new, ratio, slower in compare(current, baseline, args.threshold):
+        flag = "  REGRESSED" if slower else ""
+        regressed += slower
+        print(f"{name:48} {format_seconds(old):>10} {format_seconds(new):>10} {ratio:7.2f}{flag}")
+    print(f"{regressed} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
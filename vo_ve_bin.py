@@ -0,0 +1,344 @@
+"""
+Read and write tables directly in ECU binary images.
+
+A TableDef describes where a table lives in a .bin image: address,
+element type, scaling, endianness and where its axes are stored.
+BinImage memory-maps the image, decodes tables straight from the mapped
+buffer and patches tables back in place.
+
+Addresses differ between firmware releases, so none are hard-coded here.
+Definitions come from a JSON file (load_definitions) or a TunerPro XDF
+file (see vo_ve_xdf). The JSON file maps a name to a table entry:
+
+    {"vo": {"address": "0x1234", "rows": 8, "cols": 12, "element": "u16",
+            "scale": 0.01, "endian": "<",
+            "x_axis": {"address": "0x1200", "element": "u16", "scale": 1},
+            "y_axis": {"address": "0x1220", "element": "u8", "scale": 1}}}
+"""
+
+import json
+import math
+import mmap
+import os
+import shutil
+import struct
+
+import vo_ve_engine as engine
+
+# Element type name -> struct format character
+ELEMENT_FORMATS = {
+    'u8': 'B',
+    'i8': 'b',
+    'u16': 'H',
+    'i16': 'h',
+    'u32': 'I',
+    'i32': 'i',
+    'f32': 'f',
+}
+
+ENDIAN_CHARS = ('<', '>')
+
+
+def _parse_address(value):
+    if isinstance(value, str):
+        return int(value, 0)
+    return int(value)
+
+
+class AxisDef:
+    """
+    Location and scaling of a table axis (physical = raw * scale + offset).
+
+    Axes that are not stored in the image have address None and carry
+    their breakpoints in values instead.
+    """
+
+    def __init__(self, address, length, element='u16', scale=1.0, offset=0.0, endian='<',
+                 values=None):
+        if element not in ELEMENT_FORMATS:
+            raise engine.ConversionError(f"Unknown element type {element!r}")
+        if endian not in ENDIAN_CHARS:
+            raise engine.ConversionError(f"Unknown endianness {endian!r}")
+        self.address = address
+        self.length = length
+        self.element = element
+        self.scale = scale
+        self.offset = offset
+        self.endian = endian
+        self.values = values
+
+    @property
+    def size(self):
+        return self.length * struct.calcsize(ELEMENT_FORMATS[self.element])
+
+
+class TableDef:
+    """
+    Location and scaling of a 2D table (physical = raw * scale + offset).
+
+    Values are stored row by row (MAP rows, RPM columns) unless
+    row_major is False.
+    """
+
+    def __init__(self, name, address, rows, cols, element='u16', scale=1.0, offset=0.0,
+                 endian='<', x_axis=None, y_axis=None, row_major=True):
+        if element not in ELEMENT_FORMATS:
+            raise engine.ConversionError(f"Unknown element type {element!r}")
+        if endian not in ENDIAN_CHARS:
+            raise engine.ConversionError(f"Unknown endianness {endian!r}")
+        self.name = name
+        self.address = address
+        self.rows = rows
+        self.cols = cols
+        self.element = element
+        self.scale = scale
+        self.offset = offset
+        self.endian = endian
+        self.x_axis = x_axis
+        self.y_axis = y_axis
+        self.row_major = row_major
+
+    @property
+    def size(self):
+        return self.rows * self.cols * struct.calcsize(ELEMENT_FORMATS[self.element])
+
+
+def _axis_from_dict(data, length, default_endian):
+    address = data.get('address')
+    values = data.get('values')
+    return AxisDef(
+        None if address is None else _parse_address(address),
+        int(data.get('length', len(values) if values else length)),
+        element=data.get('element', 'u16'),
+        scale=float(data.get('scale', 1.0)),
+        offset=float(data.get('offset', 0.0)),
+        endian=data.get('endian', default_endian),
+        values=[float(v) for v in values] if values else None,
+    )
+
+
+def _axis_to_dict(axis):
+    data = {
+        'address': None if axis.address is None else f"0x{axis.address:X}",
+        'length': axis.length,
+        'element': axis.element,
+        'scale': axis.scale,
+        'offset': axis.offset,
+        'endian': axis.endian,
+    }
+    if axis.values is not None:
+        data['values'] = list(axis.values)
+    return data
+
+
+def table_to_dict(table):
+    """Inverse of table_from_dict(), for writing definitions files and caches."""
+    return {
+        'address': f"0x{table.address:X}",
+        'rows': table.rows,
+        'cols': table.cols,
+        'element': table.element,
+        'scale': table.scale,
+        'offset': table.offset,
+        'endian': table.endian,
+        'x_axis': _axis_to_dict(table.x_axis) if table.x_axis else None,
+        'y_axis': _axis_to_dict(table.y_axis) if table.y_axis else None,
+        'row_major': table.row_major,
+    }
+
+
+def table_from_dict(name, data):
+    """Build a TableDef from one entry of a JSON definitions file."""
+    try:
+        rows = int(data['rows'])
+        cols = int(data['cols'])
+        endian = data.get('endian', '<')
+        return TableDef(
+            name,
+            _parse_address(data['address']),
+            rows,
+            cols,
+            element=data.get('element', 'u16'),
+            scale=float(data.get('scale', 1.0)),
+            offset=float(data.get('offset', 0.0)),
+            endian=endian,
+            x_axis=_axis_from_dict(data['x_axis'], cols, endian) if data.get('x_axis') else None,
+            y_axis=_axis_from_dict(data['y_axis'], rows, endian) if data.get('y_axis') else None,
+            row_major=bool(data.get('row_major', True)),
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise engine.ConversionError(f"Invalid definition for table {name!r}: {e}")
+
+
+def load_definitions(path):
+    """Read a JSON definitions file, returns {name: TableDef}."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {name: table_from_dict(name, entry) for name, entry in data.items()}
+
+
+# ===== DECODING / ENCODING =====
+
+def _check_bounds(buf, address, size, what):
+    if address < 0 or address + size > len(buf):
+        raise engine.ConversionError(
+            f"{what} at 0x{address:X} (+{size} bytes) is outside the {len(buf)} byte image"
+        )
+
+
+def decode_values(buf, address, count, element, endian='<', scale=1.0, offset=0.0):
+    """
+    Decode count scaled values starting at address.
+
+    With NumPy the raw values are a zero-copy view on buf; without it
+    struct reads straight from the buffer. Returns a list of floats.
+    """
+    fmt = ELEMENT_FORMATS[element]
+    _check_bounds(buf, address, count * struct.calcsize(fmt), "Data")
+
+    np = engine.load_numpy()
+    if np is not None:
+        raw = np.frombuffer(buf, dtype=np.dtype(endian + fmt), count=count, offset=address)
+        values = (raw * scale + offset).tolist()
+        # Drop the view so the mapping can be closed
+        del raw
+        return values
+
+    raw = struct.unpack_from(f"{endian}{count}{fmt}", buf, address)
+    return [v * scale + offset for v in raw]
+
+
+def encode_values(buf, address, values, element, endian='<', scale=1.0, offset=0.0):
+    """Scale values back to raw and pack them into buf at address."""
+    fmt = ELEMENT_FORMATS[element]
+    _check_bounds(buf, address, len(values) * struct.calcsize(fmt), "Data")
+    if scale == 0:
+        raise engine.ConversionError("Scale must not be zero")
+
+    raw = []
+    for i, value in enumerate(values):
+        if value is None:
+            raise engine.ConversionError(f"Missing value at index {i}")
+        if not math.isfinite(value):
+            raise engine.ConversionError(f"Value at index {i} is not a finite number")
+        stored = (value - offset) / scale
+        if fmt != 'f':
+            stored = int(round(stored))
+        raw.append(stored)
+
+    try:
+        struct.pack_into(f"{endian}{len(raw)}{fmt}", buf, address, *raw)
+    except struct.error as e:
+        raise engine.ConversionError(f"Value out of range for {element}: {e}")
+
+
+class BinImage:
+    """
+    Memory-mapped ECU image.
+
+    Use as a context manager. Opened with writable=True, write_table()
+    patches the mapping and the changes land in the file on flush/close.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self._file = open(path, 'r+b' if writable else 'rb')
+        try:
+            if os.fstat(self._file.fileno()).st_size == 0:
+                raise engine.ConversionError(f"{path} is empty")
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._map)
+
+    def close(self):
+        if self._map is not None:
+            if self.writable:
+                self._map.flush()
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def flush(self):
+        self._map.flush()
+
+    def read_axis(self, axis):
+        if axis.address is None:
+            return list(axis.values)
+        return decode_values(self._map, axis.address, axis.length, axis.element,
+                             axis.endian, axis.scale, axis.offset)
+
+    def read_table(self, table):
+        """Return (x_values, y_values, grid); axes are None when not defined."""
+        flat = decode_values(self._map, table.address, table.rows * table.cols,
+                             table.element, table.endian, table.scale, table.offset)
+        if table.row_major:
+            grid = [flat[r * table.cols:(r + 1) * table.cols] for r in range(table.rows)]
+        else:
+            grid = [flat[r::table.rows] for r in range(table.rows)]
+
+        x_values = self.read_axis(table.x_axis) if table.x_axis else None
+        y_values = self.read_axis(table.y_axis) if table.y_axis else None
+        return x_values, y_values, grid
+
+    def write_table(self, table, grid, x_values=None, y_values=None):
+        """Patch a table (and optionally its axes) into the image."""
+        if not self.writable:
+            raise engine.ConversionError("Image is opened read-only")
+        if len(grid) != table.rows or any(len(row) != table.cols for row in grid):
+            raise engine.ConversionError(
+                f"Table {table.name!r} must be {table.rows}x{table.cols}"
+            )
+
+        if table.row_major:
+            flat = [v for row in grid for v in row]
+        else:
+            flat = [grid[r][c] for c in range(table.cols) for r in range(table.rows)]
+        encode_values(self._map, table.address, flat, table.element,
+                      table.endian, table.scale, table.offset)
+
+        for axis, values in ((table.x_axis, x_values), (table.y_axis, y_values)):
+            if axis is not None and axis.address is not None and values is not None:
+                encode_values(self._map, axis.address, list(values), axis.element,
+                              axis.endian, axis.scale, axis.offset)
+
+
+def convert_bin(path, vo_table, ve_table, displacement, iat, out_path=None, write_axes=True,
+                kernel=None):
+    """
+    Read the 8x12 VO map from an image, convert it and patch the 16x16 VE map.
+
+    The VE map is written to out_path (a copy of the input) or, when
+    out_path is None, into the input image itself. The target axes follow
+    ve_table's shape with the MS4x rules. Returns the ConversionResult.
+    """
+    with BinImage(path) as image:
+        x_values, y_values, grid = image.read_table(vo_table)
+    if x_values is None or y_values is None:
+        raise engine.ConversionError(f"Table {vo_table.name!r} has no axis definitions")
+
+    layout = engine.TargetLayout(ve_table.rows, ve_table.cols)
+    result = engine.convert_map(x_values, y_values, grid, displacement, iat, layout, kernel)
+
+    target = path
+    if out_path is not None:
+        shutil.copyfile(path, out_path)
+        target = out_path
+
+    with BinImage(target, writable=True) as image:
+        if write_axes:
+            image.write_table(ve_table, result.ve_grid, result.new_x, result.new_y)
+        else:
+            image.write_table(ve_table, result.ve_grid)
+    return result
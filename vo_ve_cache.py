@@ -0,0 +1,289 @@
+"""
+Persistent cache of conversion results.
+
+A conversion is fully determined by the source axes and grid,
+displacement, IAT (or IAT model), the target layout, the kernel, the
+smoothing parameters and the engine version. result_key() hashes exactly
+those, normalized the way convert_map() sees them, so an unchanged map
+hashes to the same key on every run and any change to it or to the
+settings gives a new one.
+
+ResultCache stores one small binary file per key:
+
+    header  magic b'VOVC', format version, rows, cols, flags,
+            relaxation iterations, relaxation residual (little endian)
+    body    new_x, new_y, VO grid, VE grid as float64, NaN for empty cells
+
+The directory is bounded to max_bytes. A hit refreshes the file's mtime,
+and when a write pushes the total over the limit the least recently used
+files are removed. Entries are written to a temporary file and renamed
+into place, so several worker processes can share one directory without
+locking: a reader sees either a whole entry or none, and an entry that
+vanishes or fails to decode counts as a miss. Each process tracks the
+directory size on its own, so the bound holds to within a few entries
+per process.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import time
+from array import array
+
+import vo_ve_engine as engine
+import vo_ve_profile as profile
+
+MAGIC = b'VOVC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHHBxId')
+ENTRY_SUFFIX = '.vovc'
+
+FLAG_FORCED_INDUCTION = 1
+FLAG_RELAXED = 2
+FLAG_CONVERGED = 4
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Eviction trims the directory to this share of max_bytes, so it does not run on every write
+LOW_WATER = 0.9
+# Temporary files older than this are left over from a crashed writer
+STALE_TMP_SECONDS = 3600
+
+
+def default_cache_dir():
+    """Cache directory, VO_VE_CACHE_DIR overrides ~/.cache/vo_ve_converter."""
+    base = os.environ.get('VO_VE_CACHE_DIR')
+    if base:
+        return os.path.join(base, 'results')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'vo_ve_converter', 'results')
+
+
+def _pack_floats(values):
+    data = array('d', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def result_key(x_values, y_values, grid, displacement, iat, layout=None, kernel=None,
+               relaxation=None):
+    """
+    SHA-256 hex digest of everything convert_map() output depends on.
+
+    Axes and grid are only checked for shape: values convert_map() rejects
+    never get stored, so they cannot hit. Raises ConversionError for
+    misshapen or non-numeric input.
+    """
+    if len(grid) != len(y_values) or any(len(row) != len(x_values) for row in grid):
+        engine.validate_inputs(x_values, y_values, grid)
+    try:
+        axes = _pack_floats(x_values) + _pack_floats(y_values)
+        cells = _pack_floats([v for row in grid for v in row])
+    except TypeError:
+        # Numeric strings and the like: normalize them the way convert_map() does
+        x_values, y_values, grid = engine.validate_inputs(x_values, y_values, grid)
+        axes = _pack_floats(x_values) + _pack_floats(y_values)
+        cells = _pack_floats([v for row in grid for v in row])
+    displacement, iat = engine.validate_parameters(displacement, iat)
+    if relaxation is None:
+        smoothing = ('jacobi', engine.SMOOTH_BETA, engine.SMOOTH_ITERATIONS)
+    else:
+        smoothing = relaxation.key()
+    settings = (
+        engine.ENGINE_VERSION,
+        len(y_values),
+        len(x_values),
+        displacement,
+        engine.as_iat_model(iat).key(),
+        (layout or engine.DEFAULT_LAYOUT).key(),
+        engine.get_resampler(kernel).key(),
+        smoothing,
+    )
+    digest = hashlib.sha256(repr(settings).encode('utf-8'))
+    digest.update(axes)
+    digest.update(cells)
+    return digest.hexdigest()
+
+
+# ===== ENTRY FORMAT =====
+
+def encode_result(result):
+    """Serialize a ConversionResult to the entry format."""
+    rows, cols = len(result.new_y), len(result.new_x)
+    flags = FLAG_FORCED_INDUCTION if result.mode != "NA" else 0
+    iterations, residual = 0, 0.0
+    relaxed = result.relaxation
+    if relaxed is not None:
+        flags |= FLAG_RELAXED | (FLAG_CONVERGED if relaxed.converged else 0)
+        iterations, residual = relaxed.iterations, relaxed.residual
+
+    nan = float('nan')
+    values = list(result.new_x) + list(result.new_y)
+    for grid in (result.vo_grid, result.ve_grid):
+        values += [nan if v is None else v for row in grid for v in row]
+    return HEADER.pack(MAGIC, FORMAT_VERSION, rows, cols, flags, iterations,
+                       residual) + _pack_floats(values)
+
+
+def decode_result(data):
+    """Inverse of encode_result(); raises ConversionError for a damaged entry."""
+    if len(data) < HEADER.size:
+        raise engine.ConversionError("Cache entry is truncated")
+    magic, version, rows, cols, flags, iterations, residual = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise engine.ConversionError("Not a cache entry of this version")
+    cells = rows * cols
+    if len(data) != HEADER.size + 8 * (cols + rows + 2 * cells):
+        raise engine.ConversionError("Cache entry has the wrong size")
+
+    values = array('d')
+    values.frombytes(data[HEADER.size:])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    values = values.tolist()
+
+    new_x, new_y = values[:cols], values[cols:cols + rows]
+    start = cols + rows
+    vo_grid = [values[start + r * cols:start + (r + 1) * cols] for r in range(rows)]
+    start += cells
+    # Only VE has empty cells (zero MAP rows); NaN != NaN finds them
+    ve_grid = [
+        [None if v != v else v for v in values[start + r * cols:start + (r + 1) * cols]]
+        for r in range(rows)
+    ]
+
+    relaxed = None
+    if flags & FLAG_RELAXED:
+        relaxed = engine.RelaxResult(vo_grid, iterations, residual, bool(flags & FLAG_CONVERGED))
+    mode = "Forced Induction" if flags & FLAG_FORCED_INDUCTION else "NA"
+    return engine.ConversionResult(new_x, new_y, vo_grid, ve_grid, mode, relaxed, cached=True)
+
+
+# ===== CACHE DIRECTORY =====
+
+class ResultCache:
+    """
+    Size-bounded LRU directory of conversion results.
+
+    Can be handed to worker processes; every process shares the files
+    but keeps its own hit/miss counters.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise engine.ConversionError("Cache size must be positive")
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Bytes this process believes the directory holds, None until scanned
+        self._size = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Cached ConversionResult for key, None on a miss."""
+        path = self._path(key)
+        with profile.stage('cache'):
+            try:
+                with open(path, 'rb') as f:
+                    result = decode_result(f.read())
+            except (OSError, engine.ConversionError):
+                self.misses += 1
+                return None
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Store result under key; a cache that cannot be written is skipped."""
+        data = encode_result(result)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with profile.stage('cache'):
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                # A read-only or contended cache only costs the conversion next time
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def convert(self, x_values, y_values, grid, displacement, iat, layout=None, kernel=None,
+                relaxation=None):
+        """convert_map() going through the cache."""
+        key = result_key(x_values, y_values, grid, displacement, iat, layout, kernel, relaxation)
+        result = self.get(key)
+        if result is None:
+            result = engine.convert_map(x_values, y_values, grid, displacement, iat, layout,
+                                        kernel, relaxation)
+            self.put(key, result)
+        return result
+
+    def _entries(self):
+        """(path, size, mtime) of every entry; removes stale temporary files."""
+        entries = []
+        stale = time.time() - STALE_TMP_SECONDS
+        try:
+            listing = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for entry in listing:
+            try:
+                stat = entry.stat()
+                if entry.name.endswith('.tmp'):
+                    if stat.st_mtime < stale:
+                        os.remove(entry.path)
+                elif entry.name.endswith(ENTRY_SUFFIX):
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+            except OSError:
+                # Removed or replaced by another process meanwhile
+                continue
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the directory is below LOW_WATER."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes * LOW_WATER
+        for path, size, _ in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Still open by a reader (Windows); try again on the next eviction
+                continue
+            total -= size
+        self._size = total
+
+    def size(self):
+        """Bytes currently stored."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Remove every entry."""
+        for path, _, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = 0
@@ -0,0 +1,422 @@
+"""
+Canvas-based table widget.
+
+CanvasTable draws a whole table, axes included, on one tk.Canvas instead
+of one tk.Entry per cell. Mouse positions map to cells arithmetically,
+a single Entry is placed over the cell being edited, and cell redraws are
+collected and flushed in one idle callback. The flush compares every
+dirty cell with what is on screen and only reconfigures canvas items
+that actually change, so rewriting a grid with mostly equal values costs
+next to no Tk calls.
+
+Cells are addressed as (row, col) with row -1 being the X (RPM) axis and
+col -1 the Y (MAP) axis; (-1, -1) is the empty corner.
+
+The numbers live in a TableModel (table.model); values, x_axis and
+y_axis only hold the text on screen. set_value() stores a number at full
+precision and shows it rounded, set() stores typed text and parses it
+into the model once.
+"""
+
+import tkinter as tk
+
+import vo_ve_profile as profile
+from vo_ve_model import TableModel
+
+AXIS_BG = "#d0d0d0"
+CELL_BG = "white"
+SELECTED_BG = "#cce5ff"
+ACTIVE_OUTLINE = "#1a5fb4"
+GRID_LINE = "#a0a0a0"
+
+# Pasted numbers and axis breakpoints are shown without the 3-decimal rounding of results
+PASTE_FORMAT = "{:.10g}"
+
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+
+class CanvasTable(tk.Frame):
+    """
+    Editable rows x cols table with X/Y axis headers on a single canvas.
+
+    on_change(cells) is called with the list of (row, col) cells the user
+    changed by editing, pasting or clearing.
+    """
+
+    def __init__(self, master, rows, cols, cell_width=46, cell_height=20,
+                 font=('Arial', 8), on_change=None):
+        super().__init__(master)
+        self.rows = rows
+        self.cols = cols
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.font = font
+        self.on_change = on_change
+
+        self.canvas = tk.Canvas(self, highlightthickness=1, takefocus=1, bg=CELL_BG)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+        self.editor = tk.Entry(self.canvas, font=font, relief=tk.SOLID, bd=1)
+        self._editor_item = None
+        self.editing = None
+
+        self.active = (0, 0)
+        self.select_anchor = None
+        self.selection = None
+
+        self._dirty = set()
+        self._redraw_pending = False
+
+        self._build()
+        self._bind()
+
+    # ===== LAYOUT =====
+
+    def _build(self):
+        """Create the text and rectangle items for every cell."""
+        self.canvas.delete(tk.ALL)
+        self.model = TableModel(self.rows, self.cols)
+        self.values = [[""] * self.cols for _ in range(self.rows)]
+        self.x_axis = [""] * self.cols
+        self.y_axis = [""] * self.rows
+        self._rects = {}
+        self._texts = {}
+        # What the canvas currently shows per cell, to skip no-op updates
+        self._shown_text = {}
+        self._shown_fill = {}
+
+        for r in range(-1, self.rows):
+            for c in range(-1, self.cols):
+                x1, y1, x2, y2 = self.cell_bbox(r, c)
+                bg = AXIS_BG if r < 0 or c < 0 else CELL_BG
+                self._rects[(r, c)] = self.canvas.create_rectangle(
+                    x1, y1, x2, y2, fill=bg, outline=GRID_LINE
+                )
+                self._texts[(r, c)] = self.canvas.create_text(
+                    x2 - 3, (y1 + y2) // 2, text="", anchor=tk.E, font=self.font
+                )
+                self._shown_text[(r, c)] = ""
+                self._shown_fill[(r, c)] = bg
+
+        self._active_item = self.canvas.create_rectangle(
+            *self.cell_bbox(*self.active), outline=ACTIVE_OUTLINE, width=2
+        )
+        self._editor_item = self.canvas.create_window(
+            0, 0, window=self.editor, anchor=tk.NW, state='hidden'
+        )
+        self.canvas.configure(
+            width=(self.cols + 1) * self.cell_width + 1,
+            height=(self.rows + 1) * self.cell_height + 1,
+        )
+
+    def resize(self, rows, cols):
+        """Change the table shape; all values are cleared."""
+        self.finish_edit(commit=False)
+        self.rows = rows
+        self.cols = cols
+        self.active = (0, 0)
+        self.select_anchor = None
+        self.selection = None
+        self._dirty.clear()
+        self._build()
+
+    def cell_bbox(self, row, col):
+        x1 = (col + 1) * self.cell_width
+        y1 = (row + 1) * self.cell_height
+        return x1, y1, x1 + self.cell_width, y1 + self.cell_height
+
+    def cell_at(self, x, y):
+        """Canvas coordinates -> (row, col), clamped to the table."""
+        col = int(self.canvas.canvasx(x) // self.cell_width) - 1
+        row = int(self.canvas.canvasy(y) // self.cell_height) - 1
+        return max(-1, min(self.rows - 1, row)), max(-1, min(self.cols - 1, col))
+
+    # ===== VALUES =====
+
+    def get(self, row, col):
+        """Text shown in a cell; the number is self.model.get(row, col)."""
+        if row < 0 and col < 0:
+            return ""
+        if row < 0:
+            return self.x_axis[col]
+        if col < 0:
+            return self.y_axis[row]
+        return self.values[row][col]
+
+    def set(self, row, col, text):
+        """Show typed or pasted text and store its number in the model."""
+        if row < 0 and col < 0 or self.get(row, col) == text:
+            return
+        self.model.set_text(row, col, text)
+        self._show(row, col, text)
+
+    def set_value(self, row, col, value, fmt="{:.3f}"):
+        """Store a number at full precision and show it formatted; None blanks the cell."""
+        self.model.set(row, col, value)
+        text = "" if value is None else fmt.format(value)
+        if self.get(row, col) != text:
+            self._show(row, col, text)
+
+    def _show(self, row, col, text):
+        if row < 0:
+            self.x_axis[col] = text
+        elif col < 0:
+            self.y_axis[row] = text
+        else:
+            self.values[row][col] = text
+        self._mark_dirty((row, col))
+
+    @profile.timed('format')
+    def set_grid(self, grid, fmt="{:.3f}"):
+        """Store and show a grid of numbers; None leaves the cell blank."""
+        for r, row in enumerate(grid):
+            for c, val in enumerate(row):
+                self.set_value(r, c, val, fmt)
+
+    @profile.timed('format')
+    def set_axis(self, axis, values, fmt=PASTE_FORMAT):
+        """Store and show axis breakpoints, axis is 'x' or 'y'."""
+        for i, val in enumerate(values):
+            if axis == 'x':
+                self.set_value(-1, i, val, fmt)
+            else:
+                self.set_value(i, -1, val, fmt)
+
+    def set_model(self, model, fmt="{:.3f}", axis_fmt=PASTE_FORMAT):
+        """Store and show a whole TableModel of this table's shape, e.g. from a session."""
+        if (model.rows, model.cols) != (self.rows, self.cols):
+            raise ValueError(f"Table is {self.rows}x{self.cols}, model is {model.rows}x{model.cols}")
+        self.finish_edit(commit=False)
+        self.set_axis('x', model.axis('x'), axis_fmt)
+        self.set_axis('y', model.axis('y'), axis_fmt)
+        self.set_grid(model.grid(), fmt)
+
+    def clear(self):
+        """Blank all data cells, axes stay."""
+        self.model.clear()
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.values[r][c]:
+                    self._show(r, c, "")
+
+    # ===== REDRAW =====
+
+    def _mark_dirty(self, cell):
+        self._dirty.add(cell)
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._flush)
+
+    def _cell_bg(self, row, col):
+        if self.selection is not None:
+            r0, c0, r1, c1 = self.selection
+            if r0 <= row <= r1 and c0 <= col <= c1:
+                return SELECTED_BG
+        return AXIS_BG if row < 0 or col < 0 else CELL_BG
+
+    @profile.timed('render')
+    def _flush(self):
+        """Redraw all dirty cells in one go, skipping cells that look the same."""
+        self._redraw_pending = False
+        dirty, self._dirty = self._dirty, set()
+        shown_text = self._shown_text
+        shown_fill = self._shown_fill
+        for cell in dirty:
+            text = self.get(*cell)
+            if shown_text[cell] != text:
+                shown_text[cell] = text
+                self.canvas.itemconfigure(self._texts[cell], text=text)
+            fill = self._cell_bg(*cell)
+            if shown_fill[cell] != fill:
+                shown_fill[cell] = fill
+                self.canvas.itemconfigure(self._rects[cell], fill=fill)
+
+    # ===== SELECTION =====
+
+    def _selection_cells(self, selection):
+        if selection is None:
+            return []
+        r0, c0, r1, c1 = selection
+        return [(r, c) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+    def select(self, start, end):
+        """Select the rectangle spanned by two cells."""
+        old = self.selection
+        self.selection = (
+            min(start[0], end[0]), min(start[1], end[1]),
+            max(start[0], end[0]), max(start[1], end[1]),
+        )
+        if old == self.selection:
+            return
+        for cell in set(self._selection_cells(old)) ^ set(self._selection_cells(self.selection)):
+            self._mark_dirty(cell)
+
+    def select_all(self):
+        self.select((0, 0), (self.rows - 1, self.cols - 1))
+
+    def set_active(self, row, col, extend=False):
+        row = max(-1, min(self.rows - 1, row))
+        col = max(-1, min(self.cols - 1, col))
+        if row < 0 and col < 0:
+            return
+        self.active = (row, col)
+        self.canvas.coords(self._active_item, *self.cell_bbox(row, col))
+        if not extend or self.select_anchor is None:
+            self.select_anchor = self.active
+        self.select(self.select_anchor, self.active)
+
+    def selection_text(self):
+        """Selected range as tab-separated text."""
+        if self.selection is None:
+            return ""
+        r0, c0, r1, c1 = self.selection
+        return '\n'.join(
+            '\t'.join(self.get(r, c) for c in range(c0, c1 + 1))
+            for r in range(r0, r1 + 1)
+        )
+
+    def paste(self, parsed):
+        """
+        Paste a vo_ve_tsv.ParsedTable.
+
+        A block with axes fills the axes and the grid from the top-left
+        corner; a block without them lands with its top-left at the
+        active cell. Cells outside the table are dropped.
+        """
+        self.finish_edit()
+        changed = []
+        if parsed.has_axes:
+            start_row, start_col = 0, 0
+            for c, value in enumerate(parsed.x_values[:self.cols]):
+                self.set_value(-1, c, value, PASTE_FORMAT)
+                changed.append((-1, c))
+            for r, value in enumerate(parsed.y_values[:self.rows]):
+                self.set_value(r, -1, value, PASTE_FORMAT)
+                changed.append((r, -1))
+        else:
+            start_row, start_col = self.active
+
+        for i in range(min(parsed.rows, self.rows - start_row)):
+            r = start_row + i
+            for j in range(min(parsed.cols, self.cols - start_col)):
+                c = start_col + j
+                if r < 0 and c < 0:
+                    continue
+                self.set_value(r, c, parsed.get(i, j), PASTE_FORMAT)
+                changed.append((r, c))
+        self._notify(changed)
+
+    def _notify(self, changed):
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+
+    # ===== EDITING =====
+
+    def begin_edit(self, initial=None):
+        """Open the editor overlay on the active cell."""
+        self.finish_edit()
+        row, col = self.active
+        x1, y1, x2, y2 = self.cell_bbox(row, col)
+        self.editing = (row, col)
+        self.editor.delete(0, tk.END)
+        self.editor.insert(0, self.get(row, col) if initial is None else initial)
+        self.canvas.coords(self._editor_item, x1, y1)
+        self.canvas.itemconfigure(self._editor_item, width=x2 - x1, height=y2 - y1,
+                                  state='normal')
+        self.editor.focus_set()
+        self.editor.icursor(tk.END)
+
+    def finish_edit(self, commit=True, refocus=True):
+        """Close the editor overlay, storing its text unless commit is False."""
+        if self.editing is None:
+            return
+        row, col = self.editing
+        self.editing = None
+        self.canvas.itemconfigure(self._editor_item, state='hidden')
+        if commit:
+            text = self.editor.get().strip()
+            if text != self.get(row, col):
+                self.set(row, col, text)
+                self._notify([(row, col)])
+        if refocus:
+            self.canvas.focus_set()
+
+    # ===== EVENTS =====
+
+    def _bind(self):
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.begin_edit())
+        self.canvas.bind("<Key>", self._on_key)
+        self.editor.bind("<Return>", lambda e: self._editor_move(1, 0))
+        self.editor.bind("<Tab>", lambda e: self._editor_tab(e))
+        self.editor.bind("<Up>", lambda e: self._editor_move(-1, 0))
+        self.editor.bind("<Down>", lambda e: self._editor_move(1, 0))
+        self.editor.bind("<Escape>", lambda e: self.finish_edit(commit=False) or "break")
+        self.editor.bind("<FocusOut>", lambda e: self.finish_edit(refocus=False))
+
+    def _on_click(self, event):
+        self.finish_edit()
+        self.canvas.focus_set()
+        row, col = self.cell_at(event.x, event.y)
+        self.set_active(row, col, extend=bool(event.state & SHIFT_MASK))
+
+    def _on_drag(self, event):
+        row, col = self.cell_at(event.x, event.y)
+        if (row, col) != self.active:
+            self.set_active(row, col, extend=True)
+
+    def _editor_move(self, d_row, d_col):
+        self.finish_edit()
+        row, col = self.active
+        self.set_active(row + d_row, col + d_col)
+        return "break"
+
+    def _editor_tab(self, event):
+        self.finish_edit()
+        self._tab(backwards=bool(event.state & SHIFT_MASK))
+        return "break"
+
+    def _tab(self, backwards=False):
+        """Tab order: along the axis for axis cells, row-major through data."""
+        row, col = self.active
+        step = -1 if backwards else 1
+        if row < 0:
+            self.set_active(row, (col + step) % self.cols)
+        elif col < 0:
+            self.set_active((row + step) % self.rows, col)
+        else:
+            index = (row * self.cols + col + step) % (self.rows * self.cols)
+            self.set_active(*divmod(index, self.cols))
+
+    def _on_key(self, event):
+        row, col = self.active
+        extend = bool(event.state & SHIFT_MASK)
+        moves = {'Up': (-1, 0), 'Down': (1, 0), 'Left': (0, -1), 'Right': (0, 1)}
+
+        if event.keysym in moves:
+            d_row, d_col = moves[event.keysym]
+            self.set_active(row + d_row, col + d_col, extend=extend)
+            return "break"
+        if event.keysym == 'Tab':
+            self._tab(backwards=extend)
+            return "break"
+        if event.keysym in ('Return', 'F2'):
+            self.begin_edit()
+            return "break"
+        if event.keysym in ('Delete', 'BackSpace'):
+            changed = [cell for cell in self._selection_cells(self.selection)
+                       if self.get(*cell) and not (cell[0] < 0 and cell[1] < 0)]
+            for cell in changed:
+                self.set(cell[0], cell[1], "")
+            self._notify(changed)
+            return "break"
+        if event.char and event.char.isprintable() and not event.state & CONTROL_MASK:
+            self.begin_edit(initial=event.char)
+            return "break"
+        return None
+
+    def owns_focus(self, widget):
+        """True if widget is this table's canvas or its editor."""
+        return widget is self.canvas or widget is self.editor
@@ -0,0 +1,382 @@
+"""
+Batch command-line converter.
+
+Converts every 8x12 VO map found in the given files, directories or glob
+patterns into 16x16 VO and VE tables without starting the GUI:
+
+    python vo_ve_cli.py maps/ -o out/ --displacement 2.8 --iat 25
+
+Map files are tab-separated, see vo_ve_tsv. Maps without embedded axes use
+--x-axis / --y-axis. --source-shape and --target-shape switch away from the
+8x12 -> 16x16 MS4x layout, --x-method / --y-method pick how the target
+axes are generated and --kernel the resampler (bilinear, cubic, pchip,
+spline). --relax swaps the fixed vertical smoothing passes for a 2D
+Gauss-Seidel/SOR solver that runs to --tolerance. Per-file displacement and IAT come from an optional
+--overrides file with one "name<TAB>displacement<TAB>iat" line per map.
+--iat-map replaces the single IAT with a table over RPM and MAP, --coolant
+blends IAT and coolant temperature into a charge temperature per cell.
+Results are cached on disk (see vo_ve_cache), so a re-run only converts
+the maps or settings that changed; --no-cache turns this off, --cache-dir
+and --cache-size move and bound it.
+--verify writes nothing; it runs every map VO -> VE -> VO in memory and
+prints the round-trip error per map, exiting with 1 when a map exceeds
+--verify-tolerance or loses cells.
+--workers spreads the maps over several processes. --profile prints
+per-stage timings at the end, --profile-dump writes a cProfile file.
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+import vo_ve_batch
+import vo_ve_cache
+import vo_ve_engine as engine
+import vo_ve_profile as profile
+import vo_ve_tsv
+
+MAP_EXTENSIONS = ('.tsv', '.txt')
+
+
+def parse_axis(text):
+    """Parse a comma-separated axis given on the command line."""
+    try:
+        return [float(v) for v in text.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid axis {text!r}")
+
+
+def parse_shape(text):
+    """Parse a ROWSxCOLS shape given on the command line."""
+    try:
+        rows, cols = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shape {text!r}, expected ROWSxCOLS")
+    if rows < 1 or cols < 1:
+        raise argparse.ArgumentTypeError(f"Invalid shape {text!r}")
+    return rows, cols
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories and glob patterns to a sorted list of map files."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in sorted(os.listdir(pattern)):
+                if name.lower().endswith(MAP_EXTENSIONS):
+                    paths.append(os.path.join(pattern, name))
+        elif os.path.isfile(pattern):
+            paths.append(pattern)
+        else:
+            paths.extend(sorted(p for p in glob.glob(pattern) if os.path.isfile(p)))
+
+    # Keep first occurrence only, input order otherwise preserved
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def map_name(path):
+    """Name a map is known by in the overrides file and in output files."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_overrides(path):
+    """
+    Read per-map displacement/IAT overrides.
+
+    Each non-empty, non-comment line is "name<TAB>displacement<TAB>iat";
+    an empty field keeps the command-line default.
+    """
+    overrides = {}
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            fields = [v.strip() for v in line.rstrip('\r\n').split('\t')]
+            fields += [""] * (3 - len(fields))
+            name, displacement, iat = fields[:3]
+            try:
+                overrides[name] = (
+                    float(displacement) if displacement else None,
+                    float(iat) if iat else None,
+                )
+            except ValueError:
+                raise engine.ConversionError(f"{path}:{lineno}: invalid override {line.strip()!r}")
+    return overrides
+
+
+def read_iat_map(path):
+    """Read an IAT table with RPM/MAP axes (tab-separated, see vo_ve_tsv) as an IatMap."""
+    with open(path, encoding='utf-8') as f:
+        table = vo_ve_tsv.parse_block(f.read(), allow_blank=False)
+    if not table.has_axes:
+        raise engine.ConversionError(f"{path}: IAT map needs its RPM and MAP axes")
+    return engine.IatMap(table.x_values, table.y_values, table.grid())
+
+
+def iat_model(iat, iat_map=None, coolant=None, bias_max=engine.CHARGE_BIAS_MAX,
+              bias_min=engine.CHARGE_BIAS_MIN):
+    """IAT argument for one map: the scalar, the IAT map, either blended with coolant."""
+    model = iat if iat_map is None else iat_map
+    if coolant is not None:
+        model = engine.ChargeTemperature(model, coolant, bias_max, bias_min)
+    return model
+
+
+def iter_jobs(paths, args, overrides):
+    """Yield (path, name, displacement, iat) per map, overrides applied."""
+    for path in paths:
+        name = map_name(path)
+        displacement, iat = overrides.get(name, (None, None))
+        if displacement is None:
+            displacement = args.displacement
+        if iat is None:
+            iat = args.iat
+        yield path, name, displacement, iat
+
+
+def convert_file(path, displacement, iat, x_axis=None, y_axis=None,
+                 source_shape=(engine.SRC_ROWS, engine.SRC_COLS), layout=None, kernel=None,
+                 relaxation=None, cache=None):
+    """
+    Read one map file and convert it, through cache (a ResultCache) when
+    given. Returns a ConversionResult.
+    """
+    x_values, y_values, grid = vo_ve_tsv.read_table(path, *source_shape)
+    if x_values is None:
+        x_values = x_axis
+    if y_values is None:
+        y_values = y_axis
+    if x_values is None or y_values is None:
+        raise engine.ConversionError("Map has no axes; pass --x-axis and --y-axis")
+    if cache is not None:
+        return cache.convert(x_values, y_values, grid, displacement, iat, layout, kernel,
+                             relaxation)
+    return engine.convert_map(x_values, y_values, grid, displacement, iat, layout, kernel,
+                              relaxation)
+
+
+def verify_file(path, displacement, iat, x_axis=None, y_axis=None,
+                source_shape=(engine.SRC_ROWS, engine.SRC_COLS), layout=None, kernel=None,
+                relaxation=None, decimals=None):
+    """Convert one map file and check the VE -> VO inverse. Returns a RoundTripReport."""
+    result = convert_file(path, displacement, iat, x_axis, y_axis, source_shape, layout, kernel,
+                          relaxation)
+    return engine.verify_roundtrip(result.vo_grid, result.new_x, result.new_y, displacement, iat,
+                                   decimals)
+
+
+def write_result(output_dir, name, result):
+    """
+    Write <name>_vo16.tsv and <name>_ve16.tsv with axes; other target
+    shapes are named <name>_vo<rows>x<cols>.tsv.
+    """
+    rows, cols = len(result.new_y), len(result.new_x)
+    size = "16" if (rows, cols) == (engine.DST_ROWS, engine.DST_COLS) else f"{rows}x{cols}"
+    vo_path = os.path.join(output_dir, f"{name}_vo{size}.tsv")
+    ve_path = os.path.join(output_dir, f"{name}_ve{size}.tsv")
+    vo_ve_tsv.write_table(vo_path, result.vo_grid, result.new_x, result.new_y)
+    vo_ve_tsv.write_table(ve_path, result.ve_grid, result.new_x, result.new_y)
+    return vo_path, ve_path
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Convert 8x12 VO maps to 16x16 VO and VE tables."
+    )
+    parser.add_argument('inputs', nargs='+', help="map files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', default='.', help="directory for result tables")
+    parser.add_argument('--displacement', type=float, default=1.6, help="displacement in dm³ (default 1.6)")
+    parser.add_argument('--iat', type=float, default=20.0, help="intake air temperature in °C (default 20)")
+    parser.add_argument('--iat-map', metavar='PATH',
+                        help="IAT table with RPM/MAP axes, replaces --iat and per-map IAT overrides")
+    parser.add_argument('--coolant', type=float,
+                        help="coolant temperature in °C; blends it with the IAT into a charge temperature")
+    parser.add_argument('--charge-bias', type=float, nargs=2, metavar=('MAX', 'MIN'),
+                        default=(engine.CHARGE_BIAS_MAX, engine.CHARGE_BIAS_MIN),
+                        help=f"coolant share of --coolant at zero and full airflow "
+                             f"(default {engine.CHARGE_BIAS_MAX:g} {engine.CHARGE_BIAS_MIN:g})")
+    parser.add_argument('--x-axis', type=parse_axis, help="comma-separated RPM axis for maps without axes")
+    parser.add_argument('--y-axis', type=parse_axis, help="comma-separated MAP axis for maps without axes")
+    parser.add_argument('--overrides', help="tab-separated per-map displacement/IAT file")
+    parser.add_argument('--source-shape', type=parse_shape, default=(engine.SRC_ROWS, engine.SRC_COLS),
+                        help="ROWSxCOLS of the input maps (default 8x12)")
+    parser.add_argument('--target-shape', type=parse_shape, default=(engine.DST_ROWS, engine.DST_COLS),
+                        help="ROWSxCOLS of the output tables (default 16x16)")
+    parser.add_argument('--x-method', choices=engine.AXIS_METHODS, default='ms4x',
+                        help="how the target RPM axis is generated (default ms4x)")
+    parser.add_argument('--y-method', choices=engine.AXIS_METHODS, default='ms4x',
+                        help="how the target MAP axis is generated (default ms4x)")
+    parser.add_argument('--x-template', type=parse_axis, help="comma-separated RPM breakpoints for --x-method template")
+    parser.add_argument('--y-template', type=parse_axis, help="comma-separated MAP breakpoints for --y-method template")
+    parser.add_argument('--kernel', choices=list(engine.RESAMPLERS), default=engine.DEFAULT_KERNEL,
+                        help=f"resampling kernel (default {engine.DEFAULT_KERNEL})")
+    parser.add_argument('--spline-smoothing', type=float, default=engine.SPLINE_SMOOTHING,
+                        help=f"curvature penalty of --kernel spline (default {engine.SPLINE_SMOOTHING:g})")
+    parser.add_argument('--relax', choices=engine.RELAX_METHODS,
+                        help="smooth along RPM and MAP with this solver instead of two vertical passes")
+    parser.add_argument('--omega', type=float, default=engine.RELAX_OMEGA,
+                        help=f"over-relaxation factor for --relax sor (default {engine.RELAX_OMEGA})")
+    parser.add_argument('--smooth-x', type=float, default=engine.RELAX_STRENGTH_X,
+                        help=f"--relax strength along RPM (default {engine.RELAX_STRENGTH_X})")
+    parser.add_argument('--smooth-y', type=float, default=engine.RELAX_STRENGTH_Y,
+                        help=f"--relax strength along MAP (default {engine.RELAX_STRENGTH_Y})")
+    parser.add_argument('--tolerance', type=float, default=engine.RELAX_TOLERANCE,
+                        help=f"--relax stops when no cell moves more than this (default {engine.RELAX_TOLERANCE:g})")
+    parser.add_argument('--max-iterations', type=int, default=engine.RELAX_MAX_ITERATIONS,
+                        help=f"--relax iteration limit (default {engine.RELAX_MAX_ITERATIONS})")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="result cache directory (default ~/.cache/vo_ve_converter/results, "
+                             "or under VO_VE_CACHE_DIR)")
+    parser.add_argument('--cache-size', type=float, default=vo_ve_cache.DEFAULT_MAX_BYTES / 2 ** 20,
+                        metavar='MB', help=f"result cache size limit in MB "
+                                           f"(default {vo_ve_cache.DEFAULT_MAX_BYTES // 2 ** 20})")
+    parser.add_argument('--no-cache', action='store_true', help="convert every map, skip the result cache")
+    parser.add_argument('--verify', action='store_true',
+                        help="check the VO -> VE -> VO round trip of every map instead of writing tables")
+    parser.add_argument('--verify-decimals', type=int, metavar='N',
+                        help="round VE to N decimals between the two steps, like the text tables (3)")
+    parser.add_argument('--verify-tolerance', type=float, default=1e-9,
+                        help="largest relative round-trip error a map may have (default 1e-9)")
+    parser.add_argument('--profile', action='store_true',
+                        help="print per-stage timings (stages run in worker processes are not counted)")
+    parser.add_argument('--profile-dump', metavar='PATH', help="also write cProfile stats to PATH")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help="worker processes, 0 for one per core (default 1)")
+    parser.add_argument('--chunksize', type=int, default=vo_ve_batch.DEFAULT_CHUNKSIZE,
+                        help=f"maps sent to a worker at a time (default {vo_ve_batch.DEFAULT_CHUNKSIZE})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile or args.profile_dump:
+        profile.enable(args.profile_dump)
+
+    try:
+        layout = engine.TargetLayout(*args.target_shape, x_method=args.x_method, y_method=args.y_method,
+                                     x_template=args.x_template, y_template=args.y_template)
+        kernel = engine.get_resampler(args.kernel)
+        if args.kernel == 'spline':
+            kernel = engine.SplineResampler(args.spline_smoothing)
+        relaxation = None
+        if args.relax:
+            relaxation = engine.Relaxation(args.smooth_x, args.smooth_y, args.relax, args.omega,
+                                           args.tolerance, args.max_iterations)
+        cache = None
+        if not args.no_cache and not args.verify:
+            cache = vo_ve_cache.ResultCache(args.cache_dir, int(args.cache_size * 2 ** 20))
+        iat_map = read_iat_map(args.iat_map) if args.iat_map else None
+        bias_max, bias_min = args.charge_bias
+        if args.coolant is not None:
+            # Check the blend settings once before any map is converted
+            iat_model(args.iat, iat_map, args.coolant, bias_max, bias_min)
+    except (OSError, engine.ConversionError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    overrides = {}
+    if args.overrides:
+        try:
+            overrides = read_overrides(args.overrides)
+        except (OSError, engine.ConversionError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        print("Error: no map files found", file=sys.stderr)
+        return 2
+
+    if args.verify:
+        return verify_maps(paths, args, overrides, layout, kernel, relaxation, iat_map,
+                           bias_max, bias_min)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [
+        (path, displacement, iat_model(iat, iat_map, args.coolant, bias_max, bias_min),
+         args.x_axis, args.y_axis, args.source_shape, layout, kernel, relaxation, cache)
+        for path, name, displacement, iat in iter_jobs(paths, args, overrides)
+    ]
+    workers = args.workers if args.workers > 0 else None
+
+    failed = 0
+    cached = 0
+    for item in vo_ve_batch.run_batch(convert_file, jobs, workers=workers,
+                                      chunksize=args.chunksize):
+        path, displacement, iat = item.job[:3]
+        if item.ok:
+            try:
+                write_result(args.output_dir, map_name(path), item.result)
+            except OSError as e:
+                item.error = str(e)
+        if not item.ok:
+            failed += 1
+            print(f"FAIL {path}: {item.error}", file=sys.stderr, flush=True)
+            continue
+        cached += item.result.cached
+        details = f"{item.result.mode}, {displacement:g} dm³, {engine.as_iat_model(iat)}"
+        relaxed = item.result.relaxation
+        if relaxed is not None:
+            state = "" if relaxed.converged else ", not converged"
+            details += f", {relaxed.iterations} iterations, residual {relaxed.residual:.1e}{state}"
+        print(f"OK   {path} ({details}{', cached' if item.result.cached else ''})", flush=True)
+
+    summary = f"{len(paths) - failed}/{len(paths)} maps converted"
+    if cache is not None:
+        summary += f", {cached} from cache"
+    print(summary, file=sys.stderr)
+    if profile.enabled:
+        print(profile.report(), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def verify_maps(paths, args, overrides, layout, kernel, relaxation, iat_map, bias_max, bias_min):
+    """--verify: print one line of round-trip errors per map and a summary."""
+    jobs = [
+        (path, displacement, iat_model(iat, iat_map, args.coolant, bias_max, bias_min),
+         args.x_axis, args.y_axis, args.source_shape, layout, kernel, relaxation,
+         args.verify_decimals)
+        for path, name, displacement, iat in iter_jobs(paths, args, overrides)
+    ]
+    workers = args.workers if args.workers > 0 else None
+
+    print(f"{'map':32} {'max abs':>9} {'mean abs':>9} {'max rel':>9} {'mean rel':>9} "
+          f"{'missing':>7}  result")
+    failed = 0
+    worst = None
+    for item in vo_ve_batch.run_batch(verify_file, jobs, workers=workers,
+                                      chunksize=args.chunksize):
+        name = map_name(item.job[0])
+        if not item.ok:
+            failed += 1
+            print(f"{name:32} {'':>9} {'':>9} {'':>9} {'':>9} {'':>7}  ERROR {item.error}", flush=True)
+            continue
+        report = item.result
+        passed = report.passed(args.verify_tolerance)
+        failed += not passed
+        if worst is None or report.max_rel > worst[1].max_rel:
+            worst = (name, report)
+        print(f"{name:32} {report.max_abs:9.2e} {report.mean_abs:9.2e} {report.max_rel:9.2e} "
+              f"{report.mean_rel:9.2e} {len(report.missing):7d}  {'ok' if passed else 'FAIL'}",
+              flush=True)
+
+    summary = f"{len(paths) - failed}/{len(paths)} maps within {args.verify_tolerance:g}"
+    if worst is not None:
+        summary += f", worst {worst[0]} ({worst[1].max_rel:.2e} at cell {worst[1].worst_rel_cell})"
+    print(summary, file=sys.stderr)
+    if profile.enabled:
+        print(profile.report(), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,22 @@
+# First, so the startup trace covers every import below
+import vo_ve_profile as profile
+
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import filedialog, messagebox, simpledialog
 import os
 import sys
+import time
+
+import vo_ve_engine as engine
+import vo_ve_session
+import vo_ve_tsv
+from vo_ve_canvas import PASTE_FORMAT, CanvasTable
+from vo_ve_incremental import IncrementalConverter
+from vo_ve_model import TableModel
+
+profile.mark('imports')
+
+SESSION_FILETYPES = [("VO/VE session", "*" + vo_ve_session.SESSION_EXTENSION), ("All files", "*.*")]
 
 
 class TableEditor:
@@ -13,46 +28,64 @@ class TableEditor:
 
         # Set window icon
         self.set_icon()
+        profile.mark('icon')
 
         # 8x12 table settings
-        self.rows = 8
-        self.cols = 12
+        self.rows = engine.SRC_ROWS
+        self.cols = engine.SRC_COLS
 
         # 16x16 table settings
-        self.new_rows = 16
-        self.new_cols = 16
+        self.new_rows = engine.DST_ROWS
+        self.new_cols = engine.DST_COLS
 
-        # Storage for 8x12 table
-        self.x_labels = []
-        self.y_labels = []
-        self.cells = []
-
-        # Storage for 16x16 extended table (VO)
-        self.new_x_labels = []
-        self.new_y_labels = []
-        self.new_cells = []
-
-        # Storage for 16x16 VE table
-        self.ve_x_labels = []
-        self.ve_y_labels = []
-        self.ve_cells = []
+        # Tables (CanvasTable widgets), created in create_ui; the VE table
+        # is only built once the window is up, see the ve_table property
+        self.src_table = None
+        self.vo_table = None
+        self._ve_table = None
 
         # User inputs
         self.displacement_var = tk.StringVar(value="1.6")
         self.iat_var = tk.StringVar(value="20")
-
-        # Grids and axes used for calculations
-        self.vo_grid = None
+        self.live_var = tk.BooleanVar(value=False)
+        self.kernel_var = tk.StringVar(value=engine.DEFAULT_KERNEL)
+        self.relax_var = tk.BooleanVar(value=False)
+
+        # Table shapes and target axis generation, see engine.TargetLayout
+        self.layout = engine.DEFAULT_LAYOUT
+        self.src_rows_var = tk.StringVar(value=str(self.rows))
+        self.src_cols_var = tk.StringVar(value=str(self.cols))
+        self.dst_rows_var = tk.StringVar(value=str(self.new_rows))
+        self.dst_cols_var = tk.StringVar(value=str(self.new_cols))
+        self.x_method_var = tk.StringVar(value=self.layout.x_method)
+        self.y_method_var = tk.StringVar(value=self.layout.y_method)
+
+        # Target axes used for calculations; the grids themselves live in
+        # the tables' models (CanvasTable.model)
+        self.relaxed = None
         self.new_x = None
         self.new_y = None
 
-        # Selection tracking
-        self.selection_start = None
-        self.selected_cells = []
-        self.current_table = None
+        # Resampler and relaxation of a loaded session, used while the
+        # kernel menu and relaxation box still select them
+        self.session_kernel = None
+        self.session_relaxation = None
+
+        # Live (incremental) recalculation state, see IncrementalConverter
+        self.live = None
+
+        # Stage timings, only shown when profiling is enabled
+        self.status_var = tk.StringVar(value="")
 
         self.create_ui()
         self.bind_events()
+        if profile.enabled:
+            self.update_status()
+        profile.mark('ui')
+        self.root.after_idle(self.on_first_idle)
+
+        self.displacement_var.trace_add("write", lambda *args: self.on_parameter_edit())
+        self.iat_var.trace_add("write", lambda *args: self.on_parameter_edit())
 
     def set_icon(self):
         """Set window icon from logo.ico located near exe/py."""
@@ -80,6 +113,20 @@ class TableEditor:
             pass
 
     def create_ui(self):
+        # ===== MENU =====
+        menubar = tk.Menu(self.root)
+        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label="Open Session...", command=self.open_session)
+        file_menu.add_command(label="Save Session...", command=self.save_session)
+        file_menu.add_command(label="Add to Workspace...", command=self.add_to_workspace)
+        menubar.add_cascade(label="File", menu=file_menu)
+        self.root.config(menu=menubar)
+
+        # ===== STATUS BAR (profiling only) =====
+        if profile.enabled:
+            tk.Label(self.root, textvariable=self.status_var, anchor="w", relief=tk.SUNKEN,
+                     font=('Arial', 8)).pack(side=tk.BOTTOM, fill=tk.X)
+
         # ===== MAIN CONTAINER =====
         main_frame = tk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -91,36 +138,21 @@ class TableEditor:
         # ----- 8x12 VO TABLE -----
         frame_8x12 = tk.LabelFrame(top_frame, text="Original 8x12 Table (VO)")
         frame_8x12.pack(side=tk.LEFT, padx=(0, 20))
+        self.src_frame = frame_8x12
 
-        # X-axis labels (columns)
-        for col in range(self.cols):
-            entry = tk.Entry(frame_8x12, width=6, bg="#d0d0d0", font=('Arial', 8))
-            entry.grid(row=0, column=col + 1, padx=1, pady=1)
-            entry.insert(0, str(col + 1))
-            self.bind_axis_navigation(entry, self.x_labels, "x", col, "8x12")
-            self.x_labels.append(entry)
-
-        # Y-axis labels (rows) + data cells
-        for row in range(self.rows):
-            label_entry = tk.Entry(frame_8x12, width=6, bg="#d0d0d0", font=('Arial', 8))
-            label_entry.grid(row=row + 1, column=0, padx=1, pady=1)
-            label_entry.insert(0, str(row + 1))
-            self.bind_axis_navigation(label_entry, self.y_labels, "y", row, "8x12")
-            self.y_labels.append(label_entry)
-
-            row_cells = []
-            for col in range(self.cols):
-                entry = tk.Entry(frame_8x12, width=6, font=('Arial', 8))
-                entry.grid(row=row + 1, column=col + 1, padx=1, pady=1)
-                self.bind_cell_events(entry, self.cells, row, col, "8x12")
-                row_cells.append(entry)
-            self.cells.append(row_cells)
+        self.src_table = CanvasTable(frame_8x12, self.rows, self.cols, cell_width=48,
+                                     on_change=self.on_source_change)
+        self.src_table.pack(side=tk.TOP, padx=2, pady=2)
+        # Placeholder breakpoints until real axes are pasted
+        self.src_table.set_axis('x', range(1, self.cols + 1))
+        self.src_table.set_axis('y', range(1, self.rows + 1))
 
         # Buttons for 8x12 table
         btn_frame_8x12 = tk.Frame(frame_8x12)
-        btn_frame_8x12.grid(row=self.rows + 2, column=0, columnspan=self.cols + 1, pady=5)
+        btn_frame_8x12.pack(side=tk.TOP, pady=5)
         tk.Button(btn_frame_8x12, text="Clear All", command=self.clear_all).pack(side=tk.LEFT, padx=5)
-        tk.Button(btn_frame_8x12, text="Generate 16x16", command=self.generate_16x16).pack(side=tk.LEFT, padx=5)
+        self.generate_button = tk.Button(btn_frame_8x12, text="Generate 16x16", command=self.generate_16x16)
+        self.generate_button.pack(side=tk.LEFT, padx=5)
 
         # ----- PARAMETERS FRAME -----
         input_frame = tk.LabelFrame(top_frame, text="Parameters")
@@ -136,6 +168,42 @@ class TableEditor:
             row=2, column=0, columnspan=2, pady=10
         )
 
+        tk.Checkbutton(input_frame, text="Live update", variable=self.live_var,
+                       command=self.toggle_live).grid(row=3, column=0, columnspan=2, sticky="w", padx=5)
+
+        tk.Label(input_frame, text="Kernel:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
+        tk.OptionMenu(input_frame, self.kernel_var, *engine.RESAMPLERS,
+                      command=lambda _: self.restart_live()).grid(row=4, column=1, sticky="we", padx=5)
+
+        tk.Checkbutton(input_frame, text="Relaxation smoothing (RPM + MAP)", variable=self.relax_var,
+                       command=self.restart_live).grid(row=5, column=0, columnspan=2, sticky="w", padx=5)
+
+        # ----- TABLE SIZE FRAME -----
+        size_frame = tk.LabelFrame(top_frame, text="Table Size")
+        size_frame.pack(side=tk.LEFT, padx=20, fill=tk.Y)
+
+        tk.Label(size_frame, text="Rows").grid(row=0, column=1, padx=5)
+        tk.Label(size_frame, text="Cols").grid(row=0, column=2, padx=5)
+        tk.Label(size_frame, text="Source:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        tk.Entry(size_frame, textvariable=self.src_rows_var, width=5).grid(row=1, column=1, padx=5)
+        tk.Entry(size_frame, textvariable=self.src_cols_var, width=5).grid(row=1, column=2, padx=5)
+        tk.Label(size_frame, text="Target:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        tk.Entry(size_frame, textvariable=self.dst_rows_var, width=5).grid(row=2, column=1, padx=5)
+        tk.Entry(size_frame, textvariable=self.dst_cols_var, width=5).grid(row=2, column=2, padx=5)
+
+        tk.Label(size_frame, text="RPM axis:").grid(row=3, column=0, sticky="w", padx=5, pady=5)
+        tk.OptionMenu(size_frame, self.x_method_var, *engine.AXIS_METHODS).grid(
+            row=3, column=1, columnspan=2, sticky="we", padx=5
+        )
+        tk.Label(size_frame, text="MAP axis:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
+        tk.OptionMenu(size_frame, self.y_method_var, *engine.AXIS_METHODS).grid(
+            row=4, column=1, columnspan=2, sticky="we", padx=5
+        )
+
+        tk.Button(size_frame, text="Apply", command=self.apply_layout).grid(
+            row=5, column=0, columnspan=3, pady=10
+        )
+
         # ===== BOTTOM ROW: 16x16 VO + 16x16 VE =====
         bottom_frame = tk.Frame(main_frame)
         bottom_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
@@ -143,123 +211,48 @@ class TableEditor:
         # ----- 16x16 VO TABLE -----
         frame_16x16 = tk.LabelFrame(bottom_frame, text="Extended 16x16 Table (VO)")
         frame_16x16.pack(side=tk.LEFT, padx=(0, 10), fill=tk.BOTH, expand=True)
+        self.vo_frame = frame_16x16
 
-        for col in range(self.new_cols):
-            entry = tk.Entry(frame_16x16, width=5, bg="#d0d0d0", font=('Arial', 8))
-            entry.grid(row=0, column=col + 1, padx=1, pady=1)
-            entry.insert(0, "")
-            self.bind_axis_navigation(entry, self.new_x_labels, "x", col, "16x16_vo")
-            self.new_x_labels.append(entry)
-
-        for row in range(self.new_rows):
-            label_entry = tk.Entry(frame_16x16, width=5, bg="#d0d0d0", font=('Arial', 8))
-            label_entry.grid(row=row + 1, column=0, padx=1, pady=1)
-            label_entry.insert(0, "")
-            self.bind_axis_navigation(label_entry, self.new_y_labels, "y", row, "16x16_vo")
-            self.new_y_labels.append(label_entry)
-
-            row_cells = []
-            for col in range(self.new_cols):
-                entry = tk.Entry(frame_16x16, width=5, font=('Arial', 8))
-                entry.grid(row=row + 1, column=col + 1, padx=1, pady=1)
-                self.bind_cell_events(entry, self.new_cells, row, col, "16x16_vo")
-                row_cells.append(entry)
-            self.new_cells.append(row_cells)
+        self.vo_table = CanvasTable(frame_16x16, self.new_rows, self.new_cols)
+        self.vo_table.pack(side=tk.TOP, anchor=tk.NW, padx=2, pady=2)
 
         # ----- 16x16 VE TABLE -----
         frame_ve = tk.LabelFrame(bottom_frame, text="Calculated 16x16 Table (VE)")
         frame_ve.pack(side=tk.LEFT, padx=(10, 0), fill=tk.BOTH, expand=True)
+        self.ve_frame = frame_ve
 
-        for col in range(self.new_cols):
-            entry = tk.Entry(frame_ve, width=5, bg="#d0d0d0", font=('Arial', 8))
-            entry.grid(row=0, column=col + 1, padx=1, pady=1)
-            entry.insert(0, "")
-            self.bind_axis_navigation(entry, self.ve_x_labels, "x", col, "16x16_ve")
-            self.ve_x_labels.append(entry)
-
-        for row in range(self.new_rows):
-            label_entry = tk.Entry(frame_ve, width=5, bg="#d0d0d0", font=('Arial', 8))
-            label_entry.grid(row=row + 1, column=0, padx=1, pady=1)
-            label_entry.insert(0, "")
-            self.bind_axis_navigation(label_entry, self.ve_y_labels, "y", row, "16x16_ve")
-            self.ve_y_labels.append(label_entry)
-
-            row_cells = []
-            for col in range(self.new_cols):
-                entry = tk.Entry(frame_ve, width=5, font=('Arial', 8))
-                entry.grid(row=row + 1, column=col + 1, padx=1, pady=1)
-                self.bind_cell_events(entry, self.ve_cells, row, col, "16x16_ve")
-                row_cells.append(entry)
-            self.ve_cells.append(row_cells)
-
-        # Buttons for VE table
+        # Buttons for VE table, the table goes above them once built
         ve_btn_frame = tk.Frame(frame_ve)
-        ve_btn_frame.grid(row=self.new_rows + 2, column=0, columnspan=self.new_cols + 1, pady=5)
+        ve_btn_frame.pack(side=tk.TOP, pady=5)
+        self.ve_btn_frame = ve_btn_frame
 
         tk.Button(ve_btn_frame, text="Copy VE Table", command=self.copy_ve_table).pack(side=tk.LEFT, padx=5)
         tk.Button(ve_btn_frame, text="Convert VE → VO", command=self.convert_ve_to_vo).pack(side=tk.LEFT, padx=5)
 
-    # ===== UI BINDINGS =====
+    @property
+    def ve_table(self):
+        """VE CanvasTable, built on first use if the window has not got to it yet."""
+        if self._ve_table is None:
+            self.build_ve_table()
+        return self._ve_table
 
-    def bind_axis_navigation(self, entry, axis_list, axis_type, index, table_name):
-        """
-        Custom keyboard navigation for axis entries (X/Y labels).
-        Works for 8x12, 16x16 VO and 16x16 VE axes.
-        """
-        def on_key(event):
-            total = len(axis_list)
-
-            # TAB cycles through entries in this axis list
-            if event.keysym == 'Tab':
-                # Shift+Tab goes backwards
-                shift_pressed = (event.state & 0x0001) != 0
-                if not shift_pressed:
-                    next_index = (index + 1) % total
-                else:
-                    next_index = (index - 1) % total
-                axis_list[next_index].focus_set()
-                return "break"
-
-            # Horizontal navigation on X axis
-            if event.keysym in ('Right', 'Left') and axis_type == "x":
-                if event.keysym == 'Right':
-                    next_index = min(total - 1, index + 1)
-                else:
-                    next_index = max(0, index - 1)
-                axis_list[next_index].focus_set()
-                return "break"
-
-            # Vertical navigation or jump from X axis to first data row
-            if event.keysym == 'Down':
-                if axis_type == "x":
-                    # Jump from RPM axis to first row of data in corresponding table
-                    if table_name == "8x12":
-                        self.cells[0][index].focus_set()
-                    elif table_name == "16x16_vo":
-                        self.new_cells[0][index].focus_set()
-                    elif table_name == "16x16_ve":
-                        self.ve_cells[0][index].focus_set()
-                else:
-                    # Y axis: move down within axis labels
-                    next_index = min(total - 1, index + 1)
-                    axis_list[next_index].focus_set()
-                return "break"
-
-            if event.keysym == 'Up' and axis_type == "y":
-                prev_index = max(0, index - 1)
-                axis_list[prev_index].focus_set()
-                return "break"
+    def build_ve_table(self):
+        if self._ve_table is not None:
+            return
+        self._ve_table = CanvasTable(self.ve_frame, self.new_rows, self.new_cols)
+        self._ve_table.pack(side=tk.TOP, anchor=tk.NW, padx=2, pady=2, before=self.ve_btn_frame)
 
-            return None
+    def on_first_idle(self):
+        """The window is drawn and usable: build the deferred VE table next."""
+        profile.mark('window')
+        self.root.after_idle(self.finish_startup)
 
-        entry.bind("<Key>", on_key)
+    def finish_startup(self):
+        self.build_ve_table()
+        profile.mark('ve_table')
+        profile.write_startup_report()
 
-    def bind_cell_events(self, entry, table_list, row, col, table_name):
-        """Bind mouse and keyboard events for a data cell."""
-        entry.bind("<Button-1>", lambda e, r=row, c=col, t=table_name: self.on_cell_click(e, r, c, t))
-        entry.bind("<B1-Motion>", lambda e, r=row, c=col, t=table_name: self.on_cell_drag(e, r, c, t))
-        entry.bind("<ButtonRelease-1>", lambda e: self.on_cell_release(e))
-        entry.bind("<Key>", lambda e, r=row, c=col, t=table_name: self.on_cell_key(e, r, c, t))
+    # ===== UI BINDINGS =====
 
     def bind_events(self):
         """Bind global keyboard shortcuts."""
@@ -269,551 +262,505 @@ class TableEditor:
 
     # ===== SELECTION AND TABLE HELPERS =====
 
-    def get_table_from_name(self, table_name):
-        if table_name == "8x12":
-            return self.cells
-        elif table_name == "16x16_vo":
-            return self.new_cells
-        elif table_name == "16x16_ve":
-            return self.ve_cells
+    def focused_table(self):
+        """Table whose canvas has keyboard focus, None while a cell editor is open."""
+        focused = self.root.focus_get()
+        for table in (self.src_table, self.vo_table, self._ve_table):
+            if table is not None and focused is table.canvas:
+                return table
         return None
 
-    def get_table_dimensions(self, table_name):
-        if table_name == "8x12":
-            return self.rows, self.cols
-        else:
-            return self.new_rows, self.new_cols
-
-    def on_cell_click(self, event, row, col, table_name):
-        self.clear_selection()
-        self.current_table = table_name
-        self.selection_start = (row, col)
-        self.update_selection(row, col, row, col)
-
-    def on_cell_drag(self, event, row, col, table_name):
-        if self.selection_start is None or self.current_table != table_name:
-            return
-
-        table = self.get_table_from_name(table_name)
-        rows, cols = self.get_table_dimensions(table_name)
-
-        for r in range(rows):
-            for c in range(cols):
-                cell = table[r][c]
-                x1 = cell.winfo_rootx()
-                y1 = cell.winfo_rooty()
-                x2 = x1 + cell.winfo_width()
-                y2 = y1 + cell.winfo_height()
+    def select_all(self, event=None):
+        """Select all cells in the table that has focus."""
+        table = self.focused_table()
+        if table is None:
+            return None
+        table.select_all()
+        return "break"
 
-                if x1 <= event.x_root <= x2 and y1 <= event.y_root <= y2:
-                    self.update_selection(self.selection_start[0], self.selection_start[1], r, c)
-                    return
+    def copy_selection(self, event=None):
+        """Copy selected cell range to clipboard as tab-separated text."""
+        table = self.focused_table()
+        if table is None or table.selection is None:
+            return None
 
-    def on_cell_release(self, event):
-        pass
+        self.root.clipboard_clear()
+        self.root.clipboard_append(table.selection_text())
+        return "break"
 
-    def on_cell_key(self, event, row, col, table_name):
-        """
-        Keyboard navigation for data cells:
-        - Tab / Shift+Tab moves logically through the grid.
-        - Arrow keys move up/down/left/right.
-        """
-        table = self.get_table_from_name(table_name)
+    def handle_paste(self, event=None):
+        """Paste clipboard into the focused table, starting at the active cell."""
+        table = self.focused_table()
         if table is None:
             return None
 
-        rows, cols = self.get_table_dimensions(table_name)
-
-        def clamp(rc, cc):
-            rc = max(0, min(rows - 1, rc))
-            cc = max(0, min(cols - 1, cc))
-            return rc, cc
-
-        if event.keysym == "Tab":
-            shift_pressed = (event.state & 0x0001) != 0
-            if not shift_pressed:
-                new_row, new_col = row, col + 1
-                if new_col >= cols:
-                    new_col = 0
-                    new_row += 1
-                    if new_row >= rows:
-                        new_row = 0
-                new_row, new_col = clamp(new_row, new_col)
-            else:
-                new_row, new_col = row, col - 1
-                if new_col < 0:
-                    new_col = cols - 1
-                    new_row -= 1
-                    if new_row < 0:
-                        new_row = rows - 1
-                new_row, new_col = clamp(new_row, new_col)
-
-            table[new_row][new_col].focus_set()
+        try:
+            clipboard = self.root.clipboard_get()
+        except Exception:
             return "break"
 
-        if event.keysym == "Right":
-            new_row, new_col = clamp(row, col + 1)
-            table[new_row][new_col].focus_set()
-            return "break"
-        if event.keysym == "Left":
-            new_row, new_col = clamp(row, col - 1)
-            table[new_row][new_col].focus_set()
-            return "break"
-        if event.keysym == "Down":
-            new_row, new_col = clamp(row + 1, col)
-            table[new_row][new_col].focus_set()
-            return "break"
-        if event.keysym == "Up":
-            new_row, new_col = clamp(row - 1, col)
-            table[new_row][new_col].focus_set()
+        try:
+            parsed = vo_ve_tsv.parse_block(clipboard)
+        except engine.ConversionError as e:
+            messagebox.showerror("Paste", str(e))
             return "break"
+        table.paste(parsed)
+        return "break"
 
-        return None
+    def clear_all(self):
+        """Clear all cells in the 8x12 VO table."""
+        self.src_table.clear()
+        self.live = None
 
-    def update_selection(self, start_row, start_col, end_row, end_col):
-        self.clear_selection()
+    def copy_ve_table(self):
+        """Copy entire 16x16 VE table to clipboard."""
+        lines = []
+        for row in self.ve_table.values:
+            lines.append('\t'.join(row))
 
-        table = self.get_table_from_name(self.current_table)
-        if table is None:
-            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append('\n'.join(lines))
+        self.show_info("Copied", "VE table copied to clipboard")
 
-        min_row, max_row = min(start_row, end_row), max(start_row, end_row)
-        min_col, max_col = min(start_col, end_col), max(start_col, end_col)
+    # ===== GRID I/O =====
 
-        for r in range(min_row, max_row + 1):
-            for c in range(min_col, max_col + 1):
-                cell = table[r][c]
-                cell.configure(bg="#cce5ff")
-                self.selected_cells.append((r, c))
+    def fill_data_cells(self, old_x, old_y, new_x, new_y):
+        """
+        Create 16x16 VO grid with the engine and write it into the VO table.
+        Returns the grid, or None if the 8x12 input is invalid.
+        """
+        # Clear 16x16 VO table
+        self.vo_table.clear()
 
-    def clear_selection(self):
-        if self.current_table:
-            table = self.get_table_from_name(self.current_table)
-            if table:
-                for r, c in self.selected_cells:
-                    table[r][c].configure(bg="white")
-        self.selected_cells = []
+        # Original 8x12 VO grid, straight from the table model
+        try:
+            old_grid = self.src_table.model.complete_grid()
+        except ValueError:
+            messagebox.showerror("Error", f"All {self.rows}x{self.cols} VO cells must contain valid numbers")
+            return None
 
-    def select_all(self, event=None):
-        """Select all cells in the table where the focused cell lives."""
-        focused = self.root.focus_get()
+        try:
+            relaxation = self.relaxation()
+            if relaxation is None:
+                self.relaxed = None
+                data_grid = engine.interpolate_grid(old_x, old_y, old_grid, new_x, new_y,
+                                                    kernel=self.kernel())
+            else:
+                self.relaxed = engine.interpolate_grid_relaxed(old_x, old_y, old_grid, new_x, new_y,
+                                                               relaxation, kernel=self.kernel())
+                data_grid = self.relaxed.grid
+        except engine.ConversionError as e:
+            messagebox.showerror("Error", str(e))
+            return None
 
-        for table_name, table in [("8x12", self.cells), ("16x16_vo", self.new_cells), ("16x16_ve", self.ve_cells)]:
-            rows, cols = self.get_table_dimensions(table_name)
-            for r in range(rows):
-                for c in range(cols):
-                    if table[r][c] == focused:
-                        self.current_table = table_name
-                        self.selection_start = (0, 0)
-                        self.update_selection(0, 0, rows - 1, cols - 1)
-                        return "break"
-        return None
+        # Write back to GUI 16x16 VO table
+        self.vo_table.set_grid(data_grid)
 
-    def copy_selection(self, event=None):
-        """Copy selected cell range to clipboard as tab-separated text."""
-        if not self.selected_cells or not self.current_table:
-            return
+        return data_grid
 
-        table = self.get_table_from_name(self.current_table)
-        if table is None:
-            return
+    def show_info(self, title, message):
+        """messagebox.showinfo, timed as the 'dialog' stage."""
+        with profile.stage('dialog'):
+            messagebox.showinfo(title, message)
+
+    def update_status(self):
+        """Refresh the profiling status bar twice a second."""
+        self.status_var.set(profile.summary())
+        self.root.after(500, self.update_status)
+
+    def kernel(self):
+        """Selected resampler; a loaded session's own one (e.g. its spline smoothing) while selected."""
+        name = self.kernel_var.get()
+        if self.session_kernel is not None and self.session_kernel.name == name:
+            return self.session_kernel
+        return name
+
+    def relaxation(self):
+        """Relaxation solver when enabled, else None; a loaded session's settings or the defaults."""
+        if not self.relax_var.get():
+            return None
+        return self.session_relaxation or engine.Relaxation()
 
-        min_row = min(r for r, c in self.selected_cells)
-        max_row = max(r for r, c in self.selected_cells)
-        min_col = min(c for r, c in self.selected_cells)
-        max_col = max(c for r, c in self.selected_cells)
+    def read_axis(self, table, axis):
+        """Axis breakpoints of a table as floats, raises ValueError on empty or bad cells."""
+        return table.model.complete_axis(axis)
 
-        lines = []
-        for r in range(min_row, max_row + 1):
-            row_values = []
-            for c in range(min_col, max_col + 1):
-                row_values.append(table[r][c].get())
-            lines.append('\t'.join(row_values))
+    def read_float_grid(self, table):
+        """A table's data cells, blank or unparsable cells are None."""
+        return table.model.grid()
 
-        self.root.clipboard_clear()
-        self.root.clipboard_append('\n'.join(lines))
-        return "break"
+    def read_parameters(self):
+        """Return (displacement, iat) or None after showing an error."""
+        try:
+            displacement = float(self.displacement_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Displacement must be a number")
+            return None
 
-    def handle_paste(self, event=None):
-        """Paste clipboard into the table where the focused cell is."""
-        focused = self.root.focus_get()
+        try:
+            iat = float(self.iat_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "IAT must be a number")
+            return None
 
-        target_table = None
-        start_row, start_col = None, None
-        rows, cols = 0, 0
-
-        for table_name, table in [("8x12", self.cells),
-                                  ("16x16_vo", self.new_cells),
-                                  ("16x16_ve", self.ve_cells)]:
-            r_count, c_count = self.get_table_dimensions(table_name)
-            for r in range(r_count):
-                for c in range(c_count):
-                    if table[r][c] == focused:
-                        target_table = table
-                        start_row, start_col = r, c
-                        rows, cols = r_count, c_count
-                        break
-                if target_table is not None:
-                    break
-            if target_table is not None:
-                break
+        return displacement, iat
 
-        if target_table is None:
-            return
+    # ===== LIVE UPDATE =====
 
+    def read_source(self):
+        """Read 8x12 axes and grid, returns None if any value is not a number."""
         try:
-            clipboard = self.root.clipboard_get()
-        except Exception:
-            return
-
-        lines = clipboard.strip().split('\n')
-        for i, line in enumerate(lines):
-            r = start_row + i
-            if r >= rows:
-                break
-            values = line.split('\t')
-            for j, value in enumerate(values):
-                c = start_col + j
-                if c >= cols:
-                    break
-                cell = target_table[r][c]
-                cell.delete(0, tk.END)
-                cell.insert(0, value.strip())
+            x_values = self.read_axis(self.src_table, 'x')
+            y_values = self.read_axis(self.src_table, 'y')
+            grid = self.src_table.model.complete_grid()
+        except ValueError:
+            return None
+        return x_values, y_values, grid
 
-        return "break"
+    def toggle_live(self):
+        if self.live_var.get():
+            self.restart_live()
+        else:
+            self.live = None
 
-    def clear_all(self):
-        """Clear all cells in the 8x12 VO table."""
-        for row in self.cells:
-            for cell in row:
-                cell.delete(0, tk.END)
+    def restart_live(self):
+        """Rebuild the live state from the 8x12 table and redraw both 16x16 tables."""
+        self.live = None
+        if not self.live_var.get():
+            return
 
-    def copy_ve_table(self):
-        """Copy entire 16x16 VE table to clipboard."""
-        lines = []
-        for row in self.ve_cells:
-            values = [cell.get() for cell in row]
-            lines.append('\t'.join(values))
+        source = self.read_source()
+        if source is None:
+            return
+        try:
+            displacement = float(self.displacement_var.get())
+            iat = float(self.iat_var.get())
+            self.live = IncrementalConverter(*source, displacement, iat, layout=self.layout,
+                                             kernel=self.kernel(),
+                                             relaxation=self.relaxation())
+        except (ValueError, engine.ConversionError):
+            return
 
-        self.root.clipboard_clear()
-        self.root.clipboard_append('\n'.join(lines))
-        messagebox.showinfo("Copied", "VE table copied to clipboard")
-
-    # ===== AXIS EXTENSION =====
-
-    def extend_x_axis(self, values):
-        """Extend RPM axis (X) from 12 columns to 16 using rules for NA/FI."""
-        last_rpm = values[-1]
-        new_x = []
-
-        if last_rpm == 7000:
-            # Classic MS4x-like 320–7000 map extended to 16 cols
-            new_x = values[:8].copy()
-            current = new_x[-1]
-            while len(new_x) < 16:
-                current += 500
-                if current > 7000:
-                    current = 7000
-                new_x.append(current)
-                if current == 7000:
-                    break
-            while len(new_x) < 16:
-                new_x.append(7000)
-
-        elif last_rpm <= 7500:
-            # Slightly higher rev limit – extend with 500 rpm steps
-            new_x = values[:3].copy()
-            current = new_x[-1]
-            while len(new_x) < 16:
-                current += 500
-                if current > last_rpm:
-                    current = last_rpm
-                new_x.append(current)
-                if current == last_rpm:
-                    break
-            while len(new_x) < 16:
-                new_x.append(last_rpm)
+        self.sync_live_axes()
+        self.vo_table.set_grid(self.live.vo_grid)
+        self.ve_table.set_grid(self.live.ve_grid)
+
+    def sync_live_axes(self):
+        self.new_x = self.live.new_x
+        self.new_y = self.live.new_y
+        for table in (self.vo_table, self.ve_table):
+            table.set_axis('x', self.new_x)
+            table.set_axis('y', self.new_y)
+
+    def write_live_cells(self, changed):
+        """Rewrite only the given 16x16 VO/VE cells from the live state."""
+        for r, c in changed:
+            self.vo_table.set_value(r, c, self.live.vo_grid[r][c])
+            self.ve_table.set_value(r, c, self.live.ve_grid[r][c])
+
+    def on_source_change(self, cells):
+        """8x12 table edited: single edits go incremental, pastes rebuild."""
+        if not self.live_var.get():
+            return
+        if self.live is None or len(cells) != 1:
+            self.restart_live()
+            return
 
+        row, col = cells[0]
+        if row < 0:
+            self.on_source_axis_edit('x', col)
+        elif col < 0:
+            self.on_source_axis_edit('y', row)
         else:
-            # High-rev setup – custom final steps up to 8000
-            new_x = values[:3].copy()
-            current = new_x[-1]
-            current += 700
-            new_x.append(current)
-            current += 600
-            new_x.append(current)
-
-            while len(new_x) < 16:
-                current += 500
-                if current > 8000:
-                    current = 8000
-                new_x.append(current)
-                if current == 8000:
-                    break
-            while len(new_x) < 16:
-                new_x.append(8000)
+            self.on_source_edit(row, col)
 
-        return new_x
+    def on_source_edit(self, row, col):
+        """8x12 cell edited: recompute only the dependent 16x16 cells."""
+        value = self.src_table.model.get(row, col)
+        if value is None:
+            # Wait until the cell holds a number again
+            return
+        self.write_live_cells(self.live.set_cell(row, col, value))
 
-    def extend_y_axis(self, values):
-        """Extend MAP axis (Y) from 8 rows to 16 rows, NA vs FI preset."""
-        max_kpa = max(values)
-        if max_kpa <= 125:
-            # NA preset
-            return [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 60, 70, 80, 90, 105, 125]
-        else:
-            # Boost preset
-            return [10, 20, 30, 35, 40, 45, 50, 60, 70, 80, 90, 105, 125, 200, 250, 300]
+    def on_source_axis_edit(self, axis, index):
+        """8x12 axis edited: the plan changes, so both tables are rebuilt."""
+        value = self.src_table.model.get(-1, index) if axis == 'x' else self.src_table.model.get(index, -1)
+        if value is None:
+            return
+        try:
+            changed = self.live.set_axis_value(axis, index, value)
+        except engine.ConversionError:
+            return
+        self.sync_live_axes()
+        self.write_live_cells(changed)
 
-    # ===== INTERPOLATION + VERTICAL SMOOTHING =====
+    def on_parameter_edit(self):
+        """Displacement/IAT edited: VO stays, every VE cell is rescaled."""
+        if self.live is None or not self.live_var.get():
+            return
+        try:
+            self.live.set_parameters(float(self.displacement_var.get()), float(self.iat_var.get()))
+        except (ValueError, engine.ConversionError):
+            return
+        self.ve_table.set_grid(self.live.ve_grid)
 
-    def bilinear_interpolate_point(self, x, y, x_vals, y_vals, grid):
-        """
-        Bilinear interpolation of VO value at point (x, y)
-        from original 8x12 grid defined by x_vals, y_vals and grid[row][col].
-        """
-        cols = len(x_vals)
-        rows = len(y_vals)
-
-        # Find bracketing x indices
-        if x <= x_vals[0]:
-            k0 = k1 = 0
-        elif x >= x_vals[-1]:
-            k0 = k1 = cols - 1
-        else:
-            k0 = 0
-            for k in range(cols - 1):
-                if x_vals[k] <= x <= x_vals[k + 1]:
-                    k0 = k
-                    break
-            k1 = k0 + 1
+    # ===== TABLE SIZE =====
 
-        # Find bracketing y indices
-        if y <= y_vals[0]:
-            l0 = l1 = 0
-        elif y >= y_vals[-1]:
-            l0 = l1 = rows - 1
-        else:
-            l0 = 0
-            for l in range(rows - 1):
-                if y_vals[l] <= y <= y_vals[l + 1]:
-                    l0 = l
-                    break
-            l1 = l0 + 1
-
-        x0, x1 = x_vals[k0], x_vals[k1]
-        y0, y1 = y_vals[l0], y_vals[l1]
-
-        q00 = grid[l0][k0]
-        q10 = grid[l0][k1]
-        q01 = grid[l1][k0]
-        q11 = grid[l1][k1]
-
-        # Edge cases where interpolation reduces to 1D or a single point
-        if k0 == k1 and l0 == l1:
-            return q00
-        if k0 == k1:
-            if y1 == y0:
-                return q00
-            t = (y - y0) / (y1 - y0)
-            return q00 + (q01 - q00) * t
-        if l0 == l1:
-            if x1 == x0:
-                return q00
-            t = (x - x0) / (x1 - x0)
-            return q00 + (q10 - q00) * t
-
-        # Full bilinear interpolation
-        tx = 0 if x1 == x0 else (x - x0) / (x1 - x0)
-        ty = 0 if y1 == y0 else (y - y0) / (y1 - y0)
-
-        a = q00 * (1 - tx) + q10 * tx
-        b = q01 * (1 - tx) + q11 * tx
-        return a * (1 - ty) + b * ty
-
-    def vertical_smooth(self, grid, fixed_mask, beta=0.6, iterations=2):
+    def read_layout(self):
         """
-        Stronger vertical smoothing along MAP (Y) axis.
+        Build the source shape and TargetLayout from the size controls.
+        Returns (rows, cols, layout) or None after showing an error.
 
-        For each non-fixed cell, pull it towards the average of the cell above
-        and below. beta controls how strong the smoothing is (0..1), iterations
-        how many passes we do.
+        The template axis method takes its breakpoints from the axes
+        currently shown in the target VO table.
         """
-        rows = len(grid)
-        cols = len(grid[0]) if rows > 0 else 0
+        try:
+            rows, cols, new_rows, new_cols = (
+                int(var.get()) for var in (self.src_rows_var, self.src_cols_var,
+                                           self.dst_rows_var, self.dst_cols_var)
+            )
+        except ValueError:
+            messagebox.showerror("Error", "Table sizes must be whole numbers")
+            return None
+        if min(rows, cols) < 2:
+            messagebox.showerror("Error", "Source table needs at least 2 rows and 2 columns")
+            return None
 
-        for _ in range(iterations):
-            new_grid = [row[:] for row in grid]
-            for r in range(1, rows - 1):  # skip first/last row (need both neighbors)
-                for c in range(cols):
-                    if fixed_mask[r][c]:
-                        continue
+        x_method = self.x_method_var.get()
+        y_method = self.y_method_var.get()
+        try:
+            x_template = self.read_axis(self.vo_table, 'x') if x_method == 'template' else None
+            y_template = self.read_axis(self.vo_table, 'y') if y_method == 'template' else None
+        except ValueError:
+            messagebox.showerror("Error", "Template axes must be filled in the VO table")
+            return None
 
-                    up = grid[r - 1][c]
-                    down = grid[r + 1][c]
-                    avg = (up + down) / 2.0
+        try:
+            layout = engine.TargetLayout(new_rows, new_cols, x_method, y_method, x_template, y_template)
+        except engine.ConversionError as e:
+            messagebox.showerror("Error", str(e))
+            return None
+        return rows, cols, layout
 
-                    new_grid[r][c] = grid[r][c] * (1.0 - beta) + avg * beta
+    def apply_layout(self):
+        """Resize the tables to the configured shapes; resized tables are cleared."""
+        result = self.read_layout()
+        if result is None:
+            return
+        self.set_layout(*result)
 
-            grid = new_grid
+    def set_layout(self, rows, cols, layout):
+        """Resize the tables to a source shape and TargetLayout; resized tables are cleared."""
+        self.layout = layout
 
-        return grid
+        if (rows, cols) != (self.rows, self.cols):
+            self.rows, self.cols = rows, cols
+            self.src_table.resize(rows, cols)
+            self.src_table.set_axis('x', range(1, cols + 1))
+            self.src_table.set_axis('y', range(1, rows + 1))
 
-    def fill_data_cells(self, old_x, old_y, new_x, new_y):
-        """
-        Create 16x16 VO grid:
-        1) Bilinear interpolation from original 8x12
-        2) Vertical smoothing along MAP axis while keeping original 8x12 points fixed
-        """
-        # Clear 16x16 VO table
-        for row in self.new_cells:
-            for cell in row:
-                cell.delete(0, tk.END)
+        if (self.layout.rows, self.layout.cols) != (self.new_rows, self.new_cols):
+            self.new_rows, self.new_cols = self.layout.rows, self.layout.cols
+            self.vo_table.resize(self.new_rows, self.new_cols)
+            self.ve_table.resize(self.new_rows, self.new_cols)
 
-        # Read original 8x12 VO grid
+        # Results of the previous layout no longer apply
+        self.new_x = None
+        self.new_y = None
+        self.live = None
+
+        src = f"{self.rows}x{self.cols}"
+        dst = f"{self.new_rows}x{self.new_cols}"
+        self.src_frame.configure(text=f"Original {src} Table (VO)")
+        self.vo_frame.configure(text=f"Extended {dst} Table (VO)")
+        self.ve_frame.configure(text=f"Calculated {dst} Table (VE)")
+        self.generate_button.configure(text=f"Generate {dst}")
+
+    # ===== SESSIONS =====
+
+    def current_session(self, name):
+        """The editor's tables and settings as a vo_ve_session.Session."""
+        params = []
+        for var in (self.displacement_var, self.iat_var):
+            try:
+                params.append(float(var.get()))
+            except ValueError:
+                params.append(None)
+        ve = self._ve_table.model if self._ve_table is not None else None
+        return vo_ve_session.Session(name, self.src_table.model, self.vo_table.model, ve, *params,
+                                     kernel=self.kernel(), relaxation=self.relaxation(),
+                                     layout=self.layout)
+
+    def load_session(self, session):
+        """Replace the editor's tables and settings with those of a Session."""
+        self.live = None
+        source, layout = session.source, session.layout
+        for var, value in ((self.src_rows_var, source.rows), (self.src_cols_var, source.cols),
+                           (self.dst_rows_var, layout.rows), (self.dst_cols_var, layout.cols)):
+            var.set(str(value))
+        self.x_method_var.set(layout.x_method)
+        self.y_method_var.set(layout.y_method)
+        self.set_layout(source.rows, source.cols, layout)
+
+        self.src_table.set_model(source, PASTE_FORMAT, PASTE_FORMAT)
+        for table, model in ((self.vo_table, session.vo), (self.ve_table, session.ve)):
+            table.set_model(model or TableModel(table.rows, table.cols))
         try:
-            old_grid = [
-                [float(self.cells[r][c].get()) for c in range(self.cols)]
-                for r in range(self.rows)
-            ]
-        except ValueError:
-            messagebox.showerror("Error", "All 8x12 VO cells must contain valid numbers")
-            return None
+            self.new_x = session.vo.complete_axis('x')
+            self.new_y = session.vo.complete_axis('y')
+        except (AttributeError, ValueError):
+            # No VO table yet, or one without complete axes
+            self.new_x = None
+            self.new_y = None
+
+        for var, value in ((self.displacement_var, session.displacement),
+                           (self.iat_var, session.iat)):
+            var.set("" if value is None else PASTE_FORMAT.format(value))
+        self.session_kernel = session.kernel
+        self.session_relaxation = session.relaxation
+        self.kernel_var.set(session.kernel.name)
+        self.relax_var.set(session.relaxation is not None)
+        self.restart_live()
+
+    def save_session(self):
+        """Write the current tables and settings to a single-map session file."""
+        path = filedialog.asksaveasfilename(defaultextension=vo_ve_session.SESSION_EXTENSION,
+                                            filetypes=SESSION_FILETYPES)
+        if not path:
+            return
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            vo_ve_session.save_session(path, self.current_session(name))
+        except (OSError, engine.ConversionError) as e:
+            messagebox.showerror("Save Session", str(e))
+            return
+        self.show_info("Saved", f"Session saved to {path}")
 
-        # 1) Initial 16x16 grid from pure bilinear interpolation
-        data_grid = [[None for _ in range(self.new_cols)] for _ in range(self.new_rows)]
-
-        for r in range(self.new_rows):
-            y = new_y[r]
-            for c in range(self.new_cols):
-                x = new_x[c]
-                val = self.bilinear_interpolate_point(x, y, old_x, old_y, old_grid)
-                data_grid[r][c] = val
-
-        # 2) Build mask of original 8x12 points in 16x16 grid
-        fixed_mask = [[False for _ in range(self.new_cols)] for _ in range(self.new_rows)]
-
-        for r_old, y_val in enumerate(old_y):
-            for c_old, x_val in enumerate(old_x):
-                try:
-                    r_new = new_y.index(y_val)
-                    c_new = new_x.index(x_val)
-                except ValueError:
-                    # Original axis value not present in extended axis
-                    continue
-
-                fixed_mask[r_new][c_new] = True
-                data_grid[r_new][c_new] = old_grid[r_old][c_old]
-
-        # 3) Stronger vertical smoothing to reduce large jumps between MAP rows
-        data_grid = self.vertical_smooth(data_grid, fixed_mask, beta=0.6, iterations=2)
-
-        # 4) Write back to GUI 16x16 VO table
-        for row in range(self.new_rows):
-            for col in range(self.new_cols):
-                val = data_grid[row][col]
-                if val is not None:
-                    self.new_cells[row][col].insert(0, f"{val:.3f}")
+    def add_to_workspace(self):
+        """Append the current tables and settings to a workspace file."""
+        path = filedialog.asksaveasfilename(defaultextension=vo_ve_session.SESSION_EXTENSION,
+                                            filetypes=SESSION_FILETYPES, confirmoverwrite=False)
+        if not path:
+            return
+        name = simpledialog.askstring("Add to Workspace", "Map name:", parent=self.root,
+                                      initialvalue=time.strftime('%Y-%m-%d %H:%M'))
+        if not name:
+            return
+        try:
+            vo_ve_session.append_session(path, self.current_session(name))
+        except (OSError, engine.ConversionError) as e:
+            messagebox.showerror("Add to Workspace", str(e))
+            return
+        self.show_info("Saved", f"{name} added to {path}")
 
-        return data_grid
+    def open_session(self):
+        """Load a session file, or one map of a workspace file."""
+        path = filedialog.askopenfilename(filetypes=SESSION_FILETYPES)
+        if not path:
+            return
+        try:
+            with vo_ve_session.Workspace(path) as workspace:
+                if len(workspace) == 0:
+                    messagebox.showerror("Open Session", "The workspace holds no maps")
+                    return
+                index = 0 if len(workspace) == 1 else self.choose_map(workspace)
+                if index is None:
+                    return
+                session = workspace.load(index)
+        except (OSError, engine.ConversionError) as e:
+            messagebox.showerror("Open Session", str(e))
+            return
+        self.load_session(session)
+
+    def choose_map(self, workspace):
+        """Modal list of a workspace's maps; returns the chosen position or None."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Open Map")
+        dialog.transient(self.root)
+        listbox = tk.Listbox(dialog, width=60, height=min(20, len(workspace)))
+        listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        for entry in workspace.entries:
+            listbox.insert(tk.END, f"{entry['name']}  ({entry.get('created', '')})")
+        listbox.selection_set(len(workspace) - 1)
+
+        chosen = []
+
+        def accept(event=None):
+            chosen.extend(listbox.curselection())
+            dialog.destroy()
+
+        listbox.bind("<Double-Button-1>", accept)
+        tk.Button(dialog, text="Open", command=accept).pack(pady=5)
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return chosen[0] if chosen else None
 
     # ===== MAIN OPERATIONS =====
 
     def generate_16x16(self):
         """Generate extended 16x16 VO table from 8x12 input."""
         try:
-            x_values = [float(entry.get()) for entry in self.x_labels]
+            x_values = self.read_axis(self.src_table, 'x')
         except ValueError:
             messagebox.showerror("Error", "X-axis must contain numbers")
             return
 
         try:
-            y_values = [float(entry.get()) for entry in self.y_labels]
+            y_values = self.read_axis(self.src_table, 'y')
         except ValueError:
             messagebox.showerror("Error", "Y-axis must contain numbers")
             return
 
-        self.new_x = self.extend_x_axis(x_values)
-        self.new_y = self.extend_y_axis(y_values)
-
-        max_kpa = max(y_values)
-        mode = "NA" if max_kpa <= 125 else "Forced Induction"
-
-        for i, entry in enumerate(self.new_x_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_x[i]:.0f}")
+        try:
+            self.new_x, self.new_y = self.layout.build(x_values, y_values)
+        except engine.ConversionError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        mode = engine.induction_mode(y_values)
 
-        for i, entry in enumerate(self.new_y_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_y[i]:.0f}")
+        self.vo_table.set_axis('x', self.new_x)
+        self.vo_table.set_axis('y', self.new_y)
 
-        self.vo_grid = self.fill_data_cells(x_values, y_values, self.new_x, self.new_y)
-        if self.vo_grid is not None:
-            messagebox.showinfo("Done", f"16x16 VO table generated\nMode: {mode}")
+        if self.fill_data_cells(x_values, y_values, self.new_x, self.new_y) is not None:
+            self.restart_live()
+            message = f"{self.new_rows}x{self.new_cols} VO table generated\nMode: {mode}"
+            if self.relaxed is not None:
+                message += (f"\nSmoothing: {self.relaxed.iterations} iterations, "
+                            f"residual {self.relaxed.residual:.1e}")
+            self.show_info("Done", message)
 
     def calculate_ve(self):
         """Calculate 16x16 VE table from 16x16 VO grid using thermodynamic formula."""
-        if self.vo_grid is None or self.new_x is None or self.new_y is None:
+        if self.new_x is None or self.new_y is None:
             messagebox.showerror("Error", "Generate 16x16 table first")
             return
 
-        try:
-            displacement = float(self.displacement_var.get())
-        except ValueError:
-            messagebox.showerror("Error", "Displacement must be a number")
-            return
-
-        try:
-            iat = float(self.iat_var.get())
-        except ValueError:
-            messagebox.showerror("Error", "IAT must be a number")
+        params = self.read_parameters()
+        if params is None:
             return
+        displacement, iat = params
 
-        # Clear VE cells
-        for row in self.ve_cells:
-            for cell in row:
-                cell.delete(0, tk.END)
+        # Full-precision VO values, including any edits made in the VO table
+        vo_grid = self.vo_table.model.grid()
+        ve_grid = engine.calculate_ve(vo_grid, self.new_x, self.new_y, displacement, iat)
 
         # Copy axes to VE table
-        for i, entry in enumerate(self.ve_x_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_x[i]:.0f}")
-
-        for i, entry in enumerate(self.ve_y_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_y[i]:.0f}")
-
-        # VE calculation
-        for row in range(self.new_rows):
-            for col in range(self.new_cols):
-                vo = self.vo_grid[row][col]
-                if vo is None:
-                    continue
-
-                rpm = self.new_x[col]
-                map_kpa = self.new_y[row]
+        self.ve_table.set_axis('x', self.new_x)
+        self.ve_table.set_axis('y', self.new_y)
+        self.ve_table.set_grid(ve_grid)
 
-                if map_kpa == 0:
-                    continue
-
-                numerator = vo * rpm * 8.314 * (iat + 273.15) * 120
-                denominator = 5555 * map_kpa * displacement * rpm * 28.9 * 3.6
-                ve = numerator / denominator
-
-                self.ve_cells[row][col].insert(0, f"{ve:.3f}")
-
-        messagebox.showinfo("Done", "VE table calculated")
+        self.show_info("Done", "VE table calculated")
 
     def convert_ve_to_vo(self):
         """
         Convert 16x16 VE table back to VO using the inverse of the VE formula.
-        Result is written into 16x16 VO table and stored in self.vo_grid.
+        Result is written into the 16x16 VO table and its model.
         """
         if self.new_x is None or self.new_y is None:
             # Try to rebuild axes from VE header if user pasted VE only
             try:
-                self.new_x = [float(e.get()) for e in self.ve_x_labels]
-                self.new_y = [float(e.get()) for e in self.ve_y_labels]
+                self.new_x = self.read_axis(self.ve_table, 'x')
+                self.new_y = self.read_axis(self.ve_table, 'y')
             except ValueError:
                 messagebox.showerror(
                     "Error",
@@ -821,63 +768,36 @@ class TableEditor:
                 )
                 return
 
-        try:
-            displacement = float(self.displacement_var.get())
-        except ValueError:
-            messagebox.showerror("Error", "Displacement must be a number")
+        params = self.read_parameters()
+        if params is None:
             return
+        displacement, iat = params
 
-        try:
-            iat = float(self.iat_var.get())
-        except ValueError:
-            messagebox.showerror("Error", "IAT must be a number")
-            return
-
-        # Constants from the VE formula
-        const_num = 5555 * displacement * 28.9 * 3.6
-        const_den = 8.314 * (iat + 273.15) * 120
+        # VO now comes from the VE table, the live state no longer matches it
+        self.live = None
 
-        # Clear VO 16x16 table
-        for row in self.new_cells:
-            for cell in row:
-                cell.delete(0, tk.END)
+        ve_grid = self.read_float_grid(self.ve_table)
+        vo_grid = engine.convert_ve_to_vo(ve_grid, self.new_x, self.new_y, displacement, iat)
 
         # Sync VO axes
-        for i, entry in enumerate(self.new_x_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_x[i]:.0f}")
-        for i, entry in enumerate(self.new_y_labels):
-            entry.delete(0, tk.END)
-            entry.insert(0, f"{self.new_y[i]:.0f}")
-
-        self.vo_grid = [[None for _ in range(self.new_cols)] for _ in range(self.new_rows)]
+        self.vo_table.set_axis('x', self.new_x)
+        self.vo_table.set_axis('y', self.new_y)
+        self.vo_table.set_grid(vo_grid)
 
-        for r in range(self.new_rows):
-            map_kpa = self.new_y[r]
-            if map_kpa == 0:
-                continue
-
-            for c in range(self.new_cols):
-                ve_str = self.ve_cells[r][c].get().strip()
-                if not ve_str:
-                    continue
-
-                try:
-                    ve_val = float(ve_str)
-                except ValueError:
-                    continue
-
-                vo = ve_val * const_num * map_kpa / const_den
-
-                self.vo_grid[r][c] = vo
-                self.new_cells[r][c].insert(0, f"{vo:.3f}")
-
-        messagebox.showinfo("Done", "VO table calculated from VE")
+        self.show_info("Done", "VO table calculated from VE")
 
 
 if __name__ == "__main__":
+    # --profile / --profile-dump PATH / --startup-trace work for the GUI and batch mode alike
+    args = profile.parse_flags(sys.argv[1:])
+    if args:
+        # Any other arguments switch to headless batch mode
+        import vo_ve_cli
+        sys.exit(vo_ve_cli.main(args))
+
     try:
         root = tk.Tk()
+        profile.mark('tk_root')
         app = TableEditor(root)
         root.mainloop()
     except Exception as e:
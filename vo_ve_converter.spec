@@ -5,7 +5,7 @@ a = Analysis(
     ['vo_ve_converter.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('logo.ico', '.'), ('logo_small.png', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -29,10 +29,13 @@ exe = EXE(
     upx=True,
     upx_exclude=[],
     runtime_tmpdir=None,
+    # Console build for batch mode (vo_ve_converter.exe maps/ -o out/ ...); the
+    # GUI specs are windowed and lose all batch output
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
     target_arch=None,
     codesign_identity=None,
     entitlements_file=None,
+    icon=['logo.ico'],
 )
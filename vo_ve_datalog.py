@@ -0,0 +1,425 @@
+"""
+Datalog-driven VE correction.
+
+Streams CSV datalogs sample by sample, bins every sample onto the target
+(16x16) RPM/MAP axes and accumulates a weighted correction per cell in
+fixed-size arrays, so a log of any size is processed in constant memory:
+
+    python vo_ve_datalog.py base_ve16.tsv log1.csv log2.csv -o corrected_ve16.tsv
+
+The base VE table is a tab-separated table with axes, e.g. the _ve16.tsv
+written by vo_ve_cli. Two correction modes are supported:
+
+    lambda  VE = base VE * lambda / target lambda, averaged per cell
+            (needs RPM, MAP and lambda; target lambda is logged or
+            --target-lambda)
+    maf     VE measured from the MAF reading with the constants of
+            engine.calculate_ve (needs RPM, MAP, MAF in kg/h, IAT logged
+            or --iat, and --displacement)
+
+Each sample is spread over its four surrounding cells with bilinear
+weights. Cells whose summed weight stays below --min-weight keep the
+base value. Columns are found by name (see COLUMN_ALIASES, units in
+brackets are ignored) or given with --column field=NAME. The delimiter
+(tab, semicolon, comma or spaces) is taken from the header line; unless
+it is a comma, decimal commas are accepted.
+"""
+
+import argparse
+import bisect
+import csv
+import re
+import sys
+from array import array
+
+import vo_ve_engine as engine
+import vo_ve_profile as profile
+import vo_ve_tsv
+
+FIELDS = ('rpm', 'map', 'iat', 'lambda', 'target_lambda', 'maf')
+
+# Header names each field is recognized by, compared after normalize_name()
+COLUMN_ALIASES = {
+    'rpm': ('rpm', 'engine speed', 'enginespeed', 'n', 'nmot'),
+    'map': ('map', 'manifold pressure', 'manifold absolute pressure', 'map kpa', 'boost pressure'),
+    'iat': ('iat', 'intake air temp', 'intake air temperature', 'tia', 'tans'),
+    'lambda': ('lambda', 'lambda 1', 'lambda1', 'lambda bank 1', 'wideband lambda', 'lambda actual'),
+    'target_lambda': ('target lambda', 'lambda target', 'lambda setpoint', 'lambsoll'),
+    'maf': ('maf', 'mass air flow', 'air mass', 'air mass flow', 'maf kg h'),
+}
+
+CORRECTION_MODES = ('lambda', 'maf')
+REQUIRED_FIELDS = {
+    'lambda': ('rpm', 'map', 'lambda'),
+    'maf': ('rpm', 'map', 'maf'),
+}
+
+# Minimum summed sample weight before a cell is corrected
+DEFAULT_MIN_WEIGHT = 5.0
+
+# Lambda readings outside this window are sensor faults or overrun fuel cut
+LAMBDA_RANGE = (0.6, 1.4)
+
+# VO = MAF [kg/h] * MAF_VO_FACTOR / rpm, the 5555 of the VE formula
+MAF_VO_FACTOR = 5555
+
+# Lines searched for the header row
+HEADER_SEARCH_LINES = 50
+
+# Delimiters tried on the header row, in order; none of them means whitespace
+LOG_DELIMITERS = ('\t', ';', ',')
+
+
+def detect_log_delimiter(line):
+    """Delimiter of a log's header line."""
+    for delimiter in LOG_DELIMITERS:
+        if delimiter in line:
+            return delimiter
+    return ' '
+
+
+def normalize_name(name):
+    """Lower-case a column name and drop units in brackets and separators."""
+    name = re.sub(r'[\(\[\{].*?[\)\]\}]', ' ', name.lower())
+    return ' '.join(re.sub(r'[_\-./:]+', ' ', name).split())
+
+
+def find_columns(header, columns=None):
+    """
+    {field: column index} for a header row.
+
+    columns maps fields to explicit header names and takes precedence
+    over COLUMN_ALIASES. Fields that are not found are left out.
+    """
+    names = [normalize_name(h) for h in header]
+    found = {}
+    for field in FIELDS:
+        if columns and field in columns:
+            wanted = normalize_name(columns[field])
+            if wanted not in names:
+                raise engine.ConversionError(f"Column {columns[field]!r} for {field} not found")
+            found[field] = names.index(wanted)
+            continue
+        for alias in COLUMN_ALIASES[field]:
+            if alias in names:
+                found[field] = names.index(alias)
+                break
+    return found
+
+
+class LogStats:
+    """Row counts of the logs read so far."""
+
+    def __init__(self):
+        self.rows = 0
+        self.used = 0
+        self.skipped = 0
+        self.filtered = 0
+
+    def __str__(self):
+        return (f"{self.rows} rows, {self.used} used, {self.skipped} unreadable, "
+                f"{self.filtered} filtered")
+
+
+def read_samples(path, columns=None, stats=None, required=REQUIRED_FIELDS['lambda']):
+    """
+    Yield one tuple per log row with the values of FIELDS in that order.
+
+    Missing columns give None. The file is read line by line, never held
+    in memory. Rows with a missing or unreadable required value are
+    counted in stats.skipped and dropped. Unless cells are separated by
+    commas, a comma in a number is a decimal comma.
+    """
+    if stats is None:
+        stats = LogStats()
+
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        # Header: first line naming every required field
+        index = None
+        for _ in range(HEADER_SEARCH_LINES):
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            delimiter = detect_log_delimiter(line)
+            header = next(csv.reader([line], delimiter=delimiter, skipinitialspace=True))
+            found = find_columns(header, columns)
+            if all(field in found for field in required):
+                index = [found.get(field) for field in FIELDS]
+                break
+        if index is None:
+            names = ", ".join(required)
+            raise engine.ConversionError(f"{path}: no header row with columns for {names}")
+
+        required_positions = [FIELDS.index(field) for field in required]
+        positions = [p for p, i in enumerate(index) if i is not None]
+        logged = [index[p] for p in positions]
+        width = max(logged) + 1
+        empty = [None] * len(FIELDS)
+        decimal_comma = delimiter != ','
+        for row in csv.reader(f, delimiter=delimiter, skipinitialspace=True):
+            if not row:
+                continue
+            stats.rows += 1
+            found = None
+            if len(row) >= width:
+                try:
+                    if decimal_comma:
+                        found = [float(row[i].replace(',', '.')) for i in logged]
+                    else:
+                        found = [float(row[i]) for i in logged]
+                except ValueError:
+                    pass
+            if found is None:
+                # Blank, missing or broken cell, only acceptable in an optional column
+                found = _parse_cells(row, logged, decimal_comma)
+                if found is None or any(found[positions.index(p)] is None for p in required_positions):
+                    stats.skipped += 1
+                    continue
+            values = empty[:]
+            for p, value in zip(positions, found):
+                values[p] = value
+            yield tuple(values)
+
+
+def _parse_cells(row, logged, decimal_comma):
+    """Values of the logged columns, None for blank cells; None if one is broken."""
+    values = []
+    for i in logged:
+        text = row[i].strip() if i < len(row) else ''
+        if not text:
+            values.append(None)
+            continue
+        try:
+            values.append(float(text.replace(',', '.') if decimal_comma else text))
+        except ValueError:
+            return None
+    return values
+
+
+# ===== ACCUMULATION =====
+
+class VeCorrector:
+    """
+    Per-cell weighted averages of log samples on fixed target axes.
+
+    mode 'lambda' averages lambda / target lambda, mode 'maf' averages the
+    VE measured from the MAF. All state lives in three flat arrays sized
+    rows x cols, however many samples are added.
+    """
+
+    def __init__(self, new_x, new_y, mode='lambda', displacement=None, iat=None,
+                 target_lambda=1.0, lambda_range=LAMBDA_RANGE):
+        if mode not in CORRECTION_MODES:
+            raise engine.ConversionError(
+                f"Unknown correction mode {mode!r}, expected one of {', '.join(CORRECTION_MODES)}"
+            )
+        if mode == 'maf' and (displacement is None or displacement <= 0):
+            raise engine.ConversionError("MAF correction needs a positive displacement")
+
+        self.x_axis = engine.Axis(new_x, "RPM axis", strict=False).values
+        self.y_axis = engine.Axis(new_y, "MAP axis", strict=False).values
+        self.mode = mode
+        self.displacement = displacement
+        self.iat = iat
+        self.target_lambda = target_lambda
+        self.lambda_range = lambda_range
+
+        cells = len(self.x_axis) * len(self.y_axis)
+        self.weights = array('d', bytes(8 * cells))
+        self.sums = array('d', bytes(8 * cells))
+        self.hits = array('l', bytes(array('l').itemsize * cells))
+        self.stats = LogStats()
+
+    @property
+    def rows(self):
+        return len(self.y_axis)
+
+    @property
+    def cols(self):
+        return len(self.x_axis)
+
+    def add(self, rpm, map_kpa, value, weight=1.0):
+        """Spread one value over the four cells around (rpm, map_kpa)."""
+        x_axis, y_axis = self.x_axis, self.y_axis
+        cols = len(x_axis)
+
+        # Breakpoints are the bin edges; outside the axes the edge cells take it all
+        c1 = bisect.bisect_right(x_axis, rpm)
+        if c1 == 0 or c1 == cols:
+            c0 = c1 = min(c1, cols - 1)
+            tx = 0.0
+        else:
+            c0 = c1 - 1
+            tx = (rpm - x_axis[c0]) / (x_axis[c1] - x_axis[c0])
+        r1 = bisect.bisect_right(y_axis, map_kpa)
+        if r1 == 0 or r1 == len(y_axis):
+            r0 = r1 = min(r1, len(y_axis) - 1)
+            ty = 0.0
+        else:
+            r0 = r1 - 1
+            ty = (map_kpa - y_axis[r0]) / (y_axis[r1] - y_axis[r0])
+
+        weights, sums, hits = self.weights, self.sums, self.hits
+        wy0 = (1.0 - ty) * weight
+        wy1 = ty * weight
+        for i, w in ((r0 * cols + c0, (1.0 - tx) * wy0), (r0 * cols + c1, tx * wy0),
+                     (r1 * cols + c0, (1.0 - tx) * wy1), (r1 * cols + c1, tx * wy1)):
+            if w:
+                weights[i] += w
+                sums[i] += value * w
+                hits[i] += 1
+
+    def sample_value(self, sample):
+        """Correction value of one sample tuple (see FIELDS), None to drop it."""
+        rpm, map_kpa, iat, lam, target, maf = sample
+        if rpm <= 0 or map_kpa <= 0:
+            return None
+        if self.mode == 'lambda':
+            if not self.lambda_range[0] <= lam <= self.lambda_range[1]:
+                return None
+            target = self.target_lambda if target is None else target
+            return lam / target if target > 0 else None
+
+        if iat is None:
+            iat = self.iat
+        if iat is None or maf is None or maf <= 0:
+            return None
+        vo = maf * MAF_VO_FACTOR / rpm
+        return vo * engine.ve_scale(map_kpa, self.displacement, iat)
+
+    def add_samples(self, samples):
+        """Accumulate an iterable of sample tuples, e.g. from read_samples()."""
+        stats = self.stats
+        add = self.add
+        value_of = self.sample_value
+        for sample in samples:
+            value = value_of(sample)
+            if value is None:
+                stats.filtered += 1
+                continue
+            add(sample[0], sample[1], value)
+            stats.used += 1
+
+    def add_log(self, path, columns=None):
+        """Stream one log file into the accumulators."""
+        with profile.stage('datalog'):
+            self.add_samples(read_samples(path, columns, self.stats, REQUIRED_FIELDS[self.mode]))
+
+    # ===== RESULTS =====
+
+    def mean_grid(self, min_weight=DEFAULT_MIN_WEIGHT):
+        """Weighted mean per cell as a list of rows, None below min_weight."""
+        cols = len(self.x_axis)
+        weights, sums = self.weights, self.sums
+        grid = []
+        for r in range(len(self.y_axis)):
+            row = []
+            for i in range(r * cols, (r + 1) * cols):
+                row.append(sums[i] / weights[i] if weights[i] >= min_weight and weights[i] > 0 else None)
+            grid.append(row)
+        return grid
+
+    def hit_grid(self):
+        """Number of samples that touched each cell."""
+        cols = len(self.x_axis)
+        return [list(self.hits[r * cols:(r + 1) * cols]) for r in range(len(self.y_axis))]
+
+    def corrected_grid(self, base_ve, min_weight=DEFAULT_MIN_WEIGHT):
+        """
+        Corrected VE grid; cells without enough samples keep base_ve.
+        Returns (grid, number of corrected cells).
+        """
+        mean = self.mean_grid(min_weight)
+        grid = []
+        corrected = 0
+        for base_row, mean_row in zip(base_ve, mean):
+            row = []
+            for base, value in zip(base_row, mean_row):
+                if value is None or (base is None and self.mode == 'lambda'):
+                    row.append(base)
+                    continue
+                row.append(base * value if self.mode == 'lambda' else value)
+                corrected += 1
+            grid.append(row)
+        return grid, corrected
+
+
+def read_base_table(path):
+    """Read a VE table with axes, returns (new_x, new_y, grid)."""
+    with open(path, encoding='utf-8') as f:
+        table = vo_ve_tsv.parse_block(f.read(), allow_blank=False)
+    if not table.has_axes:
+        raise engine.ConversionError(f"{path}: base table needs its RPM and MAP axes")
+    return table.x_values, table.y_values, table.grid()
+
+
+# ===== COMMAND LINE =====
+
+def parse_column(text):
+    """Parse a field=NAME column mapping given on the command line."""
+    field, sep, name = text.partition('=')
+    field = field.strip().lower()
+    if not sep or field not in FIELDS or not name.strip():
+        raise argparse.ArgumentTypeError(
+            f"Invalid column {text!r}, expected FIELD=NAME with FIELD one of {', '.join(FIELDS)}"
+        )
+    return field, name.strip()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Correct a VE table from CSV datalogs.")
+    parser.add_argument('base', help="VE table with axes (tab-separated), e.g. name_ve16.tsv")
+    parser.add_argument('logs', nargs='+', help="CSV datalog files")
+    parser.add_argument('-o', '--output', required=True, help="corrected VE table to write")
+    parser.add_argument('--vo-output', help="also write the corrected table converted back to VO")
+    parser.add_argument('--mode', choices=CORRECTION_MODES, default='lambda',
+                        help="lambda: scale by measured/target lambda, maf: VE from the MAF (default lambda)")
+    parser.add_argument('--target-lambda', type=float, default=1.0,
+                        help="target lambda when the log has none (default 1.0)")
+    parser.add_argument('--displacement', type=float, help="engine displacement in dm³ (maf mode, --vo-output)")
+    parser.add_argument('--iat', type=float, help="intake air temperature in °C when the log has none")
+    parser.add_argument('--min-weight', type=float, default=DEFAULT_MIN_WEIGHT,
+                        help=f"summed sample weight a cell needs to be corrected (default {DEFAULT_MIN_WEIGHT:g})")
+    parser.add_argument('--column', action='append', type=parse_column, default=[], metavar='FIELD=NAME',
+                        help=f"header name of a field ({', '.join(FIELDS)}), may be repeated")
+    parser.add_argument('--profile', action='store_true', help="print per-stage timings at the end")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        profile.enable()
+
+    try:
+        new_x, new_y, base_ve = read_base_table(args.base)
+        corrector = VeCorrector(new_x, new_y, args.mode, args.displacement, args.iat,
+                                args.target_lambda)
+        columns = dict(args.column)
+        for path in args.logs:
+            corrector.add_log(path, columns)
+            print(f"{path}: {corrector.stats}")
+
+        grid, corrected = corrector.corrected_grid(base_ve, args.min_weight)
+        vo_ve_tsv.write_table(args.output, grid, new_x, new_y)
+        print(f"{corrected}/{corrector.rows * corrector.cols} cells corrected -> {args.output}")
+
+        if args.vo_output:
+            if args.displacement is None or args.iat is None:
+                raise engine.ConversionError("--vo-output needs --displacement and --iat")
+            displacement, iat = engine.validate_parameters(args.displacement, args.iat)
+            vo_grid = engine.convert_ve_to_vo(grid, new_x, new_y, displacement, iat)
+            vo_ve_tsv.write_table(args.vo_output, vo_grid, new_x, new_y)
+    except (engine.ConversionError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if profile.enabled:
+            print(profile.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
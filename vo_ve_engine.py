@@ -0,0 +1,1681 @@
+"""
+Headless VO -> VE conversion engine.
+
+Everything here works on plain lists of floats, so it can be imported by
+batch jobs and servers without loading tkinter. The GUI in vo_ve_converter.py
+is a thin shell around these functions.
+
+NumPy is optional. When it is installed, interpolate_grid() uses the
+array-backed implementation; the pure-Python one is kept as fallback and
+as the reference the array path is checked against. It is imported on
+first use (load_numpy()), not with this module, so the GUI starts
+without paying for it.
+"""
+
+import bisect
+import functools
+
+import vo_ve_profile as profile
+
+# The numpy module once load_numpy() found it, None before that or when it is not installed
+np = None
+_numpy_tried = False
+
+# Bump when a change alters conversion output; keys the on-disk result cache
+ENGINE_VERSION = 1
+
+# Original MS42/MS43 VO map size
+SRC_ROWS = 8
+SRC_COLS = 12
+
+# ms43x VE map size
+DST_ROWS = 16
+DST_COLS = 16
+
+# Highest MAP breakpoint (kPa) still treated as naturally aspirated
+NA_MAX_KPA = 125
+
+# Default vertical smoothing parameters
+SMOOTH_BETA = 0.6
+SMOOTH_ITERATIONS = 2
+
+# Defaults of the convergent 2D smoothing solver, see Relaxation
+RELAX_STRENGTH_X = 0.5
+RELAX_STRENGTH_Y = 1.0
+RELAX_OMEGA = 1.3
+RELAX_TOLERANCE = 1e-4
+RELAX_MAX_ITERATIONS = 1000
+
+# Default resampling kernel, see RESAMPLERS
+DEFAULT_KERNEL = 'bilinear'
+# Curvature penalty of the regularized spline kernel (axes normalized to 0..1)
+SPLINE_SMOOTHING = 1e-4
+
+
+class ConversionError(ValueError):
+    """Raised when input axes or grid cannot be converted."""
+
+
+class ConversionResult:
+    """
+    Output of convert_map(): extended axes plus 16x16 VO and VE grids.
+    relaxation is the RelaxResult when a Relaxation smoothed the VO grid,
+    cached is True when the result was read from a vo_ve_cache.ResultCache.
+    """
+
+    def __init__(self, new_x, new_y, vo_grid, ve_grid, mode, relaxation=None, cached=False):
+        self.new_x = new_x
+        self.new_y = new_y
+        self.vo_grid = vo_grid
+        self.ve_grid = ve_grid
+        self.mode = mode
+        self.relaxation = relaxation
+        self.cached = cached
+
+
+# ===== AXIS EXTENSION =====
+
+def extend_x_axis(values, count=DST_COLS):
+    """Extend RPM axis (X) from 12 columns to 16 (or count) using rules for NA/FI."""
+    values = list(values)
+    last_rpm = values[-1]
+    new_x = []
+
+    if last_rpm == 7000:
+        # Classic MS4x-like 320–7000 map extended to 16 cols
+        new_x = values[:8]
+        current = new_x[-1]
+        while len(new_x) < count:
+            current += 500
+            if current > 7000:
+                current = 7000
+            new_x.append(current)
+            if current == 7000:
+                break
+        while len(new_x) < count:
+            new_x.append(7000)
+
+    elif last_rpm <= 7500:
+        # Slightly higher rev limit – extend with 500 rpm steps
+        new_x = values[:3]
+        current = new_x[-1]
+        while len(new_x) < count:
+            current += 500
+            if current > last_rpm:
+                current = last_rpm
+            new_x.append(current)
+            if current == last_rpm:
+                break
+        while len(new_x) < count:
+            new_x.append(last_rpm)
+
+    else:
+        # High-rev setup – custom final steps up to 8000
+        new_x = values[:3]
+        current = new_x[-1]
+        current += 700
+        new_x.append(current)
+        current += 600
+        new_x.append(current)
+
+        while len(new_x) < count:
+            current += 500
+            if current > 8000:
+                current = 8000
+            new_x.append(current)
+            if current == 8000:
+                break
+        while len(new_x) < count:
+            new_x.append(8000)
+
+    return new_x[:count]
+
+
+def extend_y_axis(values, count=DST_ROWS):
+    """
+    Extend MAP axis (Y) from 8 rows to 16 rows, NA vs FI preset.
+    Other row counts resample the preset.
+    """
+    max_kpa = max(values)
+    if max_kpa <= NA_MAX_KPA:
+        # NA preset
+        preset = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 60, 70, 80, 90, 105, 125]
+    else:
+        # Boost preset
+        preset = [10, 20, 30, 35, 40, 45, 50, 60, 70, 80, 90, 105, 125, 200, 250, 300]
+    return preset if count == len(preset) else resample_axis(preset, count)
+
+
+def uniform_axis(start, stop, count):
+    """count evenly spaced breakpoints from start to stop."""
+    if count == 1:
+        return [float(start)]
+    step = (stop - start) / (count - 1)
+    return [start + step * i for i in range(count - 1)] + [float(stop)]
+
+
+def log_axis(start, stop, count):
+    """count log-spaced breakpoints from start to stop (both > 0)."""
+    if start <= 0 or stop <= 0:
+        raise ConversionError("Log-spaced axes need positive end points")
+    if count == 1:
+        return [float(start)]
+    ratio = (stop / start) ** (1.0 / (count - 1))
+    return [start * ratio ** i for i in range(count - 1)] + [float(stop)]
+
+
+def resample_axis(template, count):
+    """
+    Take count breakpoints from a template axis.
+
+    Same length: the template itself. Otherwise the template is read as a
+    piecewise-linear curve over its index and sampled evenly, which keeps
+    both end points and the template's spacing pattern.
+    """
+    template = [float(v) for v in template]
+    if count == len(template):
+        return template
+    if len(template) == 1 or count == 1:
+        return [template[0]] * count
+
+    last = len(template) - 1
+    axis = []
+    for i in range(count):
+        pos = i * last / (count - 1)
+        k = min(int(pos), last - 1)
+        t = pos - k
+        axis.append(template[k] * (1 - t) + template[k + 1] * t)
+    return axis
+
+
+AXIS_METHODS = ('ms4x', 'uniform', 'log', 'template')
+
+
+class TargetLayout:
+    """
+    Shape of the target table and how its axes are generated.
+
+    Each axis uses one of AXIS_METHODS:
+      ms4x      the MS42/MS43 -> ms43x rules of extend_x_axis/extend_y_axis
+      uniform   evenly spaced between the first and last source breakpoint
+      log       log-spaced between the first and last source breakpoint
+      template  breakpoints taken from x_template / y_template (resampled
+                when the length differs)
+    """
+
+    def __init__(self, rows=DST_ROWS, cols=DST_COLS, x_method='ms4x', y_method='ms4x',
+                 x_template=None, y_template=None):
+        for method, template in ((x_method, x_template), (y_method, y_template)):
+            if method not in AXIS_METHODS:
+                raise ConversionError(f"Unknown axis method {method!r}")
+            if method == 'template' and not template:
+                raise ConversionError("Template axis method needs template breakpoints")
+        if rows < 1 or cols < 1:
+            raise ConversionError("Target table needs at least one row and column")
+        self.rows = rows
+        self.cols = cols
+        self.x_method = x_method
+        self.y_method = y_method
+        self.x_template = tuple(x_template) if x_template else None
+        self.y_template = tuple(y_template) if y_template else None
+
+    def key(self):
+        """Identity for result caching; include every parameter."""
+        return (self.rows, self.cols, self.x_method, self.y_method, self.x_template,
+                self.y_template)
+
+    def _build(self, method, values, count, template, extend):
+        if method == 'ms4x':
+            return extend(values, count)
+        if method == 'uniform':
+            return uniform_axis(values[0], values[-1], count)
+        if method == 'log':
+            return log_axis(values[0], values[-1], count)
+        return resample_axis(template, count)
+
+    def build(self, x_values, y_values):
+        """Return (new_x, new_y) for the given source axes."""
+        with profile.stage('extend_axes'):
+            return self._build_axes(x_values, y_values)
+
+    def _build_axes(self, x_values, y_values):
+        new_x = self._build(self.x_method, x_values, self.cols, self.x_template, extend_x_axis)
+        new_y = self._build(self.y_method, y_values, self.rows, self.y_template, extend_y_axis)
+        return new_x, new_y
+
+
+DEFAULT_LAYOUT = TargetLayout()
+
+
+def induction_mode(y_values):
+    """Return "NA" or "Forced Induction" depending on the MAP axis."""
+    return "NA" if max(y_values) <= NA_MAX_KPA else "Forced Induction"
+
+
+# ===== AXIS LOOKUP =====
+
+def bracket(axis, value):
+    """
+    Bracketing of one point on a sorted axis, see bracket_indices().
+
+    Binary search for the first interval whose upper bound is >= value,
+    values outside the axis clamp to its ends. Returns (i0, i1, t) so that
+    value = v[i0] * (1 - t) + v[i1] * t.
+    """
+    n = len(axis)
+    if n == 1 or value <= axis[0]:
+        return 0, 0, 0.0
+    if value >= axis[-1]:
+        return n - 1, n - 1, 0.0
+
+    i0 = min(max(bisect.bisect_left(axis, value) - 1, 0), n - 2)
+    i1 = i0 + 1
+    span = axis[i1] - axis[i0]
+    return i0, i1, 0.0 if span == 0 else (value - axis[i0]) / span
+
+
+class Axis:
+    """
+    Validated axis breakpoints with O(log n) and exact lookups.
+
+    Source axes must be strictly increasing (strict=True): a pasted axis
+    with a step backwards or a repeated breakpoint raises ConversionError
+    instead of bracketing into the wrong cells. Target axes may repeat
+    their last breakpoint (MS4x padding), so strict=False only requires
+    non-decreasing values.
+    """
+
+    def __init__(self, values, name="Axis", strict=True):
+        try:
+            values = tuple(float(v) for v in values)
+        except (TypeError, ValueError):
+            raise ConversionError(f"{name} must contain numbers")
+        if not values:
+            raise ConversionError(f"{name} must not be empty")
+
+        for i in range(1, len(values)):
+            prev, cur = values[i - 1], values[i]
+            if cur < prev or (strict and cur == prev):
+                order = "strictly increasing" if strict else "increasing"
+                raise ConversionError(
+                    f"{name} must be {order}: {cur:g} at position {i + 1} follows {prev:g}"
+                )
+
+        self.name = name
+        self.values = values
+        # First position of every breakpoint, for exact lookups
+        self._positions = {}
+        for i, v in enumerate(values):
+            self._positions.setdefault(v, i)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def index_of(self, value):
+        """Position of a breakpoint equal to value, or None."""
+        return self._positions.get(float(value))
+
+    def bracket(self, value):
+        """(i0, i1, t) for one point, see bracket()."""
+        return bracket(self.values, value)
+
+    def bracket_many(self, points):
+        """
+        Bracket many points at once.
+
+        Returns (i0, i1, t) as arrays from bracket_indices() with NumPy,
+        as lists otherwise.
+        """
+        if load_numpy() is not None:
+            return bracket_indices(self.values, points)
+        found = [bracket(self.values, p) for p in points]
+        return [b[0] for b in found], [b[1] for b in found], [b[2] for b in found]
+
+    def locate_many(self, points):
+        """Exact positions of many points, None where a point is not a breakpoint."""
+        return [self._positions.get(float(p)) for p in points]
+
+
+# ===== RESAMPLERS =====
+
+class Resampler:
+    """
+    One-dimensional resampling kernel, applied separably along both axes.
+
+    Linear kernels return per-point weight rows from axis_weights(); the
+    plan compiler turns them into one sparse operator per axis pair, so
+    switching kernels costs nothing per converted map. Kernels that depend
+    on the data (linear = False) return an operator from axis_operator()
+    that precomputes everything the values do not influence.
+
+    pin_original: interpolating kernels keep the original breakpoints
+    pinned and unsmoothed, like the bilinear pipeline always did.
+    """
+
+    name = None
+    linear = True
+    pin_original = True
+
+    def key(self):
+        """Identity for plan caching; include every parameter."""
+        return (self.name,)
+
+    def __eq__(self, other):
+        return isinstance(other, Resampler) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.key()[1:]}"
+
+    def axis_weights(self, axis, points):
+        """For every point, a tuple of (axis index, weight) pairs."""
+        raise NotImplementedError
+
+    def axis_operator(self, axis, points):
+        """Object with apply_line(values) -> values at points."""
+        raise NotImplementedError
+
+
+def _hermite_basis(s):
+    s2 = s * s
+    s3 = s2 * s
+    return 2 * s3 - 3 * s2 + 1, s3 - 2 * s2 + s, -2 * s3 + 3 * s2, s3 - s2
+
+
+class BilinearResampler(Resampler):
+    """Piecewise-linear along each axis, the original behaviour."""
+
+    name = 'bilinear'
+
+    def axis_weights(self, axis, points):
+        rows = []
+        for p in points:
+            i0, i1, t = axis.bracket(p)
+            rows.append(((i0, 1.0),) if i0 == i1 else ((i0, 1.0 - t), (i1, t)))
+        return rows
+
+
+class CubicResampler(Resampler):
+    """
+    Cubic Hermite along each axis with finite-difference slopes
+    (Catmull-Rom on non-uniform breakpoints), i.e. bicubic in 2D.
+
+    Passes through every breakpoint with a continuous first derivative,
+    which removes the ridges bilinear leaves along the breakpoint lines.
+    May overshoot next to steps in the map.
+    """
+
+    name = 'cubic'
+
+    def _slopes(self, axis):
+        # Slope at every breakpoint as {axis index: weight}
+        v = axis.values
+        n = len(v)
+        slopes = []
+        for i in range(n):
+            lo, hi = max(i - 1, 0), min(i + 1, n - 1)
+            span = v[hi] - v[lo]
+            slopes.append({hi: 1.0 / span, lo: -1.0 / span})
+        return slopes
+
+    def axis_weights(self, axis, points):
+        if len(axis) < 3:
+            return BilinearResampler().axis_weights(axis, points)
+
+        slopes = self._slopes(axis)
+        rows = []
+        for p in points:
+            i0, i1, t = axis.bracket(p)
+            if i0 == i1:
+                rows.append(((i0, 1.0),))
+                continue
+            h = axis[i1] - axis[i0]
+            h00, h10, h01, h11 = _hermite_basis(t)
+            terms = {}
+            _add_term(terms, i0, h00)
+            _add_term(terms, i1, h01)
+            for idx, w in slopes[i0].items():
+                _add_term(terms, idx, h10 * h * w)
+            for idx, w in slopes[i1].items():
+                _add_term(terms, idx, h11 * h * w)
+            rows.append(tuple(sorted(terms.items())))
+        return rows
+
+
+class _PchipOperator:
+    """Intervals and Hermite basis of every point, precomputed for PCHIP."""
+
+    def __init__(self, axis, points):
+        self.x = axis.values
+        self.h = [b - a for a, b in zip(self.x, self.x[1:])]
+        self.stencil = []
+        for p in points:
+            i0, i1, t = axis.bracket(p)
+            self.stencil.append((i0, None) if i0 == i1 else (i0, _hermite_basis(t)))
+
+    def slopes(self, y):
+        """Fritsch-Carlson slopes: zero at local extrema, no overshoot."""
+        h = self.h
+        n = len(y)
+        d = [(y[k + 1] - y[k]) / h[k] for k in range(n - 1)]
+        if n == 2:
+            return [d[0], d[0]]
+
+        m = [0.0] * n
+        for k in range(1, n - 1):
+            if d[k - 1] * d[k] > 0:
+                w1 = 2 * h[k] + h[k - 1]
+                w2 = h[k] + 2 * h[k - 1]
+                m[k] = (w1 + w2) / (w1 / d[k - 1] + w2 / d[k])
+
+        for k, (h0, h1, d0, d1) in ((0, (h[0], h[1], d[0], d[1])),
+                                    (n - 1, (h[-1], h[-2], d[-1], d[-2]))):
+            end = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+            if end * d0 <= 0:
+                end = 0.0
+            elif d0 * d1 <= 0 and abs(end) > 3 * abs(d0):
+                end = 3 * d0
+            m[k] = end
+        return m
+
+    def apply_line(self, y):
+        if len(y) == 1:
+            return [y[0]] * len(self.stencil)
+        m = self.slopes(y)
+        out = []
+        for i, basis in self.stencil:
+            if basis is None:
+                out.append(y[i])
+                continue
+            h00, h10, h01, h11 = basis
+            h = self.h[i]
+            out.append(h00 * y[i] + h10 * h * m[i] + h01 * y[i + 1] + h11 * h * m[i + 1])
+        return out
+
+
+class PchipResampler(Resampler):
+    """
+    Monotone piecewise cubic (PCHIP) along each axis.
+
+    Smooth like cubic but never overshoots: between two breakpoints the
+    result stays between their values. The slopes depend on the map
+    values, so this kernel is not a fixed weight matrix; the intervals and
+    Hermite basis are precomputed and only the slopes are per map.
+    """
+
+    name = 'pchip'
+    linear = False
+
+    def axis_operator(self, axis, points):
+        return _PchipOperator(axis, points)
+
+
+def _solve(matrix, rhs):
+    """Solve matrix * X = rhs by Gaussian elimination; rhs is a list of rows."""
+    n = len(matrix)
+    a = [list(matrix[i]) + list(rhs[i]) for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(col + 1, n):
+            f = a[r][col] / a[col][col]
+            if f:
+                a[r] = [x - f * y for x, y in zip(a[r], a[col])]
+    x = [None] * n
+    for r in range(n - 1, -1, -1):
+        row = a[r][n:]
+        for c in range(r + 1, n):
+            row = [v - a[r][c] * w for v, w in zip(row, x[c])]
+        x[r] = [v / a[r][r] for v in row]
+    return x
+
+
+class SplineResampler(Resampler):
+    """
+    Regularized (smoothing) cubic spline along each axis.
+
+    Fits a natural cubic spline that trades passing through the breakpoints
+    against curvature: smoothing 0 interpolates, larger values flatten
+    ridges along both RPM and MAP. Breakpoints are normalized to 0..1
+    first, so smoothing does not depend on axis units. The fit is linear in
+    the values, so the whole spline is a precomputed weight matrix.
+    """
+
+    name = 'spline'
+    pin_original = False
+
+    def __init__(self, smoothing=SPLINE_SMOOTHING):
+        if smoothing < 0:
+            raise ConversionError("Spline smoothing must not be negative")
+        self.smoothing = float(smoothing)
+
+    def key(self):
+        return (self.name, self.smoothing)
+
+    def axis_weights(self, axis, points):
+        n = len(axis)
+        if n < 3:
+            return BilinearResampler().axis_weights(axis, points)
+
+        lo, span = axis[0], axis[-1] - axis[0]
+        x = [(v - lo) / span for v in axis]
+        h = [b - a for a, b in zip(x, x[1:])]
+        lam = self.smoothing
+
+        # Reinsch form: Q (n x n-2) second differences, R (n-2 x n-2) tridiagonal
+        q = [[0.0] * (n - 2) for _ in range(n)]
+        r = [[0.0] * (n - 2) for _ in range(n - 2)]
+        for j in range(n - 2):
+            i = j + 1
+            q[i - 1][j] = 1 / h[i - 1]
+            q[i][j] = -1 / h[i - 1] - 1 / h[i]
+            q[i + 1][j] = 1 / h[i]
+            r[j][j] = (h[i - 1] + h[i]) / 3
+            if j + 1 < n - 2:
+                r[j][j + 1] = r[j + 1][j] = h[i] / 6
+
+        # (R + lam Q'Q) gamma = Q' y; smoothed values g = y - lam Q gamma.
+        # Solved for the identity, so gamma and g are matrices over the inputs.
+        qt = [list(col) for col in zip(*q)]
+        system = [[r[a][b] + lam * sum(qa * qb for qa, qb in zip(qt[a], qt[b]))
+                   for b in range(n - 2)] for a in range(n - 2)]
+        gamma = [[0.0] * n for _ in range(n)]
+        for j, row in enumerate(_solve(system, qt)):
+            gamma[j + 1] = row
+        g = [[(1.0 if i == k else 0.0) - lam * sum(q[i][j] * gamma[j + 1][k] for j in range(n - 2))
+              for k in range(n)] for i in range(n)]
+
+        rows = []
+        for p in points:
+            i0, i1, t = axis.bracket(p)
+            if i0 == i1:
+                weights = g[i0]
+            else:
+                c = h[i0] ** 2 / 6 * t * (1 - t)
+                weights = [(1 - t) * a + t * b - c * ((2 - t) * ga + (1 + t) * gb)
+                           for a, b, ga, gb in zip(g[i0], g[i1], gamma[i0], gamma[i1])]
+            rows.append(tuple((k, w) for k, w in enumerate(weights) if w != 0.0))
+        return rows
+
+
+RESAMPLERS = {}
+
+
+def register_resampler(resampler):
+    """Make a Resampler instance available by its name."""
+    RESAMPLERS[resampler.name] = resampler
+    return resampler
+
+
+for _resampler in (BilinearResampler(), CubicResampler(), PchipResampler(), SplineResampler()):
+    register_resampler(_resampler)
+
+
+def get_resampler(kernel=None):
+    """Resolve None, a registered name or a Resampler instance."""
+    if kernel is None:
+        return RESAMPLERS[DEFAULT_KERNEL]
+    if isinstance(kernel, Resampler):
+        return kernel
+    try:
+        return RESAMPLERS[kernel]
+    except KeyError:
+        raise ConversionError(
+            f"Unknown kernel {kernel!r}, expected one of: {', '.join(RESAMPLERS)}"
+        )
+
+
+# ===== INTERPOLATION + VERTICAL SMOOTHING =====
+
+def bilinear_interpolate_point(x, y, x_vals, y_vals, grid):
+    """
+    Bilinear interpolation of VO value at point (x, y)
+    from original 8x12 grid defined by x_vals, y_vals and grid[row][col].
+    """
+    # Bracketing indices by binary search, clamped at the axis ends
+    k0, k1, tx = bracket(x_vals, x)
+    l0, l1, ty = bracket(y_vals, y)
+
+    q00 = grid[l0][k0]
+    q10 = grid[l0][k1]
+    q01 = grid[l1][k0]
+    q11 = grid[l1][k1]
+
+    # Edge cases where interpolation reduces to 1D or a single point
+    if k0 == k1 and l0 == l1:
+        return q00
+    if k0 == k1:
+        return q00 + (q01 - q00) * ty
+    if l0 == l1:
+        return q00 + (q10 - q00) * tx
+
+    a = q00 * (1 - tx) + q10 * tx
+    b = q01 * (1 - tx) + q11 * tx
+    return a * (1 - ty) + b * ty
+
+
+def vertical_smooth(grid, fixed_mask, beta=SMOOTH_BETA, iterations=SMOOTH_ITERATIONS):
+    """
+    Stronger vertical smoothing along MAP (Y) axis.
+
+    For each non-fixed cell, pull it towards the average of the cell above
+    and below. beta controls how strong the smoothing is (0..1), iterations
+    how many passes we do. See Relaxation for a solver that runs to a
+    tolerance instead.
+    """
+    rows = len(grid)
+    cols = len(grid[0]) if rows > 0 else 0
+    if iterations <= 0:
+        return grid
+
+    # Two buffers swapped every pass; fixed and edge cells are equal in both
+    grid = [row[:] for row in grid]
+    new_grid = [row[:] for row in grid]
+    for _ in range(iterations):
+        for r in range(1, rows - 1):  # skip first/last row (need both neighbors)
+            for c in range(cols):
+                if fixed_mask[r][c]:
+                    continue
+
+                up = grid[r - 1][c]
+                down = grid[r + 1][c]
+                avg = (up + down) / 2.0
+
+                new_grid[r][c] = grid[r][c] * (1.0 - beta) + avg * beta
+
+        grid, new_grid = new_grid, grid
+
+    return grid
+
+
+def build_fixed_mask(old_x, old_y, new_x, new_y):
+    """
+    Locate original 8x12 breakpoints inside the extended axes.
+
+    Returns (mask, points) where mask[r][c] is True for pinned cells and
+    points is a list of (r_new, c_new, r_old, c_old) tuples. A breakpoint
+    repeated in the extended axis is pinned at its first position.
+    """
+    if not isinstance(new_x, Axis):
+        new_x = Axis(new_x, "Target X-axis", strict=False)
+    if not isinstance(new_y, Axis):
+        new_y = Axis(new_y, "Target Y-axis", strict=False)
+
+    mask = [[False for _ in range(len(new_x))] for _ in range(len(new_y))]
+    points = []
+
+    # Original axis values not present in the extended axis locate to None
+    cols_new = new_x.locate_many(old_x)
+    for r_old, r_new in enumerate(new_y.locate_many(old_y)):
+        if r_new is None:
+            continue
+        for c_old, c_new in enumerate(cols_new):
+            if c_new is None:
+                continue
+            mask[r_new][c_new] = True
+            points.append((r_new, c_new, r_old, c_old))
+
+    return mask, points
+
+
+def interpolate_grid_direct(old_x, old_y, old_grid, new_x, new_y,
+                            beta=SMOOTH_BETA, iterations=SMOOTH_ITERATIONS):
+    """
+    Create 16x16 VO grid point by point:
+    1) Bilinear interpolation from original 8x12
+    2) Vertical smoothing along MAP axis while keeping original 8x12 points fixed
+
+    This is the reference implementation the interpolation plans must
+    agree with; interpolate_grid() is the fast entry point.
+    """
+    new_x = list(new_x)
+    new_y = list(new_y)
+
+    # 1) Initial 16x16 grid from pure bilinear interpolation
+    data_grid = [
+        [bilinear_interpolate_point(x, y, old_x, old_y, old_grid) for x in new_x]
+        for y in new_y
+    ]
+
+    # 2) Pin original 8x12 points in 16x16 grid
+    fixed_mask, points = build_fixed_mask(old_x, old_y, new_x, new_y)
+    for r_new, c_new, r_old, c_old in points:
+        data_grid[r_new][c_new] = old_grid[r_old][c_old]
+
+    # 3) Stronger vertical smoothing to reduce large jumps between MAP rows
+    return vertical_smooth(data_grid, fixed_mask, beta=beta, iterations=iterations)
+
+
+def interpolate_grid(old_x, old_y, old_grid, new_x, new_y,
+                     beta=SMOOTH_BETA, iterations=SMOOTH_ITERATIONS, use_numpy=None, kernel=None):
+    """
+    Create 16x16 VO grid from the original 8x12 grid, see interpolate_grid_direct().
+
+    Uses the cached interpolation plan for these axes, so only the first
+    call per axis pair pays for bracketing and weights.
+    use_numpy=None picks the NumPy path when NumPy is installed.
+    kernel replaces the bilinear step, see get_resampler().
+    Always returns a list of lists.
+    """
+    plan = get_plan(old_x, old_y, new_x, new_y, beta=beta, iterations=iterations,
+                    use_numpy=use_numpy, kernel=kernel)
+    with profile.stage('interpolate'):
+        return plan.apply(old_grid)
+
+
+# ===== NUMPY PATH =====
+
+def load_numpy():
+    """Import NumPy on first call. Returns the module, None when it is not installed."""
+    global np, _numpy_tried
+    if not _numpy_tried:
+        _numpy_tried = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def _require_numpy():
+    if load_numpy() is None:
+        raise ImportError("NumPy is required for the array-backed engine")
+
+
+def bracket_indices(axis, points):
+    """
+    Vectorized bracketing of points on a sorted axis.
+
+    Returns (i0, i1, t) arrays so that value = v[i0] * (1 - t) + v[i1] * t,
+    with the same clamping rules as bilinear_interpolate_point().
+    """
+    _require_numpy()
+    axis = np.asarray(axis, dtype=float)
+    points = np.asarray(points, dtype=float)
+    n = len(axis)
+
+    if n == 1:
+        zeros = np.zeros(len(points), dtype=np.intp)
+        return zeros, zeros, np.zeros(len(points))
+
+    # searchsorted(side='left') gives the first interval whose upper bound >= point,
+    # which is what the linear scan in bilinear_interpolate_point() finds
+    i0 = np.clip(np.searchsorted(axis, points, side='left') - 1, 0, n - 2)
+    i1 = i0 + 1
+
+    below = points <= axis[0]
+    above = points >= axis[-1]
+    i0[below] = 0
+    i1[below] = 0
+    i0[above] = n - 1
+    i1[above] = n - 1
+
+    span = axis[i1] - axis[i0]
+    t = np.zeros(len(points))
+    np.divide(points - axis[i0], span, out=t, where=span != 0)
+    return i0, i1, t
+
+
+def interpolate_grid_array(old_x, old_y, old_grid, new_x, new_y,
+                           beta=SMOOTH_BETA, iterations=SMOOTH_ITERATIONS, kernel=None):
+    """
+    NumPy version of interpolate_grid(), returns a float64 array.
+
+    old_grid may also be a stack of grids shaped (..., rows, cols).
+    """
+    plan = get_plan(old_x, old_y, new_x, new_y, beta=beta, iterations=iterations,
+                    use_numpy=True, kernel=kernel)
+    return plan.apply_array(old_grid)
+
+
+# ===== INTERPOLATION PLAN =====
+
+# Number of compiled plans kept per process
+PLAN_CACHE_SIZE = 64
+
+
+class InterpolationPlan:
+    """
+    Interpolation, pinning and smoothing compiled into one sparse operator.
+
+    Every step of interpolate_grid_direct() is linear in the source grid, so
+    the whole thing is a (dst cells x src cells) matrix. It is stored row by
+    row as the few source indices each target cell depends on and their
+    weights, which turns converting a map into one sparse matrix-vector
+    multiply.
+
+    The bilinear step can be swapped for any linear Resampler; the plan
+    stays the same shape, only the weights differ.
+    """
+
+    linear = True
+
+    def __init__(self, src_shape, dst_shape, indices, weights, fixed_mask, points, uses_numpy):
+        self.src_shape = src_shape
+        self.dst_shape = dst_shape
+        self.indices = indices
+        self.weights = weights
+        self.fixed_mask = fixed_mask
+        self.points = points
+        self.uses_numpy = uses_numpy
+        self._terms = None
+        self._dependents = None
+
+    def terms(self):
+        """Nonzero (source index, weight) pairs of every target cell, row-major."""
+        if self._terms is None:
+            self._terms = [
+                tuple((int(i), float(w)) for i, w in zip(idx, wts) if w != 0)
+                for idx, wts in zip(self.indices, self.weights)
+            ]
+        return self._terms
+
+    def dependents(self):
+        """For every source cell, the target cells whose value depends on it."""
+        if self._dependents is None:
+            deps = [[] for _ in range(self.src_shape[0] * self.src_shape[1])]
+            for dst, terms in enumerate(self.terms()):
+                for src, _ in terms:
+                    deps[src].append(dst)
+            self._dependents = [tuple(d) for d in deps]
+        return self._dependents
+
+    def apply(self, grid):
+        """Resample one source grid, returns a list of lists."""
+        if self.uses_numpy:
+            return self.apply_array(grid).tolist()
+
+        flat = [float(v) for row in grid for v in row]
+        dst_cols = self.dst_shape[1]
+        values = [
+            sum(flat[i] * w for i, w in zip(idx, wts))
+            for idx, wts in zip(self.indices, self.weights)
+        ]
+        return [values[r:r + dst_cols] for r in range(0, len(values), dst_cols)]
+
+    def apply_array(self, grids):
+        """Resample a grid or a stack of grids shaped (..., rows, cols)."""
+        _require_numpy()
+        if not self.uses_numpy:
+            raise ValueError("Plan was compiled without NumPy")
+
+        grids = np.asarray(grids, dtype=float)
+        if grids.shape[-2:] != self.src_shape:
+            raise ConversionError(
+                f"Grid must be {self.src_shape[0]}x{self.src_shape[1]} to match the plan"
+            )
+        flat = grids.reshape(grids.shape[:-2] + (-1,))
+        values = (flat[..., self.indices] * self.weights).sum(axis=-1)
+        return values.reshape(grids.shape[:-2] + self.dst_shape)
+
+
+class SeparablePlan:
+    """
+    Plan for kernels that depend on the data (Resampler.linear is False).
+
+    Resamples every source row along X, then every column along Y with
+    the kernel's precomputed axis operators, then pins and smooths like
+    InterpolationPlan. There is no weight matrix, so terms() and
+    dependents() are not available.
+    """
+
+    linear = False
+
+    def __init__(self, src_shape, dst_shape, x_operator, y_operator, fixed_mask, points,
+                 beta, iterations, uses_numpy):
+        self.src_shape = src_shape
+        self.dst_shape = dst_shape
+        self.x_operator = x_operator
+        self.y_operator = y_operator
+        self.fixed_mask = fixed_mask
+        self.points = points
+        self.beta = beta
+        self.iterations = iterations
+        self.uses_numpy = uses_numpy
+
+    def apply(self, grid):
+        """Resample one grid, returns a list of lists."""
+        grid = [[float(v) for v in row] for row in grid]
+        if (len(grid), len(grid[0]) if grid else 0) != self.src_shape:
+            raise ConversionError(
+                f"Grid must be {self.src_shape[0]}x{self.src_shape[1]} to match the plan"
+            )
+
+        along_x = [self.x_operator.apply_line(row) for row in grid]
+        columns = [self.y_operator.apply_line(col) for col in zip(*along_x)]
+        data = [list(row) for row in zip(*columns)]
+        for r_new, c_new, r_old, c_old in self.points:
+            data[r_new][c_new] = grid[r_old][c_old]
+        return vertical_smooth(data, self.fixed_mask, beta=self.beta, iterations=self.iterations)
+
+    def apply_array(self, grids):
+        """Resample a grid or a stack of grids shaped (..., rows, cols)."""
+        _require_numpy()
+        grids = np.asarray(grids, dtype=float)
+        if grids.shape[-2:] != self.src_shape:
+            raise ConversionError(
+                f"Grid must be {self.src_shape[0]}x{self.src_shape[1]} to match the plan"
+            )
+        flat = grids.reshape((-1,) + self.src_shape)
+        out = np.array([self.apply(g.tolist()) for g in flat])
+        return out.reshape(grids.shape[:-2] + self.dst_shape)
+
+
+def _add_term(terms, src, w):
+    if w != 0.0:
+        terms[src] = terms.get(src, 0.0) + w
+
+
+def _compile_plan_python(x_weights, y_weights, cols, new_cols, fixed_mask, points, beta, iterations):
+    """
+    Build the plan rows directly as sparse {source index: weight} maps.
+
+    Mirrors interpolate_grid_direct() step by step, but on weights instead
+    of values, so compiling costs O(target cells) rather than one full
+    pipeline run per source cell. x_weights / y_weights are the kernel's
+    per-axis weight rows; their outer product is the 2D resampling step.
+    """
+    # 1) Kernel weights (bilinear by default)
+    rows_terms = []
+    for y_row in y_weights:
+        row = []
+        for x_row in x_weights:
+            terms = {}
+            for l, wy in y_row:
+                for k, wx in x_row:
+                    _add_term(terms, l * cols + k, wy * wx)
+            row.append(terms)
+        rows_terms.append(row)
+
+    # 2) Pinned original points depend on exactly one source cell
+    for r_new, c_new, r_old, c_old in points:
+        rows_terms[r_new][c_new] = {r_old * cols + c_old: 1.0}
+
+    # 3) Jacobi smoothing passes on the weight maps
+    for _ in range(iterations):
+        smoothed = [row[:] for row in rows_terms]
+        for r in range(1, len(rows_terms) - 1):
+            for c in range(new_cols):
+                if fixed_mask[r][c]:
+                    continue
+                terms = {}
+                for src, w in rows_terms[r][c].items():
+                    _add_term(terms, src, w * (1.0 - beta))
+                for src, w in rows_terms[r - 1][c].items():
+                    _add_term(terms, src, w * beta * 0.5)
+                for src, w in rows_terms[r + 1][c].items():
+                    _add_term(terms, src, w * beta * 0.5)
+                smoothed[r][c] = terms
+        rows_terms = smoothed
+
+    indices = []
+    weights = []
+    for row in rows_terms:
+        for terms in row:
+            ordered = sorted(terms.items())
+            indices.append(tuple(src for src, _ in ordered))
+            weights.append(tuple(w for _, w in ordered))
+    return indices, weights
+
+
+def _compile_plan_numpy(x_weights, y_weights, cols, new_cols, fixed_mask, points, beta, iterations):
+    """
+    Sparse rows of _compile_plan_python() packed as padded index/weight
+    arrays; padding entries have weight 0 and point at source cell 0.
+    """
+    rows_indices, rows_weights = _compile_plan_python(x_weights, y_weights, cols, new_cols,
+                                                      fixed_mask, points, beta, iterations)
+    width = max(1, max(len(idx) for idx in rows_indices))
+    indices = np.zeros((len(rows_indices), width), dtype=np.intp)
+    weights = np.zeros((len(rows_indices), width))
+    for r, (idx, wts) in enumerate(zip(rows_indices, rows_weights)):
+        indices[r, :len(idx)] = idx
+        weights[r, :len(wts)] = wts
+    return indices, weights
+
+
+@functools.lru_cache(maxsize=PLAN_CACHE_SIZE)
+@profile.timed('plan_compile')
+def _cached_plan(old_x, old_y, new_x, new_y, beta, iterations, use_numpy, resampler):
+    # Axes are validated here, once per cached plan
+    old_x = Axis(old_x, "X-axis")
+    old_y = Axis(old_y, "Y-axis")
+    new_x = Axis(new_x, "Target X-axis", strict=False)
+    new_y = Axis(new_y, "Target Y-axis", strict=False)
+    src_shape = (len(old_y), len(old_x))
+    dst_shape = (len(new_y), len(new_x))
+
+    if resampler.pin_original:
+        fixed_mask, points = build_fixed_mask(old_x, old_y, new_x, new_y)
+    else:
+        fixed_mask, points = [[False] * dst_shape[1] for _ in range(dst_shape[0])], []
+
+    if not resampler.linear:
+        return SeparablePlan(src_shape, dst_shape,
+                             resampler.axis_operator(old_x, new_x.values),
+                             resampler.axis_operator(old_y, new_y.values),
+                             fixed_mask, points, beta, iterations, use_numpy)
+
+    x_weights = resampler.axis_weights(old_x, new_x.values)
+    y_weights = resampler.axis_weights(old_y, new_y.values)
+    if use_numpy:
+        indices, weights = _compile_plan_numpy(x_weights, y_weights, src_shape[1], dst_shape[1],
+                                               fixed_mask, points, beta, iterations)
+    else:
+        indices, weights = _compile_plan_python(x_weights, y_weights, src_shape[1], dst_shape[1],
+                                                fixed_mask, points, beta, iterations)
+    return InterpolationPlan(src_shape, dst_shape, indices, weights, fixed_mask, points, use_numpy)
+
+
+def get_plan(old_x, old_y, new_x, new_y, beta=SMOOTH_BETA, iterations=SMOOTH_ITERATIONS,
+             use_numpy=None, kernel=None):
+    """
+    Return the compiled InterpolationPlan (SeparablePlan for data-dependent
+    kernels) for these axes.
+
+    Plans are memoized in a bounded LRU keyed by the axis tuples, the
+    smoothing parameters and the kernel. Treat the returned plan as
+    read-only, it is shared.
+    """
+    resampler = get_resampler(kernel)
+    if use_numpy is None:
+        use_numpy = load_numpy() is not None
+    if use_numpy:
+        _require_numpy()
+
+    return _cached_plan(
+        tuple(float(v) for v in old_x), tuple(float(v) for v in old_y),
+        tuple(float(v) for v in new_x), tuple(float(v) for v in new_y),
+        float(beta), int(iterations), bool(use_numpy), resampler,
+    )
+
+
+def clear_plan_cache():
+    """Drop all compiled interpolation plans."""
+    _cached_plan.cache_clear()
+
+
+# ===== RELAXATION SMOOTHING =====
+
+RELAX_METHODS = ('gauss-seidel', 'sor')
+
+
+class RelaxResult:
+    """Output of Relaxation.solve(): the grid plus convergence figures."""
+
+    def __init__(self, grid, iterations, residual, converged):
+        self.grid = grid
+        self.iterations = iterations
+        self.residual = residual
+        self.converged = converged
+
+
+class Relaxation:
+    """
+    Iterative 2D smoothing with pinned cells, solved to a tolerance.
+
+    The smoothed grid v is the solution of
+
+        v - d + strength_y * sum(v - MAP neighbours) + strength_x * sum(v - RPM neighbours) = 0
+
+    for every free cell, d being the interpolated grid; fixed_mask cells
+    keep their value. Unlike the fixed Jacobi passes of vertical_smooth()
+    this has a defined end point, smooths along RPM too, and stops as
+    soon as the largest correction of a sweep drops below tolerance.
+
+    method 'gauss-seidel' updates cells in place; 'sor' over-relaxes each
+    correction by omega (1 < omega < 2 usually converges faster).
+    """
+
+    def __init__(self, strength_x=RELAX_STRENGTH_X, strength_y=RELAX_STRENGTH_Y,
+                 method='gauss-seidel', omega=RELAX_OMEGA, tolerance=RELAX_TOLERANCE,
+                 max_iterations=RELAX_MAX_ITERATIONS):
+        if method not in RELAX_METHODS:
+            raise ConversionError(f"Unknown relaxation method {method!r}")
+        if strength_x < 0 or strength_y < 0:
+            raise ConversionError("Smoothing strength must not be negative")
+        if not 0 < omega < 2:
+            raise ConversionError("SOR omega must be between 0 and 2")
+        if tolerance <= 0 or max_iterations < 1:
+            raise ConversionError("Relaxation needs a positive tolerance and iteration limit")
+        self.strength_x = float(strength_x)
+        self.strength_y = float(strength_y)
+        self.method = method
+        self.omega = float(omega) if method == 'sor' else 1.0
+        self.tolerance = float(tolerance)
+        self.max_iterations = int(max_iterations)
+
+    def key(self):
+        """Identity for result caching; include every parameter."""
+        return (self.method, self.strength_x, self.strength_y, self.omega, self.tolerance,
+                self.max_iterations)
+
+    @profile.timed('smooth')
+    def solve(self, grid, fixed_mask):
+        """Smooth grid (list of lists); the input is not modified. Returns a RelaxResult."""
+        rows = len(grid)
+        cols = len(grid[0]) if rows else 0
+        data = [float(v) for row in grid for v in row]
+        values = data[:]
+
+        # Per free cell: flat index, neighbour indices with their strength, diagonal
+        stencil = []
+        for r in range(rows):
+            for c in range(cols):
+                if fixed_mask[r][c]:
+                    continue
+                neighbours = []
+                if r > 0:
+                    neighbours.append(((r - 1) * cols + c, self.strength_y))
+                if r < rows - 1:
+                    neighbours.append(((r + 1) * cols + c, self.strength_y))
+                if c > 0:
+                    neighbours.append((r * cols + c - 1, self.strength_x))
+                if c < cols - 1:
+                    neighbours.append((r * cols + c + 1, self.strength_x))
+                diagonal = 1.0 + sum(w for _, w in neighbours)
+                stencil.append((r * cols + c, tuple(neighbours), diagonal))
+
+        omega = self.omega
+        residual = 0.0
+        iterations = 0
+        while iterations < self.max_iterations:
+            iterations += 1
+            residual = 0.0
+            for i, neighbours, diagonal in stencil:
+                total = data[i]
+                for j, w in neighbours:
+                    total += w * values[j]
+                correction = total / diagonal - values[i]
+                if abs(correction) > residual:
+                    residual = abs(correction)
+                values[i] += omega * correction
+            if residual <= self.tolerance:
+                break
+
+        smoothed = [values[r * cols:(r + 1) * cols] for r in range(rows)]
+        return RelaxResult(smoothed, iterations, residual, residual <= self.tolerance)
+
+
+def interpolate_grid_relaxed(old_x, old_y, old_grid, new_x, new_y, relaxation,
+                             use_numpy=None, kernel=None):
+    """
+    interpolate_grid() with the Jacobi passes replaced by a Relaxation.
+
+    The kernel and pinning still come from the cached plan. Returns the
+    RelaxResult, whose grid is the VO grid.
+    """
+    plan = get_plan(old_x, old_y, new_x, new_y, iterations=0, use_numpy=use_numpy, kernel=kernel)
+    with profile.stage('interpolate'):
+        grid = plan.apply(old_grid)
+    return relaxation.solve(grid, plan.fixed_mask)
+
+
+# ===== CHARGE TEMPERATURE =====
+
+# Surfaces kept by IatModel.surface(), per model and target axes
+SURFACE_CACHE_SIZE = 64
+
+# Coolant share of the charge temperature at zero and at full airflow, see ChargeTemperature
+CHARGE_BIAS_MAX = 0.5
+CHARGE_BIAS_MIN = 0.1
+
+
+def _check_temperature(value, name):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ConversionError(f"{name} must be a number")
+    if value <= -KELVIN_OFFSET:
+        raise ConversionError(f"{name} must be above absolute zero")
+    return value
+
+
+def _unpadded_length(values):
+    """Length of an axis without the repeats of its last breakpoint."""
+    end = len(values)
+    while end > 1 and values[end - 1] == values[end - 2]:
+        end -= 1
+    return end
+
+
+class IatModel:
+    """
+    Charge temperature in °C per target cell.
+
+    Everything that takes an IAT (calculate_ve, convert_ve_to_vo,
+    convert_map, IncrementalConverter) also takes a model. surface()
+    evaluates it on a pair of target axes and caches the result, so a
+    batch of maps on the same axes evaluates the model once.
+    """
+
+    name = None
+
+    def key(self):
+        """Identity for surface caching; include every parameter."""
+        raise NotImplementedError
+
+    def __eq__(self, other):
+        return isinstance(other, IatModel) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def evaluate(self, new_x, new_y):
+        """Temperatures as a list of rows, one row per MAP breakpoint."""
+        raise NotImplementedError
+
+    def surface(self, new_x, new_y):
+        """Cached evaluate() as a tuple of row tuples; it is shared, treat it as read-only."""
+        return _cached_surface(self, tuple(float(v) for v in new_x), tuple(float(v) for v in new_y))
+
+
+class ConstantIat(IatModel):
+    """One IAT for the whole table, what a plain number means."""
+
+    name = 'constant'
+
+    def __init__(self, iat):
+        self.iat = _check_temperature(iat, "IAT")
+
+    def key(self):
+        return (self.name, self.iat)
+
+    def __str__(self):
+        return f"{self.iat:g} °C"
+
+    def evaluate(self, new_x, new_y):
+        return [[self.iat] * len(new_x) for _ in new_y]
+
+
+class IatMap(IatModel):
+    """
+    IAT over RPM and MAP, resampled bilinearly onto the target axes.
+
+    A single-column map (x_values with one breakpoint) gives an IAT per
+    MAP row only. Repeats of the last breakpoint (MS4x padding) are
+    dropped together with their cells.
+    """
+
+    name = 'map'
+
+    def __init__(self, x_values, y_values, grid):
+        x_values, y_values = list(x_values), list(y_values)
+        if len(grid) != len(y_values) or any(len(row) != len(x_values) for row in grid):
+            raise ConversionError(
+                f"IAT map must be {len(y_values)}x{len(x_values)} to match its axes"
+            )
+        cols, rows = _unpadded_length(x_values), _unpadded_length(y_values)
+        x_axis = Axis(x_values[:cols], "IAT map RPM axis")
+        y_axis = Axis(y_values[:rows], "IAT map MAP axis")
+        grid = [row[:cols] for row in grid[:rows]]
+        self.x_values = x_axis.values
+        self.y_values = y_axis.values
+        self.grid = tuple(tuple(_check_temperature(v, "IAT map value") for v in row) for row in grid)
+
+    def key(self):
+        return (self.name, self.x_values, self.y_values, self.grid)
+
+    def __str__(self):
+        values = [v for row in self.grid for v in row]
+        return f"IAT map {min(values):g}..{max(values):g} °C"
+
+    def evaluate(self, new_x, new_y):
+        plan = get_plan(self.x_values, self.y_values, new_x, new_y, iterations=0)
+        return plan.apply(self.grid)
+
+
+class ChargeTemperature(IatModel):
+    """
+    Charge temperature blended from IAT and coolant temperature.
+
+        T = IAT + bias * (coolant - IAT)
+
+    Air picks up more heat from the intake the slower it flows, so the
+    coolant share falls linearly from bias_max at zero airflow to bias_min
+    at full airflow. Airflow is rpm * MAP relative to flow_reference, by
+    default the largest rpm * MAP on the target axes. iat is a number or
+    another IatModel.
+    """
+
+    name = 'blend'
+
+    def __init__(self, iat, coolant, bias_max=CHARGE_BIAS_MAX, bias_min=CHARGE_BIAS_MIN,
+                 flow_reference=None):
+        self.iat = as_iat_model(iat)
+        self.coolant = _check_temperature(coolant, "Coolant temperature")
+        if not 0 <= bias_min <= 1 or not 0 <= bias_max <= 1:
+            raise ConversionError("Charge temperature bias must be between 0 and 1")
+        if flow_reference is not None and flow_reference <= 0:
+            raise ConversionError("Flow reference must be positive")
+        self.bias_max = float(bias_max)
+        self.bias_min = float(bias_min)
+        self.flow_reference = None if flow_reference is None else float(flow_reference)
+
+    def key(self):
+        return (self.name, self.iat.key(), self.coolant, self.bias_max, self.bias_min,
+                self.flow_reference)
+
+    def __str__(self):
+        return f"{self.iat} / coolant {self.coolant:g} °C"
+
+    def evaluate(self, new_x, new_y):
+        iat_surface = self.iat.surface(new_x, new_y)
+        reference = self.flow_reference or max(new_x) * max(new_y) or 1.0
+        span = self.bias_max - self.bias_min
+        surface = []
+        for map_kpa, iats in zip(new_y, iat_surface):
+            row = []
+            for rpm, iat in zip(new_x, iats):
+                flow = min(max(rpm * map_kpa / reference, 0.0), 1.0)
+                row.append(iat + (self.bias_max - span * flow) * (self.coolant - iat))
+            surface.append(row)
+        return surface
+
+
+def as_iat_model(iat):
+    """IatModel for a number (ConstantIat) or a model."""
+    if isinstance(iat, IatModel):
+        return iat
+    return ConstantIat(iat)
+
+
+@functools.lru_cache(maxsize=SURFACE_CACHE_SIZE)
+@profile.timed('iat_model')
+def _cached_surface(model, new_x, new_y):
+    return tuple(tuple(float(t) for t in row) for row in model.evaluate(new_x, new_y))
+
+
+def clear_surface_cache():
+    """Drop all cached temperature surfaces."""
+    _cached_surface.cache_clear()
+
+
+# ===== VE FORMULA =====
+
+# Constants of the VO <-> VE formula
+#   VE = VO * rpm * R * (IAT + 273.15) * 120 / (5555 * MAP * displacement * rpm * 28.9 * 3.6)
+# rpm cancels, everything else except IAT, MAP and displacement folds into VE_FACTOR.
+GAS_CONSTANT = 8.314
+KELVIN_OFFSET = 273.15
+VE_FACTOR = GAS_CONSTANT * 120 / (5555 * 28.9 * 3.6)
+
+
+def ve_scale(map_kpa, displacement, iat):
+    """Factor turning VO into VE for one MAP row (VE = VO * ve_scale)."""
+    return VE_FACTOR * (iat + KELVIN_OFFSET) / (map_kpa * displacement)
+
+
+def ve_scales(new_x, new_y, displacement, iat):
+    """
+    ve_scale() for every target cell as a list of rows; rows at zero MAP
+    are None. iat is a number or an IatModel.
+    """
+    if not isinstance(iat, IatModel):
+        return [
+            None if map_kpa == 0 else [ve_scale(map_kpa, displacement, iat)] * len(new_x)
+            for map_kpa in new_y
+        ]
+    return [
+        None if map_kpa == 0 else [ve_scale(map_kpa, displacement, t) for t in temperatures]
+        for map_kpa, temperatures in zip(new_y, iat.surface(new_x, new_y))
+    ]
+
+
+@profile.timed('ve_formula')
+def calculate_ve(vo_grid, new_x, new_y, displacement, iat):
+    """
+    Calculate 16x16 VE grid from 16x16 VO grid using thermodynamic formula.
+    iat is a number or an IatModel. Cells with no VO value or zero MAP stay None.
+    """
+    ve_grid = []
+    for row, scales in enumerate(ve_scales(new_x, new_y, displacement, iat)):
+        if scales is None:
+            ve_grid.append([None] * len(new_x))
+            continue
+
+        ve_grid.append([
+            None if vo is None else vo * scale
+            for vo, scale in zip(vo_grid[row], scales)
+        ])
+
+    return ve_grid
+
+
+@profile.timed('ve_formula')
+def convert_ve_to_vo(ve_grid, new_x, new_y, displacement, iat):
+    """
+    Convert 16x16 VE grid back to VO using the inverse of the VE formula.
+    iat is a number or an IatModel. Cells with no VE value or zero MAP stay None.
+    """
+    vo_grid = []
+    for r, scales in enumerate(ve_scales(new_x, new_y, displacement, iat)):
+        if scales is None:
+            vo_grid.append([None] * len(new_x))
+            continue
+
+        vo_grid.append([
+            None if ve_val is None else ve_val / scale
+            for ve_val, scale in zip(ve_grid[r], scales)
+        ])
+
+    return vo_grid
+
+
+class RoundTripReport:
+    """
+    Error figures of a VO -> VE -> VO round trip, see verify_roundtrip().
+
+    Errors cover cells that came back as numbers; relative errors skip
+    cells whose VO is 0. worst_cell is the (row, col) of max_abs,
+    worst_rel_cell that of max_rel. missing lists the cells that held a
+    VO value but came back None.
+    """
+
+    def __init__(self, cells, max_abs, mean_abs, max_rel, mean_rel, worst_cell, missing,
+                 worst_rel_cell=None):
+        self.cells = cells
+        self.max_abs = max_abs
+        self.mean_abs = mean_abs
+        self.max_rel = max_rel
+        self.mean_rel = mean_rel
+        self.worst_cell = worst_cell
+        self.worst_rel_cell = worst_rel_cell
+        self.missing = missing
+
+    def passed(self, tolerance):
+        """True when nothing went missing and no relative error exceeds tolerance."""
+        return not self.missing and self.max_rel <= tolerance
+
+
+def verify_roundtrip(vo_grid, new_x, new_y, displacement, iat, decimals=None):
+    """
+    Run calculate_ve() and convert_ve_to_vo() back to back at full
+    precision and compare the result with vo_grid.
+
+    decimals rounds the VE grid in between, like the tables shown in the
+    GUI and written by vo_ve_tsv (3), to measure what the text format
+    costs. Returns a RoundTripReport.
+    """
+    displacement, iat = validate_parameters(displacement, iat)
+    ve_grid = calculate_ve(vo_grid, new_x, new_y, displacement, iat)
+    if decimals is not None:
+        ve_grid = [[None if v is None else round(v, decimals) for v in row] for row in ve_grid]
+    back = convert_ve_to_vo(ve_grid, new_x, new_y, displacement, iat)
+
+    cells = 0
+    abs_total = rel_total = 0.0
+    rel_cells = 0
+    max_abs = max_rel = 0.0
+    worst_cell = worst_rel_cell = None
+    missing = []
+    for r, (row, back_row) in enumerate(zip(vo_grid, back)):
+        for c, (vo, result) in enumerate(zip(row, back_row)):
+            if vo is None:
+                continue
+            if result is None:
+                missing.append((r, c))
+                continue
+            error = abs(result - vo)
+            cells += 1
+            abs_total += error
+            if worst_cell is None or error > max_abs:
+                max_abs = error
+                worst_cell = (r, c)
+            if vo != 0:
+                rel = error / abs(vo)
+                rel_cells += 1
+                rel_total += rel
+                if worst_rel_cell is None or rel > max_rel:
+                    max_rel = rel
+                    worst_rel_cell = (r, c)
+
+    return RoundTripReport(
+        cells, max_abs, abs_total / cells if cells else 0.0,
+        max_rel, rel_total / rel_cells if rel_cells else 0.0, worst_cell, missing,
+        worst_rel_cell,
+    )
+
+
+def _sweep_scale(new_y, displacements, iats):
+    """
+    VE scale tensor shaped (displacement, iat, row, 1); zero MAP rows are
+    NaN. Checks the sweeps like validate_parameters() checks one value.
+    """
+    try:
+        new_y = np.asarray(new_y, dtype=float)
+        displacements = np.atleast_1d(np.asarray(displacements, dtype=float))
+        iats = np.atleast_1d(np.asarray(iats, dtype=float))
+    except (TypeError, ValueError):
+        raise ConversionError("MAP axis, displacements and IATs must be numbers")
+    if not np.all(displacements > 0):
+        raise ConversionError("Displacement must be positive")
+    if not np.all(iats > -KELVIN_OFFSET):
+        raise ConversionError("IAT must be above absolute zero")
+
+    inv_map = np.full(new_y.shape, np.nan)
+    np.divide(1.0, new_y, out=inv_map, where=new_y != 0)
+
+    temperature = VE_FACTOR * (iats + KELVIN_OFFSET)
+    scale = (temperature[np.newaxis, :, np.newaxis]
+             / displacements[:, np.newaxis, np.newaxis]
+             * inv_map[np.newaxis, np.newaxis, :])
+    return scale[..., np.newaxis]
+
+
+def calculate_ve_batch(vo_grids, new_y, displacements, iats):
+    """
+    VE for a stack of VO grids over displacement and IAT sweeps in one call.
+
+    vo_grids is shaped (maps, rows, cols) (a single grid is accepted too),
+    displacements and iats are scalars or 1-D sequences. Returns a float64
+    array shaped (maps, displacements, iats, rows, cols). Missing VO values
+    (NaN) and zero MAP rows come out as NaN. Raises ConversionError for a
+    displacement that is not positive or an IAT at or below absolute zero.
+    """
+    _require_numpy()
+    vo = np.asarray(vo_grids, dtype=float)
+    if vo.ndim == 2:
+        vo = vo[np.newaxis]
+    scale = _sweep_scale(new_y, displacements, iats)
+    return vo[:, np.newaxis, np.newaxis] * scale[np.newaxis]
+
+
+def convert_ve_to_vo_batch(ve_grids, new_y, displacements, iats):
+    """
+    Inverse of calculate_ve_batch(): VO for a stack of VE grids.
+
+    Returns a float64 array shaped (maps, displacements, iats, rows, cols).
+    """
+    _require_numpy()
+    ve = np.asarray(ve_grids, dtype=float)
+    if ve.ndim == 2:
+        ve = ve[np.newaxis]
+    scale = _sweep_scale(new_y, displacements, iats)
+    return ve[:, np.newaxis, np.newaxis] / scale[np.newaxis]
+
+
+# ===== FULL PIPELINE =====
+
+def validate_inputs(x_values, y_values, grid):
+    """Check axis order, lengths and grid shape, return float copies."""
+    x_values = list(Axis(x_values, "X-axis"))
+    y_values = list(Axis(y_values, "Y-axis"))
+
+    if len(grid) != len(y_values) or any(len(row) != len(x_values) for row in grid):
+        raise ConversionError(
+            f"Grid must be {len(y_values)}x{len(x_values)} to match the axes"
+        )
+
+    try:
+        grid = [[float(v) for v in row] for row in grid]
+    except (TypeError, ValueError):
+        raise ConversionError(
+            f"All {len(y_values)}x{len(x_values)} VO cells must contain valid numbers"
+        )
+
+    return x_values, y_values, grid
+
+
+def generate_vo(x_values, y_values, grid, layout=None, kernel=None, relaxation=None):
+    """
+    Extend axes and build the 16x16 (or layout-sized) VO grid.
+    Returns (new_x, new_y, vo_grid).
+    """
+    new_x, new_y, vo_grid, _ = _generate_vo(x_values, y_values, grid, layout, kernel, relaxation)
+    return new_x, new_y, vo_grid
+
+
+def _generate_vo(x_values, y_values, grid, layout, kernel, relaxation):
+    x_values, y_values, grid = validate_inputs(x_values, y_values, grid)
+    new_x, new_y = (layout or DEFAULT_LAYOUT).build(x_values, y_values)
+    if relaxation is None:
+        vo_grid = interpolate_grid(x_values, y_values, grid, new_x, new_y, kernel=kernel)
+        return new_x, new_y, vo_grid, None
+    relaxed = interpolate_grid_relaxed(x_values, y_values, grid, new_x, new_y, relaxation,
+                                       kernel=kernel)
+    return new_x, new_y, relaxed.grid, relaxed
+
+
+def validate_parameters(displacement, iat):
+    """
+    Check displacement and IAT, return them as floats. An IatModel is
+    returned as is, it checks its temperatures when built.
+    """
+    try:
+        displacement = float(displacement)
+    except (TypeError, ValueError):
+        raise ConversionError("Displacement must be a number")
+    if displacement <= 0:
+        raise ConversionError("Displacement must be positive")
+
+    if not isinstance(iat, IatModel):
+        iat = _check_temperature(iat, "IAT")
+    return displacement, iat
+
+
+def convert_map(x_values, y_values, grid, displacement, iat, layout=None, kernel=None,
+                relaxation=None):
+    """
+    Run the whole 8x12 VO -> 16x16 VO + VE pipeline on plain lists.
+
+    Any source shape works; layout (a TargetLayout) sets the target shape
+    and axes, the default is the ms43x 16x16 layout. kernel picks the
+    resampler (name or Resampler), bilinear by default. iat is a number
+    or an IatModel (IAT map, IAT/coolant blend). relaxation (a
+    Relaxation) replaces the fixed vertical smoothing passes.
+    """
+    displacement, iat = validate_parameters(displacement, iat)
+    new_x, new_y, vo_grid, relaxed = _generate_vo(x_values, y_values, grid, layout, kernel,
+                                                  relaxation)
+    ve_grid = calculate_ve(vo_grid, new_x, new_y, displacement, iat)
+    return ConversionResult(new_x, new_y, vo_grid, ve_grid, induction_mode(y_values), relaxed)
@@ -0,0 +1,140 @@
+"""
+Incremental recalculation for live editing.
+
+IncrementalConverter keeps a converted map in memory. Editing one source
+cell only recomputes the target cells whose value depends on it: the
+interpolation plan already records which source cells feed every target
+cell, bilinear stencil and smoothing spread included. The matching VE
+cells are updated with them.
+
+Axis edits change the plan itself, so they rebuild the whole map (the
+plan for the new axes still comes from the plan cache when it was seen
+before). Kernels without a weight matrix (PCHIP) and relaxation
+smoothing, where every cell depends on every other, also rebuild the
+whole map on every cell edit.
+"""
+
+import vo_ve_engine as engine
+import vo_ve_profile as profile
+
+
+class IncrementalConverter:
+    """Converted VO/VE state that updates per edited cell."""
+
+    def __init__(self, x_values, y_values, grid, displacement, iat,
+                 beta=engine.SMOOTH_BETA, iterations=engine.SMOOTH_ITERATIONS, layout=None,
+                 kernel=None, relaxation=None):
+        self.layout = layout or engine.DEFAULT_LAYOUT
+        self.kernel = engine.get_resampler(kernel)
+        self.relaxation = relaxation
+        self.relaxed = None
+        self.beta = beta
+        self.iterations = iterations
+        self.displacement, self.iat = engine.validate_parameters(displacement, iat)
+        self.set_inputs(x_values, y_values, grid)
+
+    # ===== FULL UPDATES =====
+
+    def set_inputs(self, x_values, y_values, grid):
+        """Replace axes and grid, recompute everything. Returns all target cells."""
+        self.x_values, self.y_values, self.grid = engine.validate_inputs(x_values, y_values, grid)
+        self.new_x, self.new_y = self.layout.build(self.x_values, self.y_values)
+        self.mode = engine.induction_mode(self.y_values)
+        # Relaxation replaces the smoothing passes compiled into the plan
+        iterations = self.iterations if self.relaxation is None else 0
+        self.plan = engine.get_plan(self.x_values, self.y_values, self.new_x, self.new_y,
+                                    beta=self.beta, iterations=iterations, kernel=self.kernel)
+        self._full = not self.plan.linear or self.relaxation is not None
+        if not self._full:
+            self._terms = self.plan.terms()
+            self._dependents = self.plan.dependents()
+        self._flat = [v for row in self.grid for v in row]
+
+        rows, cols = len(self.new_y), len(self.new_x)
+        self.vo_grid = [[None] * cols for _ in range(rows)]
+        self.ve_grid = [[None] * cols for _ in range(rows)]
+        self._update_scales()
+        return self._recompute_all()
+
+    def set_parameters(self, displacement, iat):
+        """Change displacement/IAT. VO is unaffected; returns all target cells."""
+        self.displacement, self.iat = engine.validate_parameters(displacement, iat)
+        self._update_scales()
+        cells = []
+        for r, scales in enumerate(self._scales):
+            for c, vo in enumerate(self.vo_grid[r]):
+                self.ve_grid[r][c] = None if scales is None else vo * scales[c]
+                cells.append((r, c))
+        return cells
+
+    def set_axis_value(self, axis, index, value):
+        """Change one source axis breakpoint ('x' or 'y'). Returns all target cells."""
+        x_values = list(self.x_values)
+        y_values = list(self.y_values)
+        if axis == 'x':
+            x_values[index] = value
+        elif axis == 'y':
+            y_values[index] = value
+        else:
+            raise ValueError(f"Unknown axis {axis!r}")
+        return self.set_inputs(x_values, y_values, self.grid)
+
+    # ===== CELL UPDATES =====
+
+    @profile.timed('interpolate')
+    def set_cell(self, row, col, value):
+        """
+        Change one source cell.
+
+        Returns the (row, col) target cells whose VO/VE changed, which is
+        empty when the value did not change.
+        """
+        value = float(value)
+        cols = len(self.x_values)
+        src = row * cols + col
+        if self._flat[src] == value:
+            return []
+
+        self.grid[row][col] = value
+        self._flat[src] = value
+        if self._full:
+            return self._recompute_all()
+
+        new_cols = len(self.new_x)
+        cells = []
+        for dst in self._dependents[src]:
+            r, c = divmod(dst, new_cols)
+            self._recompute(r, c)
+            cells.append((r, c))
+        return cells
+
+    def _update_scales(self):
+        self._scales = engine.ve_scales(self.new_x, self.new_y, self.displacement, self.iat)
+
+    def _recompute_all(self):
+        rows, cols = len(self.new_y), len(self.new_x)
+        cells = [(r, c) for r in range(rows) for c in range(cols)]
+        if self._full:
+            vo_grid = self.plan.apply(self.grid)
+            if self.relaxation is not None:
+                self.relaxed = self.relaxation.solve(vo_grid, self.plan.fixed_mask)
+                vo_grid = self.relaxed.grid
+            for r, c in cells:
+                vo = vo_grid[r][c]
+                scales = self._scales[r]
+                self.vo_grid[r][c] = vo
+                self.ve_grid[r][c] = None if scales is None else vo * scales[c]
+            return cells
+
+        for r, c in cells:
+            self._recompute(r, c)
+        return cells
+
+    def _recompute(self, r, c):
+        flat = self._flat
+        vo = 0.0
+        for src, w in self._terms[r * len(self.new_x) + c]:
+            vo += flat[src] * w
+        self.vo_grid[r][c] = vo
+        scales = self._scales[r]
+        self.ve_grid[r][c] = None if scales is None else vo * scales[c]
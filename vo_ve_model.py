@@ -0,0 +1,134 @@
+"""
+Typed table storage.
+
+TableModel holds a table's axes and values as flat array('d') buffers
+with a validity mask next to each, instead of one boxed float (or None)
+per cell. CanvasTable keeps one as the source of truth for its numbers:
+values computed by the engine are stored at full precision and only the
+on-screen text is rounded, so a later stage never parses numbers back
+from formatted strings.
+
+Cells are addressed like CanvasTable: (row, col) with row -1 the X
+(RPM) axis and col -1 the Y (MAP) axis.
+"""
+
+from array import array
+
+
+def parse_number(text):
+    """Float value of a cell's text, None when blank or not a number."""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class TableModel:
+    """rows x cols values plus X/Y axes, each with a validity mask."""
+
+    __slots__ = ('rows', 'cols', 'values', 'valid', 'x_axis', 'x_valid', 'y_axis', 'y_valid')
+
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.values = array('d', bytes(8 * rows * cols))
+        self.valid = bytearray(rows * cols)
+        self.x_axis = array('d', bytes(8 * cols))
+        self.x_valid = bytearray(cols)
+        self.y_axis = array('d', bytes(8 * rows))
+        self.y_valid = bytearray(rows)
+
+    def _slot(self, row, col):
+        """(buffer, mask, index) holding a cell."""
+        if row < 0:
+            return self.x_axis, self.x_valid, col
+        if col < 0:
+            return self.y_axis, self.y_valid, row
+        return self.values, self.valid, row * self.cols + col
+
+    # ===== CELLS =====
+
+    def get(self, row, col):
+        """Value of a cell, None when it holds no number."""
+        if row < 0 and col < 0:
+            return None
+        buf, mask, i = self._slot(row, col)
+        return buf[i] if mask[i] else None
+
+    def set(self, row, col, value):
+        """Store a number, or mark the cell empty with None."""
+        if row < 0 and col < 0:
+            return
+        buf, mask, i = self._slot(row, col)
+        if value is None:
+            mask[i] = 0
+        else:
+            buf[i] = value
+            mask[i] = 1
+
+    def set_text(self, row, col, text):
+        """Store the number typed into a cell; returns False if it is not one."""
+        value = parse_number(text)
+        self.set(row, col, value)
+        return value is not None
+
+    def clear(self):
+        """Mark all data cells empty, axes stay."""
+        self.valid[:] = bytes(len(self.valid))
+
+    # ===== BULK ACCESS =====
+
+    def set_grid(self, grid):
+        """Store a rows x cols grid; None entries become empty cells."""
+        for r, row in enumerate(grid):
+            for c, value in enumerate(row):
+                self.set(r, c, value)
+
+    def set_axis(self, axis, values):
+        for i, value in enumerate(values):
+            if axis == 'x':
+                self.set(-1, i, value)
+            else:
+                self.set(i, -1, value)
+
+    def grid(self):
+        """Values as a list of rows, None for empty cells."""
+        values, valid, cols = self.values, self.valid, self.cols
+        return [
+            [values[i] if valid[i] else None for i in range(r * cols, (r + 1) * cols)]
+            for r in range(self.rows)
+        ]
+
+    def axis(self, axis):
+        """Axis breakpoints as a list, None for empty cells."""
+        buf, mask = (self.x_axis, self.x_valid) if axis == 'x' else (self.y_axis, self.y_valid)
+        return [v if ok else None for v, ok in zip(buf, mask)]
+
+    def is_complete(self):
+        """True when every data cell holds a number."""
+        return all(self.valid)
+
+    def complete_grid(self):
+        """Values as a list of rows, raises ValueError if any cell is empty."""
+        if not self.is_complete():
+            raise ValueError("Table has empty or invalid cells")
+        values, cols = self.values, self.cols
+        return [values[r * cols:(r + 1) * cols].tolist() for r in range(self.rows)]
+
+    def complete_axis(self, axis):
+        """Axis breakpoints as a list, raises ValueError if any is empty."""
+        buf, mask = (self.x_axis, self.x_valid) if axis == 'x' else (self.y_axis, self.y_valid)
+        if not all(mask):
+            raise ValueError(f"{axis.upper()}-axis has empty or invalid cells")
+        return buf.tolist()
+
+    def to_array(self):
+        """rows x cols float64 array, NaN for empty cells (needs NumPy)."""
+        import numpy as np
+
+        out = np.frombuffer(self.values, dtype=np.float64).reshape(self.rows, self.cols).copy()
+        out[np.frombuffer(self.valid, dtype=np.uint8).reshape(self.rows, self.cols) == 0] = np.nan
+        return out
@@ -0,0 +1,246 @@
+"""
+Opt-in timing instrumentation.
+
+Code marks its stages with
+
+    with profile.stage('interpolate'):
+        ...
+
+When profiling is off (the default) stage() returns a shared no-op
+object, so the marks cost next to nothing. Turn it on with the
+VO_VE_PROFILE=1 environment variable, --profile on the command line or
+enable(). Every stage then records its call count, total and last wall
+time; summary() formats them for a status bar or a support ticket.
+
+VO_VE_PROFILE_DUMP=<path> (or --profile-dump) additionally runs cProfile
+for the whole session and writes a pstats file at exit.
+
+VO_VE_STARTUP_TRACE=1 (or --startup-trace) records startup milestones
+with mark() and prints them, measured from the import of this module,
+once the GUI is usable. VO_VE_STARTUP_TRACE=<path> (--startup-trace=PATH)
+appends them to a file instead, for the windowed exe that has no console.
+"""
+
+import atexit
+import functools
+import os
+import sys
+import time
+
+ENV_FLAG = 'VO_VE_PROFILE'
+ENV_DUMP = 'VO_VE_PROFILE_DUMP'
+ENV_STARTUP = 'VO_VE_STARTUP_TRACE'
+
+# Startup trace origin; the GUI imports this module first
+_started = time.perf_counter()
+
+# Order stages are listed in by summary()
+STAGE_ORDER = ('parse', 'extend_axes', 'plan_compile', 'interpolate', 'smooth',
+               'iat_model', 've_formula', 'format', 'render', 'dialog')
+
+
+class StageStats:
+    """Call count and wall times of one stage."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.last = 0.0
+
+    def to_dict(self):
+        return {'calls': self.calls, 'total': self.total, 'last': self.last}
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stats = _stats.get(self.name)
+        if stats is None:
+            stats = _stats[self.name] = StageStats()
+        stats.calls += 1
+        stats.total += elapsed
+        stats.last = elapsed
+        return False
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+_stats = {}
+_profiler = None
+
+enabled = os.environ.get(ENV_FLAG, '').lower() not in ('', '0', 'false', 'no')
+
+
+def enable(dump_path=None):
+    """Start recording stages; with dump_path also run cProfile until exit."""
+    global enabled
+    enabled = True
+    if dump_path:
+        start_cprofile(dump_path)
+
+
+def parse_flags(argv):
+    """
+    Handle --profile and --profile-dump PATH in an argument list.
+    Returns the remaining arguments.
+    """
+    remaining = []
+    args = iter(argv)
+    for arg in args:
+        if arg == '--profile':
+            enable()
+        elif arg == '--profile-dump':
+            enable(next(args, None) or 'vo_ve.pstats')
+        elif arg.startswith('--profile-dump='):
+            enable(arg.split('=', 1)[1])
+        elif arg == '--startup-trace':
+            trace_startup()
+        elif arg.startswith('--startup-trace='):
+            trace_startup(arg.split('=', 1)[1])
+        else:
+            remaining.append(arg)
+    return remaining
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def stage(name):
+    """Context manager timing one stage when profiling is enabled."""
+    return _Stage(name) if enabled else _NULL_STAGE
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def stats():
+    """{stage name: StageStats} recorded so far."""
+    return dict(_stats)
+
+
+def reset():
+    _stats.clear()
+
+
+def _ordered_names():
+    known = [name for name in STAGE_ORDER if name in _stats]
+    return known + sorted(name for name in _stats if name not in STAGE_ORDER)
+
+
+def summary(last=True):
+    """
+    One line per-stage timing, e.g. "interpolate 0.12 ms | render 3.4 ms".
+    last=False shows totals with call counts instead of the latest call.
+    """
+    parts = []
+    for name in _ordered_names():
+        s = _stats[name]
+        if last:
+            parts.append(f"{name} {s.last * 1000:.2f} ms")
+        else:
+            parts.append(f"{name} {s.total * 1000:.1f} ms/{s.calls}")
+    return " | ".join(parts)
+
+
+def report():
+    """Multi-line table of all stages for logs and support tickets."""
+    lines = [f"{'stage':14} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'last ms':>9}"]
+    for name in _ordered_names():
+        s = _stats[name]
+        lines.append(f"{name:14} {s.calls:7d} {s.total * 1000:10.2f} "
+                     f"{s.total * 1000 / s.calls:9.3f} {s.last * 1000:9.3f}")
+    return "\n".join(lines)
+
+
+# ===== STARTUP TRACE =====
+
+# '1' prints the trace to stderr, anything else is a file path; None is off
+startup_trace = os.environ.get(ENV_STARTUP) or None
+if startup_trace in ('0', 'false', 'no'):
+    startup_trace = None
+_marks = []
+
+
+def trace_startup(target='1'):
+    """Turn the startup trace on; target '1' means stderr, otherwise a file path."""
+    global startup_trace
+    startup_trace = target
+
+
+def mark(label):
+    """Record a startup milestone when the startup trace is on."""
+    if startup_trace:
+        _marks.append((label, time.perf_counter()))
+
+
+def startup_report():
+    """Milestones with their time since start and since the previous one."""
+    lines = [f"{'milestone':14} {'at ms':>9} {'step ms':>9}"]
+    previous = _started
+    for label, when in _marks:
+        lines.append(f"{label:14} {(when - _started) * 1000:9.1f} {(when - previous) * 1000:9.1f}")
+        previous = when
+    return "\n".join(lines)
+
+
+def write_startup_report():
+    """Print or append the startup trace, does nothing when it is off."""
+    if not startup_trace:
+        return
+    if startup_trace.lower() in ('1', 'true', 'yes'):
+        print(startup_report(), file=sys.stderr)
+        return
+    with open(startup_trace, 'a', encoding='utf-8') as f:
+        f.write(time.strftime('%Y-%m-%d %H:%M:%S') + "\n" + startup_report() + "\n\n")
+
+
+# ===== CPROFILE =====
+
+def start_cprofile(path):
+    """Profile everything from now on and write pstats to path at exit."""
+    global _profiler
+    import cProfile
+
+    if _profiler is not None:
+        return
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    atexit.register(stop_cprofile, path)
+
+
+def stop_cprofile(path):
+    """Stop cProfile and write its pstats file, readable with python -m pstats."""
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(path)
+    _profiler = None
+
+
+if enabled and os.environ.get(ENV_DUMP):
+    start_cprofile(os.environ[ENV_DUMP])
@@ -0,0 +1,350 @@
+"""
+Session and workspace files.
+
+A session is one map as the GUI holds it: the source VO table, the
+generated VO and VE tables (each with axes), displacement, IAT, kernel,
+smoothing and target layout. A workspace file holds any number of them,
+e.g. the history of one car; a session file is a workspace with a
+single map.
+
+File layout (little endian):
+
+    prefix  magic b'VOVESESS', format version (u32), header length (u32)
+    header  UTF-8 JSON: {"version": 1, "maps": [entry, ...]}
+    data    float64 array section
+
+Each entry carries the map's name, creation time, parameters and
+settings, plus "offset" and "length" of its block in the array section
+and the shape of every table in it. A block is the tables one after the
+other, each stored as X axis, Y axis, then the cells row by row, NaN for
+empty cells. Opening a Workspace reads only the header, so a listing of
+a 200-map workspace is available at once; a map's arrays are read and
+decoded when load() asks for it. Block offsets are relative to the
+array section, so append_session() copies the existing section as raw
+bytes and only adds the new block and header entry.
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+import vo_ve_engine as engine
+import vo_ve_profile as profile
+from vo_ve_model import TableModel
+
+MAGIC = b'VOVESESS'
+FORMAT_VERSION = 1
+PREFIX = struct.Struct('<8sII')
+
+SESSION_EXTENSION = '.vove'
+
+# Tables of a session in block order
+TABLE_NAMES = ('source', 'vo', 've')
+
+
+# ===== TABLE ENCODING =====
+
+def _float_bytes(values):
+    if sys.byteorder == 'big':
+        values = array('d', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_table(model):
+    """X axis, Y axis and cells of a TableModel as float64 bytes, NaN for empty cells."""
+    nan = float('nan')
+    parts = []
+    for buf, mask in ((model.x_axis, model.x_valid), (model.y_axis, model.y_valid),
+                      (model.values, model.valid)):
+        if all(mask):
+            parts.append(_float_bytes(buf))
+        else:
+            parts.append(_float_bytes(array('d', [v if ok else nan for v, ok in zip(buf, mask)])))
+    return b''.join(parts)
+
+
+def decode_table(data, rows, cols):
+    """Inverse of encode_table(); returns a TableModel."""
+    model = TableModel(rows, cols)
+    values = array('d')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    if len(values) != cols + rows + rows * cols:
+        raise engine.ConversionError(f"Table data does not match its {rows}x{cols} shape")
+
+    start = 0
+    for name, mask_name, count in (('x_axis', 'x_valid', cols), ('y_axis', 'y_valid', rows),
+                                   ('values', 'valid', rows * cols)):
+        part = values[start:start + count]
+        start += count
+        # NaN != NaN marks the empty cells
+        valid = bytearray(v == v for v in part)
+        if not all(valid):
+            part = array('d', [v if ok else 0.0 for v, ok in zip(part, valid)])
+        setattr(model, name, part)
+        setattr(model, mask_name, valid)
+    return model
+
+
+# ===== SESSIONS =====
+
+def _layout_to_dict(layout):
+    return {
+        'rows': layout.rows,
+        'cols': layout.cols,
+        'x_method': layout.x_method,
+        'y_method': layout.y_method,
+        'x_template': list(layout.x_template) if layout.x_template else None,
+        'y_template': list(layout.y_template) if layout.y_template else None,
+    }
+
+
+def _relaxation_to_dict(relaxation):
+    return {
+        'method': relaxation.method,
+        'strength_x': relaxation.strength_x,
+        'strength_y': relaxation.strength_y,
+        'omega': relaxation.omega,
+        'tolerance': relaxation.tolerance,
+        'max_iterations': relaxation.max_iterations,
+    }
+
+
+class Session:
+    """
+    One map with its tables and conversion settings.
+
+    source, vo and ve are TableModels; vo and ve are None until
+    generated. displacement and iat are None when the GUI fields did not
+    hold a number. kernel is a registered resampler name or a Resampler,
+    relaxation a Relaxation or None, layout a TargetLayout.
+    """
+
+    def __init__(self, name, source, vo=None, ve=None, displacement=None, iat=None,
+                 kernel=engine.DEFAULT_KERNEL, relaxation=None, layout=None, created=None):
+        layout = layout or engine.DEFAULT_LAYOUT
+        for table in (vo, ve):
+            if table is not None and (table.rows, table.cols) != (layout.rows, layout.cols):
+                raise engine.ConversionError(
+                    f"Result tables must be {layout.rows}x{layout.cols} to match the layout"
+                )
+        self.name = name
+        self.source = source
+        self.vo = vo
+        self.ve = ve
+        self.displacement = displacement
+        self.iat = iat
+        self.kernel = engine.get_resampler(kernel)
+        self.relaxation = relaxation
+        self.layout = layout
+        self.created = created or time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    def tables(self):
+        """(name, TableModel) of the tables present, in block order."""
+        return [(name, getattr(self, name)) for name in TABLE_NAMES
+                if getattr(self, name) is not None]
+
+    def to_entry(self):
+        """Header entry without the block position; see encode_block()."""
+        entry = {
+            'name': self.name,
+            'created': self.created,
+            'displacement': self.displacement,
+            'iat': self.iat,
+            'kernel': self.kernel.name,
+            'layout': _layout_to_dict(self.layout),
+            'relaxation': _relaxation_to_dict(self.relaxation) if self.relaxation else None,
+        }
+        if isinstance(self.kernel, engine.SplineResampler):
+            entry['spline_smoothing'] = self.kernel.smoothing
+        return entry
+
+    def encode_block(self):
+        """(entry, block bytes); entry['tables'] lists the table shapes."""
+        entry = self.to_entry()
+        entry['tables'] = [{'name': name, 'rows': model.rows, 'cols': model.cols}
+                           for name, model in self.tables()]
+        return entry, b''.join(encode_table(model) for _, model in self.tables())
+
+    @classmethod
+    def from_entry(cls, entry, block):
+        """Rebuild a Session from its header entry and block bytes."""
+        try:
+            tables = {}
+            start = 0
+            for table in entry['tables']:
+                rows, cols = int(table['rows']), int(table['cols'])
+                size = 8 * (cols + rows + rows * cols)
+                tables[table['name']] = decode_table(block[start:start + size], rows, cols)
+                start += size
+
+            layout = engine.TargetLayout(**entry['layout'])
+            kernel = entry.get('kernel', engine.DEFAULT_KERNEL)
+            if kernel == 'spline' and 'spline_smoothing' in entry:
+                kernel = engine.SplineResampler(entry['spline_smoothing'])
+            relaxation = entry.get('relaxation')
+            if relaxation is not None:
+                relaxation = engine.Relaxation(**relaxation)
+            return cls(entry['name'], tables['source'], tables.get('vo'), tables.get('ve'),
+                       entry.get('displacement'), entry.get('iat'), kernel, relaxation, layout,
+                       entry.get('created'))
+        except (KeyError, TypeError, ValueError) as e:
+            raise engine.ConversionError(f"Invalid session entry: {e}")
+
+
+# ===== FILES =====
+
+def _write(path, entries, data):
+    """Write prefix, header and array section atomically."""
+    header = json.dumps({'version': FORMAT_VERSION, 'maps': entries},
+                        separators=(',', ':')).encode('utf-8')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for chunk in data:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _entries_and_blocks(sessions, offset=0):
+    entries, blocks = [], []
+    for session in sessions:
+        entry, block = session.encode_block()
+        entry['offset'] = offset
+        entry['length'] = len(block)
+        offset += len(block)
+        entries.append(entry)
+        blocks.append(block)
+    return entries, blocks
+
+
+@profile.timed('session')
+def write_workspace(path, sessions):
+    """Write sessions (a list of Session) as one workspace file."""
+    entries, blocks = _entries_and_blocks(sessions)
+    _write(path, entries, blocks)
+
+
+def save_session(path, session):
+    """Write a single-map session file."""
+    write_workspace(path, [session])
+
+
+@profile.timed('session')
+def append_session(path, session):
+    """
+    Add a session to a workspace file, creating it if needed.
+
+    The header sits in front of the array section, so the file is
+    rewritten: existing blocks are copied as raw bytes without being
+    decoded, and the new file replaces the old one atomically, so an
+    interrupted append leaves the workspace as it was. The cost is one
+    sequential copy of the file (a few ms for 200 maps).
+    """
+    if not os.path.exists(path):
+        write_workspace(path, [session])
+        return
+    with Workspace(path) as workspace:
+        entries = [dict(entry) for entry in workspace.entries]
+        data = workspace.read_data()
+    new_entries, blocks = _entries_and_blocks([session], offset=len(data))
+    _write(path, entries + new_entries, [data] + blocks)
+
+
+class Workspace:
+    """
+    Open workspace or session file.
+
+    Use as a context manager. Only the header is read when opening:
+    entries lists every map's name, parameters and settings, load()
+    reads and decodes one map on demand.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.entries = self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+        self._loaded = {}
+
+    def _read_header(self):
+        prefix = self._file.read(PREFIX.size)
+        if len(prefix) < PREFIX.size:
+            raise engine.ConversionError(f"{self.path} is not a session file")
+        magic, version, header_length = PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise engine.ConversionError(f"{self.path} is not a session file")
+        if version > FORMAT_VERSION:
+            raise engine.ConversionError(
+                f"{self.path} was written by a newer version (format {version})"
+            )
+        try:
+            header = json.loads(self._file.read(header_length).decode('utf-8'))
+            entries = header['maps']
+        except (UnicodeDecodeError, ValueError, KeyError) as e:
+            raise engine.ConversionError(f"{self.path} has a damaged header: {e}")
+        self.data_start = PREFIX.size + header_length
+        return entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        self._file.close()
+
+    def names(self):
+        return [entry['name'] for entry in self.entries]
+
+    def index(self, name):
+        """Position of the first map called name."""
+        for i, entry in enumerate(self.entries):
+            if entry['name'] == name:
+                return i
+        raise engine.ConversionError(f"No map named {name!r} in {self.path}")
+
+    @profile.timed('session')
+    def load(self, which=0):
+        """Session for a map given by position or name; decoded once, then kept."""
+        index = self.index(which) if isinstance(which, str) else which
+        session = self._loaded.get(index)
+        if session is None:
+            entry = self.entries[index]
+            self._file.seek(self.data_start + entry['offset'])
+            block = self._file.read(entry['length'])
+            if len(block) != entry['length']:
+                raise engine.ConversionError(f"{self.path} is truncated")
+            session = self._loaded[index] = Session.from_entry(entry, block)
+        return session
+
+    def read_data(self):
+        """The whole array section as bytes."""
+        self._file.seek(self.data_start)
+        return self._file.read()
+
+
+def load_session(path, which=0):
+    """Read one map (by position or name) from a session or workspace file."""
+    with Workspace(path) as workspace:
+        return workspace.load(which)
@@ -0,0 +1,328 @@
+"""
+Tab-separated table I/O.
+
+Reads and writes tables in the same layout copy_selection puts on the
+clipboard: one row per line, cells separated by tabs. A table may carry
+its axes as well: the first line holds the RPM breakpoints (with an empty
+top-left cell) and the first column of every other line the MAP breakpoint.
+
+parse_block() also takes what other tools put on the clipboard: tabs,
+semicolons, commas or spaces between cells, decimal commas from
+European-locale Excel, Windows line endings and title lines without any
+number. The delimiter and decimal separator are detected from the text.
+A number that does not parse is reported with its line and column in the
+pasted text.
+"""
+
+import math
+from array import array
+
+import vo_ve_profile as profile
+from vo_ve_engine import ConversionError
+
+# Delimiter parse_block() splits on when cells are separated by whitespace
+WHITESPACE = ' '
+
+
+def parse_rows(text):
+    """Split tab-separated text into a list of stripped cell lists."""
+    rows = []
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if not line.strip():
+            continue
+        rows.append([value.strip() for value in line.split('\t')])
+    return rows
+
+
+def _lines(text):
+    """
+    (line number, line) from the first to the last non-blank line. Blank
+    or delimiter-only lines in between are kept, they are rows of blank
+    cells.
+    """
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    filled = [i for i, line in enumerate(lines) if line.strip(' \t;,')]
+    if not filled:
+        return []
+    return [(n, line) for n, line in enumerate(lines[filled[0]:filled[-1] + 1], start=filled[0] + 1)]
+
+
+def detect_delimiter(lines):
+    """
+    Cell delimiter of a list of text lines: tab, ';', ',' or WHITESPACE.
+
+    Commas only count as delimiter when the cells are not already
+    separated by whitespace, so "1,5 2,5" is two decimal-comma cells.
+    A single column with one comma per line ("85,5") is taken as decimal
+    commas too.
+    """
+    if any('\t' in line for line in lines):
+        return '\t'
+    if any(';' in line for line in lines):
+        return ';'
+    if any(',' in line for line in lines):
+        split = [line.split() for line in lines]
+        if any(len(tokens) > 1 for tokens in split):
+            if not any(token.endswith(',') for tokens in split for token in tokens):
+                return WHITESPACE
+        elif all(line.count(',') == 1 for line in lines) and not any('.' in line for line in lines):
+            return WHITESPACE
+        return ','
+    return WHITESPACE
+
+
+def _split(line, delimiter):
+    if delimiter == WHITESPACE:
+        return line.split()
+    tokens = line.split(delimiter)
+    # Tabs are padding only when they are not the delimiter
+    if ' ' in line or ('\t' in line and delimiter != '\t'):
+        tokens = [token.strip() for token in tokens]
+    return tokens
+
+
+def detect_decimal(rows, delimiter):
+    """
+    Decimal separator, '.' or ',', of tokenized rows.
+
+    Commas are decimal when some number ends in ",digits" and none looks
+    like "1,234.5" (comma thousands separator). Dots are then thousands
+    separators, as in "1.234,5".
+    """
+    if delimiter == ',':
+        return '.'
+    comma = False
+    for tokens in rows:
+        for token in tokens:
+            i = max(token.rfind(','), token.rfind('.'))
+            if i < 0:
+                continue
+            if token[i] == ',':
+                comma = True
+            elif ',' in token:
+                return '.'
+    return ',' if comma else '.'
+
+
+def _number(token, decimal):
+    """Float value of a token, None if it is not a finite number."""
+    if decimal == ',':
+        token = token.replace('.', '').replace(',', '.')
+    elif ',' in token:
+        token = token.replace(',', '')
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _is_axis(values):
+    """
+    Strictly monotonic breakpoints. An increasing axis may repeat its last
+    breakpoint, as the MS4x target axes do ("... 6500 7000 7000 7000").
+    """
+    if len(values) < 2:
+        return True
+    end = len(values)
+    while end > 1 and values[end - 1] == values[end - 2]:
+        end -= 1
+    if end < 2:
+        return False
+    pairs = list(zip(values[:end], values[1:end]))
+    if all(a < b for a, b in pairs):
+        return True
+    return end == len(values) and all(a > b for a, b in pairs)
+
+
+class ParsedTable:
+    """
+    Numbers of a parsed block of text.
+
+    values holds the rows x cols data cells row by row in an array('d'),
+    blank cells are NaN. x_values/y_values are the axes as lists, or None
+    when the text holds only data cells.
+    """
+
+    def __init__(self, rows, cols, values, x_values=None, y_values=None,
+                 delimiter='\t', decimal='.'):
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.x_values = x_values
+        self.y_values = y_values
+        self.delimiter = delimiter
+        self.decimal = decimal
+
+    @property
+    def has_axes(self):
+        return self.x_values is not None
+
+    def get(self, row, col):
+        """Value of a data cell, None when it was blank."""
+        value = self.values[row * self.cols + col]
+        return None if value != value else value
+
+    def grid(self):
+        """Data cells as a list of rows, None for blank cells."""
+        cols = self.cols
+        return [
+            [None if v != v else v for v in self.values[r * cols:(r + 1) * cols]]
+            for r in range(self.rows)
+        ]
+
+
+def _split_axes(rows, decimal, shape):
+    """
+    Decide whether the first row and column are axes.
+
+    rows are (line number, tokens). Returns (x_values, y_values, data
+    rows); the axes are None when there are none, otherwise the data rows
+    still start with their MAP cell.
+    """
+    if len(rows) < 2:
+        return None, None, rows
+    header = rows[0][1]
+    body = rows[1:]
+    width = len(body[0][1])
+    if shape is not None and (len(rows), len(header)) == shape:
+        return None, None, rows
+    if any(len(tokens) != width for _, tokens in body) or width < 2:
+        return None, None, rows
+
+    if len(header) == width and _number(header[0], decimal) is None:
+        header = header[1:]
+    elif len(header) != width - 1:
+        return None, None, rows
+
+    x_values = [_number(token, decimal) for token in header]
+    y_values = [_number(tokens[0], decimal) for _, tokens in body]
+    if None in x_values or None in y_values:
+        return None, None, rows
+    if not (_is_axis(x_values) and _is_axis(y_values)):
+        return None, None, rows
+    return x_values, y_values, body
+
+
+def _parse_cells(tokens, first, n, decimal, allow_blank):
+    row = []
+    for c in range(first, len(tokens)):
+        token = tokens[c]
+        if not token:
+            if not allow_blank:
+                raise ConversionError(f"Missing number at line {n}, column {c + 1}")
+            row.append(math.nan)
+            continue
+        value = _number(token, decimal)
+        if value is None:
+            raise ConversionError(f"Invalid number {token!r} at line {n}, column {c + 1}")
+        row.append(value)
+    return row
+
+
+@profile.timed('parse')
+def parse_block(text, shape=None, allow_blank=True):
+    """
+    Parse pasted or loaded text into a ParsedTable in one pass.
+
+    Leading lines without any number (titles, units) are skipped, blank
+    or delimiter-only lines further down are rows of blank cells. The
+    first row and column are taken as axes when the top-left cell is
+    blank or text, or the first row is one cell short, and both hold
+    monotonic numbers (an increasing axis may repeat its last
+    breakpoint). With shape=(rows, cols) text of exactly that size is
+    always data only.
+
+    Raises ConversionError naming the line and column of the first cell
+    that is not a number (or is blank when allow_blank is False) and of
+    rows that are too short or too long.
+    """
+    lines = _lines(text)
+    if not lines:
+        raise ConversionError("No table data found")
+
+    delimiter = detect_delimiter([line for _, line in lines])
+    rows = [(n, _split(line, delimiter)) for n, line in lines]
+    decimal = detect_decimal([tokens for _, tokens in rows], delimiter) if ',' in text else '.'
+
+    # Title lines
+    while rows and all(_number(token, decimal) is None for token in rows[0][1]):
+        rows.pop(0)
+    if not rows:
+        raise ConversionError("No numbers found in table data")
+
+    x_values, y_values, body = _split_axes(rows, decimal, shape)
+    first = 0 if x_values is None else 1
+    cols = len(body[0][1]) - first
+
+    values = array('d')
+    for n, tokens in body:
+        if not any(tokens):
+            # Empty row inside the block keeps its place
+            if not allow_blank:
+                raise ConversionError(f"Missing number at line {n}, column {first + 1}")
+            values.extend([math.nan] * cols)
+            continue
+        if len(tokens) != cols + first:
+            raise ConversionError(f"Line {n} has {len(tokens)} cells, expected {cols + first}")
+        cells = tokens[first:]
+        if decimal == ',':
+            cells = [t.replace('.', '').replace(',', '.') for t in cells]
+        try:
+            row = [float(cell) for cell in cells]
+        except ValueError:
+            row = None
+        if row is None or not all(map(math.isfinite, row)):
+            # Blank or odd cells, go cell by cell for the exact position
+            row = _parse_cells(tokens, first, n, decimal, allow_blank)
+        values.extend(row)
+    return ParsedTable(len(body), cols, values, x_values, y_values, delimiter, decimal)
+
+
+def parse_table(text, rows, cols):
+    """
+    Parse a rows x cols table, with or without axes.
+
+    Returns (x_values, y_values, grid). Axes are None when the text holds
+    only data cells.
+    """
+    table = parse_block(text, shape=(rows, cols), allow_blank=False)
+    if table.rows != rows or table.cols != cols:
+        raise ConversionError(
+            f"Expected a {rows}x{cols} table (optionally with axes), "
+            f"got {table.rows}x{table.cols}"
+        )
+    return table.x_values, table.y_values, table.grid()
+
+
+@profile.timed('format')
+def format_table(grid, x_values=None, y_values=None):
+    """
+    Format a grid (and optional axes) as tab-separated text. Axes keep
+    full precision, generated breakpoints are rarely whole numbers and
+    the grid was computed at the exact values.
+    """
+    lines = []
+    if x_values is not None:
+        lines.append('\t'.join([""] + [f"{v:.10g}" for v in x_values]))
+
+    for r, row in enumerate(grid):
+        values = ["" if v is None else f"{v:.3f}" for v in row]
+        if y_values is not None:
+            values.insert(0, f"{y_values[r]:.10g}")
+        lines.append('\t'.join(values))
+
+    return '\n'.join(lines)
+
+
+def read_table(path, rows, cols):
+    """Read a table file, see parse_table()."""
+    with open(path, encoding='utf-8') as f:
+        return parse_table(f.read(), rows, cols)
+
+
+def write_table(path, grid, x_values=None, y_values=None):
+    """Write a table file, see format_table()."""
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(format_table(grid, x_values, y_values))
+        f.write('\n')
@@ -0,0 +1,417 @@
+"""
+TunerPro XDF definition import.
+
+Parses XDF files into TableDef objects (see vo_ve_bin) and indexes them
+by title, category and address, so the 8x12 VO map and the 16x16 VE map
+of a firmware can be located instead of typed in by hand.
+
+Parsing a large XDF is slow compared to hashing it, so the parsed
+definitions are cached as JSON, one file per XDF content hash.
+
+Supported subset of the format: constant-stride tables whose MATH
+equation is linear in X. Axes either point at data in the image or carry
+fixed LABEL values. Tables with other equations are indexed but have no
+TableDef.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import vo_ve_bin
+import vo_ve_engine as engine
+
+# Bump when the cached index layout changes
+CACHE_VERSION = 1
+
+# mmedtypeflags bits as written by TunerPro
+FLAG_SIGNED = 0x01
+FLAG_LSB_FIRST = 0x02
+FLAG_COLUMN_MAJOR = 0x04
+FLAG_FLOAT = 0x10000
+
+# Title words used to pick the conversion source and target tables
+VO_KEYWORDS = ('vo',)
+VE_KEYWORDS = ('ve', 'volumetric')
+
+
+class XdfEntry:
+    """One XDFTABLE: title, categories and, if decodable, its TableDef."""
+
+    def __init__(self, title, categories, address, rows, cols, equation, table=None):
+        self.title = title
+        self.categories = categories
+        self.address = address
+        self.rows = rows
+        self.cols = cols
+        self.equation = equation
+        self.table = table
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'categories': self.categories,
+            'address': self.address,
+            'rows': self.rows,
+            'cols': self.cols,
+            'equation': self.equation,
+            'table': vo_ve_bin.table_to_dict(self.table) if self.table else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        table = data.get('table')
+        return cls(
+            data['title'], data['categories'], data['address'],
+            data['rows'], data['cols'], data['equation'],
+            vo_ve_bin.table_from_dict(data['title'], table) if table else None,
+        )
+
+
+# ===== EQUATIONS =====
+
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name,
+                  ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd, ast.Load)
+
+
+def _eval_equation(tree, x):
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return x
+        if isinstance(node, ast.UnaryOp):
+            value = walk(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        left, right = walk(node.left), walk(node.right)
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        return left / right
+
+    return walk(tree)
+
+
+def linear_equation(equation):
+    """
+    Turn an XDF MATH equation into (scale, offset) with value = X * scale + offset.
+
+    Returns None for equations that are not linear in X or use anything
+    beyond numbers, X, + - * / and parentheses.
+    """
+    try:
+        tree = ast.parse(equation.strip(), mode='eval')
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            return None
+        if isinstance(node, ast.Name) and node.id.upper() != 'X':
+            return None
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            return None
+
+    try:
+        offset = _eval_equation(tree, 0.0)
+        # A far-away sample keeps the offset's rounding out of the scale
+        scale = (_eval_equation(tree, 65536.0) - offset) / 65536.0
+        check = _eval_equation(tree, 1.0)
+    except ZeroDivisionError:
+        return None
+    if abs(check - (offset + scale)) > 1e-9 * max(1.0, abs(check)):
+        return None
+    return scale, offset
+
+
+# ===== PARSING =====
+
+def _int(text, default=0):
+    """Integer attribute: 0x hex, otherwise decimal, leading zeros and all ("0100")."""
+    if text is None or not text.strip():
+        return default
+    text = text.strip()
+    try:
+        return int(text, 0)
+    except ValueError:
+        pass
+    try:
+        return int(text, 10)
+    except ValueError:
+        raise engine.ConversionError(f"Invalid integer {text!r} in XDF")
+
+
+class _Defaults:
+    """Header DEFAULTS and BASEOFFSET of an XDF file."""
+
+    def __init__(self, header):
+        self.base_offset = 0
+        self.size_bits = 8
+        self.flags = 0
+
+        if header is None:
+            return
+        base = header.find('BASEOFFSET')
+        if base is not None:
+            self.base_offset = _int(base.get('offset'))
+            if base.get('subtract') == '1':
+                self.base_offset = -self.base_offset
+        defaults = header.find('DEFAULTS')
+        if defaults is not None:
+            self.size_bits = _int(defaults.get('datasizeinbits'), 8)
+            if defaults.get('signed') == '1':
+                self.flags |= FLAG_SIGNED
+            if defaults.get('lsbfirst') == '1':
+                self.flags |= FLAG_LSB_FIRST
+            if defaults.get('float') == '1':
+                self.flags |= FLAG_FLOAT
+
+
+def _element(size_bits, flags):
+    if flags & FLAG_FLOAT:
+        if size_bits != 32:
+            raise engine.ConversionError(f"Unsupported {size_bits}-bit float")
+        return 'f32'
+    if size_bits not in (8, 16, 32):
+        raise engine.ConversionError(f"Unsupported element size {size_bits} bits")
+    return f"{'i' if flags & FLAG_SIGNED else 'u'}{size_bits}"
+
+
+def _parse_axis_element(axis, defaults):
+    """Return (address, rows, cols, element, endian, row_major, equation) of an XDFAXIS."""
+    data = axis.find('EMBEDDEDDATA')
+    math = axis.find('MATH')
+    equation = math.get('equation', 'X') if math is not None else 'X'
+    if data is None or data.get('mmedaddress') in (None, ''):
+        return None, 0, 0, None, None, True, equation
+
+    flags = _int(data.get('mmedtypeflags'), defaults.flags)
+    size_bits = _int(data.get('mmedelementsizebits'), defaults.size_bits)
+    return (
+        _int(data.get('mmedaddress')) + defaults.base_offset,
+        _int(data.get('mmedrowcount'), 1),
+        _int(data.get('mmedcolcount'), 1),
+        _element(size_bits, flags),
+        '<' if flags & FLAG_LSB_FIRST else '>',
+        not flags & FLAG_COLUMN_MAJOR,
+        equation,
+    )
+
+
+def _parse_label_axis(axis, length):
+    labels = []
+    for label in axis.findall('LABEL'):
+        try:
+            labels.append((int(label.get('index', len(labels))), float(label.get('value'))))
+        except (TypeError, ValueError):
+            return None
+    if not labels:
+        return None
+    if len(labels) < length:
+        raise engine.ConversionError(f"Label axis has {len(labels)} labels for {length} elements")
+    values = [v for _, v in sorted(labels)][:length]
+    return vo_ve_bin.AxisDef(None, len(values), values=values)
+
+
+def _build_axis(axis, length, defaults):
+    if axis is None:
+        return None
+    address, _, _, element, endian, _, equation = _parse_axis_element(axis, defaults)
+    if address is None:
+        return _parse_label_axis(axis, length)
+    linear = linear_equation(equation)
+    if linear is None:
+        return None
+    count = _int(axis.findtext('indexcount'), length)
+    return vo_ve_bin.AxisDef(address, count, element=element, scale=linear[0],
+                             offset=linear[1], endian=endian)
+
+
+def _parse_table(node, defaults, category_names):
+    title = (node.findtext('title') or '').strip()
+    categories = []
+    for mem in node.findall('CATEGORYMEM'):
+        # CATEGORYMEM references are 1-based, CATEGORY indexes 0-based
+        try:
+            name = category_names.get(_int(mem.get('category')) - 1)
+        except engine.ConversionError:
+            continue
+        if name:
+            categories.append(name)
+
+    axes = {axis.get('id'): axis for axis in node.findall('XDFAXIS')}
+    z_axis = axes.get('z')
+    if z_axis is None:
+        return XdfEntry(title, categories, None, 0, 0, None)
+
+    try:
+        address, rows, cols, element, endian, row_major, equation = \
+            _parse_axis_element(z_axis, defaults)
+    except engine.ConversionError:
+        return XdfEntry(title, categories, None, 0, 0, None)
+    if address is None:
+        return XdfEntry(title, categories, None, 0, 0, equation)
+
+    table = None
+    linear = linear_equation(equation)
+    if linear is not None:
+        try:
+            table = vo_ve_bin.TableDef(
+                title, address, rows, cols, element=element, scale=linear[0],
+                offset=linear[1], endian=endian,
+                x_axis=_build_axis(axes.get('x'), cols, defaults),
+                y_axis=_build_axis(axes.get('y'), rows, defaults),
+                row_major=row_major,
+            )
+        except engine.ConversionError:
+            table = None
+
+    return XdfEntry(title, categories, address, rows, cols, equation, table)
+
+
+def parse_xdf(source):
+    """Parse an XDF file (path or bytes) into a list of XdfEntry objects."""
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            root = ET.fromstring(source)
+        else:
+            root = ET.parse(source).getroot()
+    except ET.ParseError as e:
+        raise engine.ConversionError(f"Invalid XDF: {e}")
+
+    header = root.find('XDFHEADER')
+    defaults = _Defaults(header)
+    category_names = {}
+    if header is not None:
+        for category in header.findall('CATEGORY'):
+            try:
+                category_names[_int(category.get('index'))] = category.get('name', '')
+            except engine.ConversionError:
+                continue
+
+    return [_parse_table(node, defaults, category_names) for node in root.iter('XDFTABLE')]
+
+
+# ===== INDEX =====
+
+def _title_words(title):
+    return set(re.split(r'[^0-9a-z]+', title.lower())) - {''}
+
+
+class XdfIndex:
+    """Lookup of XDF tables by title, category and address."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_title = {}
+        self.by_category = {}
+        self.by_address = {}
+        for entry in entries:
+            self.by_title.setdefault(entry.title.casefold(), []).append(entry)
+            for category in entry.categories:
+                self.by_category.setdefault(category.casefold(), []).append(entry)
+            if entry.address is not None:
+                self.by_address.setdefault(entry.address, []).append(entry)
+
+    def find(self, title):
+        """Return the single table with this title (case-insensitive)."""
+        matches = self.by_title.get(title.casefold(), [])
+        if len(matches) != 1:
+            raise engine.ConversionError(
+                f"{len(matches)} tables titled {title!r} in the definition"
+            )
+        return matches[0]
+
+    def category(self, name):
+        return list(self.by_category.get(name.casefold(), []))
+
+    def at(self, address):
+        return list(self.by_address.get(address, []))
+
+    def search(self, text):
+        """Tables whose title contains text (case-insensitive)."""
+        text = text.casefold()
+        return [entry for entry in self.entries if text in entry.title.casefold()]
+
+    def locate(self, rows, cols, keywords):
+        """
+        Find the one decodable rows x cols table whose title contains any
+        of the keywords as a word.
+        """
+        candidates = [
+            entry for entry in self.entries
+            if entry.table is not None and (entry.rows, entry.cols) == (rows, cols)
+            and _title_words(entry.title) & set(keywords)
+        ]
+        if len(candidates) != 1:
+            titles = ', '.join(repr(entry.title) for entry in candidates) or 'none'
+            raise engine.ConversionError(
+                f"Expected one {rows}x{cols} table matching {'/'.join(keywords)}, found {titles}"
+            )
+        return candidates[0].table
+
+    def locate_vo_table(self, rows=engine.SRC_ROWS, cols=engine.SRC_COLS):
+        """The 8x12 VO map that feeds generate_16x16."""
+        return self.locate(rows, cols, VO_KEYWORDS)
+
+    def locate_ve_table(self, rows=engine.DST_ROWS, cols=engine.DST_COLS):
+        """The 16x16 VE map the conversion writes to."""
+        return self.locate(rows, cols, VE_KEYWORDS)
+
+
+# ===== DISK CACHE =====
+
+def default_cache_dir():
+    """Cache directory, VO_VE_CACHE_DIR overrides ~/.cache/vo_ve_converter."""
+    base = os.environ.get('VO_VE_CACHE_DIR')
+    if base:
+        return os.path.join(base, 'xdf')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'vo_ve_converter', 'xdf')
+
+
+def load_xdf(path, cache_dir=None, use_cache=True):
+    """
+    Parse an XDF file into an XdfIndex, going through the on-disk cache.
+
+    The cache key is the SHA-256 of the file contents, so an edited XDF is
+    parsed again automatically.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    if not use_cache:
+        return XdfIndex(parse_xdf(content))
+
+    digest = hashlib.sha256(content).hexdigest()
+    cache_dir = cache_dir or default_cache_dir()
+    cache_path = os.path.join(cache_dir, f"{digest}.json")
+
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('version') == CACHE_VERSION:
+            return XdfIndex([XdfEntry.from_dict(data) for data in cached['entries']])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, engine.ConversionError):
+        # Unreadable or malformed cache entries are a miss
+        pass
+
+    entries = parse_xdf(content)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'source': os.path.basename(path),
+                       'entries': [entry.to_dict() for entry in entries]}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # A read-only cache location only costs the re-parse next time
+        pass
+
+    return XdfIndex(entries)